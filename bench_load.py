@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import threading
+import time
+
+import numpy as np
+
+import ir_metrics
+from intelligent_search_simulator import DATASET_PATH, ENGINES, TOP_K, Matcher, evaluate, load_dataset
+
+# load test للـ matcher بتاع intelligent_search_simulator في process واحدة (قبل ما يتحط ورا endpoint)
+# - queries الداتاسيت بتتعاد بالترتيب (round-robin) على Matcher واحد مشترك بين كل الـ threads
+# - --rate N: open loop، كل طلب ليه ميعاد ثابت (N في الثانية) والـ latency بتتحسب من الميعاد مش من
+#   بداية التنفيذ، فلو الـ workers مش ملاحقين الطابور بيبان في الـ latency (مش بيختفي)
+# - --rate 0: closed loop، كل worker بيبعت اللي بعده أول ما اللي قبله يخلص (أقصى throughput)
+# - كل --sample-every ثانية: الطلبات اللي خلصت + RSS → timeline
+# - --engines bm25,scan,...: نفس الـ workload على كل engine بالترتيب + MRR على عينة عشان الجودة تتقارن
+# البحث Python خالص، فالـ threads بتوضح قد إيه الـ GIL بيحد الـ throughput مع زيادة الـ concurrency
+#
+#   python bench_load.py --concurrency 8 --duration 10
+#   python bench_load.py --rate 2000 --concurrency 4 --engines bm25,bm25-notags,scan --out load.json
+
+PERCENTILES = (50, 95, 99)
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb():
+    # الحالي من /proc (Linux)؛ غير كده أعلى قيمة لحد دلوقتي من getrusage
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summary_ms(seconds):
+    if not len(seconds):
+        return None
+    return {s: round(v, 4) for s, v in ir_metrics.latency_summary(seconds, PERCENTILES).items()}
+
+
+def run_load(matcher, queries, k, concurrency, rate, duration, requests, sample_every):
+    counter = itertools.count()
+    latencies = [[] for _ in range(concurrency)]   # list لكل worker: من غير lock
+    service = [[] for _ in range(concurrency)]
+    errors = []
+    start = time.perf_counter()
+    deadline = start + duration if not requests else float("inf")
+
+    def worker(w):
+        lat, svc = latencies[w], service[w]
+        while True:
+            i = next(counter)
+            if requests and i >= requests:
+                return
+            due = start + i / rate if rate else time.perf_counter()
+            if due >= deadline:
+                return
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t0 = time.perf_counter()
+            try:
+                matcher.search(queries[i % len(queries)], k)
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            t1 = time.perf_counter()
+            svc.append(t1 - t0)
+            lat.append(t1 - due)
+
+    threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+
+    timeline = []
+    last_t, last_n = 0.0, 0
+    next_sample = start
+    while any(t.is_alive() for t in threads):
+        next_sample += sample_every
+        for t in threads:   # بيرجع عند ميعاد النقطة الجاية أو أول ما كل الـ workers يخلصوا
+            t.join(max(0.0, next_sample - time.perf_counter()))
+        now = time.perf_counter() - start
+        done = sum(map(len, latencies))
+        timeline.append({"t": round(now, 3), "completed": done,
+                         "qps": round((done - last_n) / (now - last_t), 1) if now > last_t else None,
+                         "rss_mb": round(rss_mb(), 1)})
+        last_t, last_n = now, done
+    wall = time.perf_counter() - start
+
+    lat = np.concatenate([np.asarray(x) for x in latencies])
+    svc = np.concatenate([np.asarray(x) for x in service])
+    return {
+        "requests": len(lat),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": round(wall, 3),
+        "throughput_qps": round(len(lat) / wall, 1) if wall else None,
+        "latency_ms": summary_ms(lat),
+        "service_ms": summary_ms(svc),
+        "peak_rss_mb": max((s["rss_mb"] for s in timeline), default=round(rss_mb(), 1)),
+        "timeline": timeline,
+    }
+
+
+def bench_engine(engine, dataset, queries, args):
+    before = rss_mb()
+    t0 = time.perf_counter()
+    matcher = Matcher(dataset, engine)
+    build = time.perf_counter() - t0
+    result = {"engine": engine, "projects": len(matcher), "build_s": round(build, 3),
+              "index_rss_mb": round(rss_mb() - before, 1)}
+
+    if args.quality:
+        quality = evaluate(dataset[:args.quality], matcher, args.k)
+        result["mrr"] = quality["mrr"]
+        result[f"recall@{args.k}"] = quality[f"recall@{args.k}"]["ground_truth"]
+
+    for q in itertools.islice(itertools.cycle(queries), args.warmup):
+        matcher.search(q, args.k)
+    result.update(run_load(matcher, queries, args.k, args.concurrency, args.rate,
+                           args.duration, args.requests, args.sample_every))
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="load test للـ matcher بتاع الـ search simulator")
+    ap.add_argument("--dataset", default=DATASET_PATH)
+    ap.add_argument("--engines", default="bm25", help=f"مفصولة بـ , من: {', '.join(sorted(ENGINES))}")
+    ap.add_argument("--concurrency", type=int, default=4, help="عدد الـ threads")
+    ap.add_argument("--rate", type=float, default=0, help="طلبات في الثانية (0 = closed loop بأقصى سرعة)")
+    ap.add_argument("--duration", type=float, default=10, help="ثواني لكل engine")
+    ap.add_argument("--requests", type=int, default=0, help="عدد طلبات ثابت بدل --duration")
+    ap.add_argument("--k", type=int, default=TOP_K)
+    ap.add_argument("--warmup", type=int, default=100)
+    ap.add_argument("--quality", type=int, default=1000, help="عدد الـ records لحساب MRR (0 = من غيره)")
+    ap.add_argument("--sample-every", type=float, default=1.0, help="ثواني بين نقط الـ timeline")
+    ap.add_argument("--seed", type=int, help="رتّب الـ queries عشوائي بالـ seed ده بدل ترتيب الداتاسيت")
+    ap.add_argument("--out", help="اكتب النتايج JSON هنا (بالـ timeline)")
+    args = ap.parse_args()
+
+    engines = [e for e in args.engines.split(",") if e]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        ap.error(f"unknown engine(s): {', '.join(unknown)}")
+    if args.concurrency < 1 or args.rate < 0:
+        ap.error("--concurrency must be >= 1 and --rate >= 0")
+
+    dataset = load_dataset(args.dataset)
+    if not dataset:
+        print(f"❌ {args.dataset} not found or empty.")
+        raise SystemExit(1)
+    queries = [r["query"] for r in dataset]
+    if args.seed is not None:
+        random.Random(args.seed).shuffle(queries)
+    mode = f"{args.rate:g} req/s" if args.rate else "closed loop"
+    limit = f"{args.requests} requests" if args.requests else f"{args.duration:g}s"
+    print(f"🔁 {len(queries)} queries, {args.concurrency} threads, {mode}, {limit} per engine")
+
+    results = []
+    for engine in engines:
+        r = bench_engine(engine, dataset, queries, args)
+        results.append(r)
+        lat = r["latency_ms"] or {}
+        print(f"   {engine:<12} {r['throughput_qps'] or 0:>9.1f} q/s  "
+              + "  ".join(f"p{p} {lat.get(f'p{p}', 0):7.3f}" for p in PERCENTILES)
+              + f" ms  rss {r['peak_rss_mb']:.1f} MB (index {r['index_rss_mb']:+.1f})"
+              + (f"  mrr {r['mrr']}" if "mrr" in r else "")
+              + (f"  ⚠️ {r['errors']} errors" if r["errors"] else ""))
+
+    if args.out:
+        config = {k: v for k, v in vars(args).items() if k != "out"}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"📝 results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
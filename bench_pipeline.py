@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from dataset_io import iter_records, write_json_array
+from synthetic_corpus import iter_corpus
+
+# benchmark للـ pipeline كله على corpus صناعي (offline بالكامل)
+#   synth → generate_dataset → validate → build_dataset → validate
+# كل مرحلة process لوحدها: wall time و peak RSS (من wait4) و records/s
+# النتايج بتتكتب في --out، ولو فيه --baseline أي مرحلة أبطأ أو أتقل من الـ baseline بأكتر من
+# --tolerance بتتعلّم regression والـ exit code بيبقى 1؛ validate اللي بيطلع 1 بيتسجل بـ "failed": true،
+# ولو كان بيعدي في الـ baseline ده regression برضه
+#
+#   python bench_pipeline.py --sizes 1000,10000 --save-baseline bench_baseline.json
+#   python bench_pipeline.py --sizes 1000,10000 --baseline bench_baseline.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# فروق أصغر من كده noise على المقاسات الصغيرة ومش بتتحسب regression
+MIN_WALL_DELTA = 0.5   # ثانية
+MIN_RSS_DELTA = 16     # MB
+
+
+def synth(args):
+    readme = tuple(int(x) for x in args.readme_sentences.split(","))
+    repos = iter_corpus(args.repos, n_orgs=args.orgs, n_topics=args.topics,
+                        readme_sentences=readme, seed=args.seed, faker=args.faker)
+    n = write_json_array(repos, args.out)
+    print(f"✅ {n} repos → {args.out}")
+
+
+def run_stage(cmd, cwd, env, log):
+    # wait4 بيرجع الـ rusage بتاع الـ process دي بس (RUSAGE_CHILDREN بيجمع أكبر واحد في كل اللي فات)
+    # (wall, rss, exit code)؛ الـ exit code بيتفحص عند اللي نادى
+    start = time.perf_counter()
+    with open(log, "ab") as out:
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=out, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    return wall, usage.ru_maxrss / 1024, os.waitstatus_to_exitcode(status)
+
+
+def count_records(path):
+    return sum(1 for _ in iter_records(path)) if os.path.exists(path) else 0
+
+
+def bench_size(n, args, workdir):
+    py = sys.executable
+    env = dict(os.environ, REPOS_FILE="github_repos.json", DATASET_SIZE=str(args.records),
+               MIN_DATASET_SIZE="1", PYTHONHASHSEED="0")
+    log = os.path.join(workdir, "stages.log")
+    corpus = os.path.join(workdir, "github_repos.json")
+    synth_cmd = [py, os.path.join(HERE, "bench_pipeline.py"), "synth", "--repos", str(n), "--out", corpus,
+                 "--orgs", str(args.orgs), "--topics", str(args.topics),
+                 "--readme-sentences", args.readme_sentences, "--seed", str(args.seed)]
+    if args.faker:
+        synth_cmd.append("--faker")
+
+    stages = [
+        ("synth", synth_cmd, None),
+        ("generate_dataset", [py, os.path.join(HERE, "generate_dataset.py"), "--workers", str(args.workers)],
+         "service_discovery_dataset.json"),
+        ("validate_generated", [py, os.path.join(HERE, "validate_dataset.py"), "service_discovery_dataset.json",
+                                "--workers", str(args.workers)], "service_discovery_dataset.json"),
+        ("build_dataset", [py, os.path.join(HERE, "build_dataset.py")], "service_discovery_dataset.json"),
+        ("validate_built", [py, os.path.join(HERE, "validate_dataset.py"), "service_discovery_dataset.json",
+                            "--workers", str(args.workers)], "service_discovery_dataset.json"),
+    ]
+    results = []
+    for name, cmd, output in stages:
+        if name in args.skip:
+            continue
+        wall, rss, code = run_stage(cmd, workdir, env, log)
+        if code != 0:
+            # validate بيطلع 1 لو الداتاسيت فيها أخطاء؛ ده نتيجة (failed) مش فشل benchmark
+            if not name.startswith("validate"):
+                raise RuntimeError(f"❌ {' '.join(cmd)} exited with {code} (see {log})")
+            print(f"   ⚠️ {name} exited with {code} (see {log})")
+        records = n if output is None else count_records(os.path.join(workdir, output))
+        result = {
+            "repos": n, "stage": name, "wall_s": round(wall, 3), "peak_rss_mb": round(rss, 1),
+            "records": records, "records_per_s": round(records / wall, 1) if wall else None,
+        }
+        if code != 0:
+            result["failed"] = True
+        results.append(result)
+        print(f"   {name:<20} {wall:8.2f}s  {rss:8.1f} MB  {records:>8} records" + ("  (failed)" if code else ""))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    base = {(r["repos"], r["stage"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["repos"], r["stage"]))
+        if not b:
+            continue
+        if r.get("failed") and not b.get("failed"):
+            regressions.append({"repos": r["repos"], "stage": r["stage"], "metric": "failed",
+                                "baseline": False, "current": True, "ratio": None})
+        for metric, floor in (("wall_s", MIN_WALL_DELTA), ("peak_rss_mb", MIN_RSS_DELTA)):
+            old, new = b[metric], r[metric]
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({"repos": r["repos"], "stage": r["stage"], "metric": metric,
+                                    "baseline": old, "current": new, "ratio": round(new / old, 2) if old else None})
+    return regressions
+
+
+def run(args):
+    sizes = [int(x) for x in args.sizes.split(",")]
+    results = []
+    for n in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"bench_{n}_", dir=args.workdir)
+        print(f"📏 {n} repos ({workdir})")
+        results += bench_size(n, args, workdir)   # لو مرحلة فشلت الفولدر بيفضل عشان الـ log
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": {k: getattr(args, k) for k in ("sizes", "records", "orgs", "topics", "readme_sentences",
+                                                 "seed", "faker", "workers")},
+        "results": results,
+    }
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"💾 results → {args.out}")
+
+    for r in report.get("regressions", []):
+        print(f"❌ regression: {r['stage']} @ {r['repos']} repos {r['metric']} "
+              f"{r['baseline']} → {r['current']}" + (f" (x{r['ratio']})" if r["ratio"] else ""))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="benchmark للـ pipeline على corpus صناعي")
+    sub = ap.add_subparsers(dest="cmd")
+
+    def corpus_args(p):
+        p.add_argument("--orgs", type=int, default=20)
+        p.add_argument("--topics", type=int, default=60)
+        p.add_argument("--readme-sentences", default="1,16", help="أقل,أكتر عدد جمل في الـ README")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--faker", action="store_true", help="كلمات إنجليزي من Faker للمفردات العامة")
+
+    s = sub.add_parser("synth", help="اكتب corpus بشكل github_repos.json")
+    s.add_argument("--repos", type=int, required=True)
+    s.add_argument("--out", default="github_repos.json")
+    corpus_args(s)
+
+    r = sub.add_parser("run", help="شغّل المراحل وقيس (الافتراضي)")
+    r.add_argument("--sizes", default="1000,10000", help="مثلًا 1000,10000,100000,1000000")
+    r.add_argument("--records", type=int, default=250, help="DATASET_SIZE لكل مرحلة بناء")
+    r.add_argument("--workers", type=int, default=1)
+    r.add_argument("--skip", default="", help="مراحل تتشال، مفصولة بفاصلة")
+    r.add_argument("--out", default="bench_results.json")
+    r.add_argument("--baseline", help="قارن بالملف ده")
+    r.add_argument("--save-baseline", help="احفظ النتايج كـ baseline هنا")
+    r.add_argument("--tolerance", type=float, default=0.2, help="نسبة الزيادة المسموحة")
+    r.add_argument("--workdir", help="مكان الفولدرات المؤقتة")
+    r.add_argument("--keep", action="store_true", help="ما تمسحش الفولدرات المؤقتة")
+    corpus_args(r)
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ("synth", "run", "-h", "--help"):
+        argv = ["run"] + argv
+    args = ap.parse_args(argv)
+    if args.cmd == "synth":
+        synth(args)
+    else:
+        args.skip = set(filter(None, args.skip.split(",")))
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
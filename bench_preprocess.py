@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+
+import generate_dataset as g
+from intern_table import IdSet
+from synthetic_corpus import make_corpus
+
+# مقارنة وقت اختيار جُمل الـ relevance:
+# - before: split_sentences على الوصف/README في كل مرة الـ repo يترشح
+# - after: preprocess() مرة واحدة + pick_sentence على الـ tuple المحفوظ
+# - interned: نفس after بس على أرقام الجُمل (pick_sentence_id + IdSet) زي build_record
+# الـ repos الشائعة بتترشح أكتر (توزيع Zipf) زي ما بيحصل في main
+# التلاتة لازم يختاروا نفس الجُمل بالظبط
+
+
+def workload(n_repos, picks, seed):
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(n_repos)]
+    return rng.choices(range(n_repos), weights=weights, k=picks)
+
+
+def run(pick, order, seed, used=None):
+    random.seed(seed)
+    used = set() if used is None else used
+    chosen = []
+    t0 = time.perf_counter()
+    for j in order:
+        chosen.append(pick(j, used))
+    return time.perf_counter() - t0, chosen
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repos", type=int, default=20000)
+    ap.add_argument("--picks", type=int, default=200000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    filtered = make_corpus(args.repos, seed=args.seed)
+    order = workload(len(filtered), args.picks, args.seed)
+    avoid = []
+
+    t_before, before = run(lambda j, used: g.pick_sentence_from_repo(filtered[j], used, avoid),
+                           order, args.seed)
+
+    t0 = time.perf_counter()
+    texts, _, strings, _ = g.preprocess(filtered)
+    t_prep = time.perf_counter() - t0
+    sents = [tuple(strings[i] for i in rt.sents) for rt in texts]
+    t_after, after = run(lambda j, used: g.pick_sentence(sents[j], used, avoid),
+                         order, args.seed)
+    t_ids, ids = run(lambda j, used: g.pick_sentence_id(texts[j].sents, strings, used, avoid),
+                     order, args.seed, IdSet(len(strings)))
+
+    assert before == after == ids, "preprocessed path picked different sentences"
+    print(f"repos={args.repos} picks={args.picks} distinct repos picked={len(set(order))}")
+    print(f"before:   {t_before:.2f}s ({args.picks / t_before:,.0f} picks/s)")
+    print(f"after:    {t_after:.2f}s ({args.picks / t_after:,.0f} picks/s) + preprocess {t_prep:.2f}s")
+    print(f"interned: {t_ids:.2f}s ({args.picks / t_ids:,.0f} picks/s)")
+    print(f"speedup (incl. preprocess): {t_before / (t_after + t_prep):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import random
+import time
+
+import build_dataset as b
+from relevance_index import RelevanceIndex
+from synthetic_corpus import make_corpus
+
+# مرشحين الصلة في build_dataset: الـ scan القديم (set() لكل زوج) ضد RelevanceIndex
+# على corpus صناعي بأحجام مختلفة. الاتنين لازم يطلعوا نفس القوائم بنفس الترتيب.
+# الـ scan بطيء جدًا على الأحجام الكبيرة، فبيتقاس على عدد anchors أقل.
+
+
+def prepare(n, seed):
+    pool = make_corpus(n, readme_sentences=(1, 4), seed=seed)
+    for r in pool:
+        del r["text"]
+    random.Random(seed).shuffle(pool)
+    return pool
+
+
+def run(n, anchors, scan_anchors, seed):
+    pool = prepare(n, seed)
+    picked = random.Random(seed).sample(pool, min(anchors, len(pool)))
+
+    t0 = time.perf_counter()
+    index = RelevanceIndex(pool)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = [index.candidates(a) for a in picked]
+    t_index = (time.perf_counter() - t0) / len(picked)
+
+    check = picked[:scan_anchors]
+    t0 = time.perf_counter()
+    want = [b.scan_candidates(a, pool) for a in check]
+    t_scan = (time.perf_counter() - t0) / len(check)
+
+    mismatches = sum(g != w for g, w in zip(got, want))
+    sizes = [sum(len(c) for c in g) / len(g) for g in zip(*got)]
+    print(f"repos={n}: index build {t_build:.2f}s, "
+          f"scan {t_scan * 1000:.1f} ms/anchor ({len(check)} anchors), "
+          f"index {t_index * 1000:.2f} ms/anchor ({len(picked)} anchors), "
+          f"speedup {t_scan / t_index:.0f}x, mismatches={mismatches}")
+    print(f"   avg candidates high/medium/low: " + " / ".join(f"{s:.0f}" for s in sizes))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000", help="أحجام الـ corpus مفصولة بفاصلة")
+    ap.add_argument("--anchors", type=int, default=200)
+    ap.add_argument("--scan-anchors", type=int, default=10, help="anchors للـ scan القديم")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for n in (int(x) for x in args.sizes.split(",")):
+        run(n, args.anchors, args.scan_anchors, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import random
+import time
+from collections import defaultdict
+from itertools import islice
+
+import generate_dataset as g
+from synthetic_corpus import make_corpus
+
+# مقارنة مرشحين LSH بالمسار الدقيق (Jaccard ضد الكل) على corpus صناعي
+# - medium recall: نسبة مرشحين medium الدقيقين اللي LSH لقاهم
+# - high@4: تطابق أعلى 4 من نفس الـ org
+# - medium>=4: نسبة الـ anchors اللي عندها 4 مرشحين medium على الأقل
+# كل مرشح بيرجعه LSH متأكد منه بـ Jaccard دقيق، فالـ precision دايمًا 1
+
+
+def prepare(n, seed):
+    filtered = make_corpus(n, seed=seed)
+    tok = [g.tokens(r["text"]) for r in filtered]
+    by_org = defaultdict(list)
+    for i, r in enumerate(filtered):
+        by_org[r["org"]].append(i)
+    return filtered, tok, by_org
+
+
+def run_exact(anchors, filtered, tok, by_org):
+    rng = random.Random(0)
+    out = {}
+    t0 = time.perf_counter()
+    for idx in anchors:
+        pools = g.ExactPools(idx, tok, filtered, by_org, rng)
+        high = [j for s, j in pools.high()[:4] if s > 0]
+        medium, _ = pools.medium_low()
+        out[idx] = (high, {j for _, j in medium})
+    return out, time.perf_counter() - t0
+
+
+def run_rows(anchors, filtered, tok, by_org):
+    # المسار المتجّه لازم يطلع نفس قوائم ExactPools بالظبط
+    rng_e, rng_r = random.Random(0), random.Random(0)
+    t0 = time.perf_counter()
+    rows = g.build_rows(tok, filtered, batch=1)   # anchors متفرقة → من غير batching
+    t_build = time.perf_counter() - t0
+    t_rows = t_sets = 0.0
+    mismatches = 0
+    for idx in sorted(anchors):
+        t1 = time.perf_counter()
+        pools = g.RowPools(idx, tok, filtered, by_org, *rows, rng=rng_r)
+        got = (pools.high(), pools.medium_low(), pools.high_fallback(),
+               pools.medium_fallback(), pools.low_fallback())
+        t_rows += time.perf_counter() - t1
+        t1 = time.perf_counter()
+        ref = g.ExactPools(idx, tok, filtered, by_org, rng_e)
+        want = (ref.high(), ref.medium_low(), ref.high_fallback(),
+                ref.medium_fallback(), ref.low_fallback())
+        t_sets += time.perf_counter() - t1
+        mismatches += got != want
+    return t_rows, t_sets, t_build, mismatches
+
+
+def run_lsh(anchors, filtered, tok, by_org, bands, rows):
+    rng = random.Random(0)
+    out = {}
+    t0 = time.perf_counter()
+    lsh = g.build_lsh(tok, bands, rows)
+    t_build = time.perf_counter() - t0
+    for idx in anchors:
+        pools = g.LSHPools(idx, tok, filtered, by_org, lsh, rng)
+        high = [j for s, j in islice(pools.high(), 4) if s > 0]
+        medium, low = pools.medium_low()
+        list(islice(low, 4))
+        out[idx] = (high, {j for _, j in medium})
+    return out, time.perf_counter() - t0, t_build
+
+
+def compare(exact, approx):
+    recall_num = recall_den = high_hit = high_den = enough_e = enough_a = 0
+    for idx, (e_high, e_med) in exact.items():
+        a_high, a_med = approx[idx]
+        recall_num += len(e_med & a_med)
+        recall_den += len(e_med)
+        high_hit += len(set(e_high) & set(a_high))
+        high_den += len(e_high)
+        enough_e += len(e_med) >= 4
+        enough_a += len(a_med) >= 4
+    n = len(exact)
+    return {
+        "medium_recall": recall_num / recall_den if recall_den else 1.0,
+        "high@4": high_hit / high_den if high_den else 1.0,
+        "medium>=4 exact": enough_e / n,
+        "medium>=4 lsh": enough_a / n,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repos", type=int, default=5000)
+    ap.add_argument("--anchors", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--settings", default="8x1,16x1,32x1,64x1,32x2",
+                    help="bands x rows مفصولين بفاصلة")
+    args = ap.parse_args()
+
+    filtered, tok, by_org = prepare(args.repos, args.seed)
+    anchors = random.Random(args.seed).sample(range(len(filtered)), min(args.anchors, len(filtered)))
+    exact, t_exact = run_exact(anchors, filtered, tok, by_org)
+    print(f"repos={args.repos} anchors={len(anchors)}")
+    print(f"exact: {t_exact / len(anchors) * 1000:.2f} ms/anchor")
+    t_rows, t_sets, t_build, mismatches = run_rows(anchors, filtered, tok, by_org)
+    print(f"all five pools: sets {t_sets / len(anchors) * 1000:.2f} ms/anchor, "
+          f"rows (numpy) {t_rows / len(anchors) * 1000:.2f} ms/anchor "
+          f"(build {t_build:.2f}s), mismatches={mismatches}")
+    for setting in args.settings.split(","):
+        bands, rows = (int(x) for x in setting.split("x"))
+        approx, t_lsh, t_build = run_lsh(anchors, filtered, tok, by_org, bands, rows)
+        per_anchor = (t_lsh - t_build) / len(anchors) * 1000
+        stats = "  ".join(f"{k}={v:.3f}" for k, v in compare(exact, approx).items())
+        print(f"lsh {bands}x{rows}: build {t_build:.2f}s, {per_anchor:.2f} ms/anchor  {stats}")
+
+
+if __name__ == "__main__":
+    main()
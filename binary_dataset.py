@@ -0,0 +1,185 @@
+import mmap
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+# صيغة binary للداتاسيت: قراية أي record بـ mmap من غير parse للباقي
+#
+#   header   magic + version (16 بايت)
+#   heap     نصوص UTF-8 ورا بعض، كل نص مختلف مرة واحدة
+#   records  لكل record: u32 string IDs  [query, description, ground_truth, n_high, n_medium, n_low, ...relevance]
+#   strings  u64 × (S+1): بداية كل نص في الـ heap (والأخير = طول الـ heap)
+#   offsets  u64 × (R+1): بداية كل record في الـ records (بالـ u32)
+#   footer   S, R + مكان كل section + magic تاني (بيتقري من آخر الملف)
+# كل الأرقام little-endian، والـ sections اللي فيها أرقام متظبطة على 8 بايت.
+
+MAGIC = b"SDSBIN\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sI4x")
+FOOTER = struct.Struct("<QQQQQQ8s")
+SCALARS = ("query", "description", "ground_truth")
+LISTS = ("high_relevance", "medium_relevance", "low_relevance")
+# أماكن الـ query والـ description والعدادات في الـ record (الباقي projects)
+_NOT_PROJECTS = (0, 1) + tuple(range(len(SCALARS), len(SCALARS) + len(LISTS)))
+
+
+def is_binary(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _words(values):
+    row = array("I", values)
+    if sys.byteorder == "big":
+        row.byteswap()
+    return row
+
+
+def _pad(f, align=8):
+    f.write(b"\0" * (-f.tell() % align))
+
+
+def write_binary(records, path):
+    """records (نفس schema الـ JSON) → ملف binary؛ بيرجع عدد الـ records."""
+    ids = {}
+    str_off = array("Q", [0])
+    rec_off = array("Q", [0])
+    tmp = path + ".tmp"
+    try:
+        # الـ heap بيتكتب في الملف على طول والـ records في ملف مؤقت لحد ما الـ heap يخلص
+        with open(tmp, "wb") as f, tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as spool:
+            f.write(HEADER.pack(MAGIC, VERSION))
+
+            def sid(s):
+                i = ids.get(s)
+                if i is None:
+                    f.write(s.encode("utf-8"))
+                    i = ids[s] = len(str_off) - 1
+                    str_off.append(f.tell() - HEADER.size)
+                return i
+
+            words = 0
+            for n, r in enumerate(records, 1):
+                try:
+                    lists = [r[k] for k in LISTS]
+                    row = [sid(r[k]) for k in SCALARS] + [len(x) for x in lists]
+                    row.extend(sid(s) for x in lists for s in x)
+                except (KeyError, TypeError, AttributeError) as e:
+                    raise ValueError(f"record {n} does not match the dataset schema: {e!r}") from None
+                spool.write(_words(row).tobytes())
+                words += len(row)
+                rec_off.append(words)
+
+            _pad(f)
+            rec_base = f.tell()
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            _pad(f)
+            str_base = f.tell()
+            for offsets in (str_off, rec_off):
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                f.write(offsets.tobytes())
+            off_base = str_base + 8 * len(str_off)
+            f.write(FOOTER.pack(len(ids), len(rec_off) - 1, HEADER.size, rec_base, str_base, off_base, MAGIC))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return len(rec_off) - 1
+
+
+class BinaryDataset:
+    """reader بـ mmap: len / [i] / [a:b] / sample / iter، وكل record بيتفك لوحده وقت ما يتطلب."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = None
+        if os.fstat(self._f.fileno()).st_size < HEADER.size + FOOTER.size:
+            self.close()
+            raise ValueError(f"{path}: not a binary dataset")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self._mm, 0)
+        n_str, n_rec, self._heap, rec_base, str_base, off_base, tail = \
+            FOOTER.unpack_from(self._mm, len(self._mm) - FOOTER.size)
+        if magic != MAGIC or tail != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a binary dataset")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported binary dataset version {version}")
+        self._str_off = np.frombuffer(self._mm, "<u8", n_str + 1, str_base)
+        self._rec_off = np.frombuffer(self._mm, "<u8", n_rec + 1, off_base)
+        self._words = np.frombuffer(self._mm, "<u4", int(self._rec_off[-1]), rec_base)
+
+    def __len__(self):
+        return len(self._rec_off) - 1
+
+    def string(self, i):
+        a, b = self._str_off[i:i + 2].tolist()
+        return self._mm[self._heap + a:self._heap + b].decode("utf-8")
+
+    def _record(self, i):
+        a, b = self._rec_off[i:i + 2].tolist()
+        row = self._words[a:b].tolist()
+        s = self.string
+        record = {k: s(row[j]) for j, k in enumerate(SCALARS)}
+        pos = len(SCALARS) + len(LISTS)
+        for k, count in zip(LISTS, row[len(SCALARS):pos]):
+            record[k] = [s(x) for x in row[pos:pos + count]]
+            pos += count
+        return record
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._record(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._record(i)
+
+    def __iter__(self):
+        return (self._record(i) for i in range(len(self)))
+
+    def sample(self, k, rng=random):
+        return [self._record(i) for i in rng.sample(range(len(self)), k)]
+
+    def project_ids(self):
+        """IDs كل ground_truth / relevance مختلف بترتيب أول ظهور (من الـ u32 بس، من غير decode)."""
+        if not len(self):
+            return np.empty(0, dtype=np.uint32)
+        starts = self._rec_off[:-1].astype(np.int64)
+        keep = np.ones(len(self._words), dtype=bool)
+        for j in _NOT_PROJECTS:
+            keep[starts + j] = False
+        ids = self._words[keep]
+        uniq, first = np.unique(ids, return_index=True)
+        return uniq[np.argsort(first, kind="stable")]
+
+    def projects(self):
+        return [self.string(i) for i in self.project_ids().tolist()]
+
+    def close(self):
+        # الـ numpy views لازم تتشال قبل ما الـ mmap يتقفل
+        self._str_off = self._rec_off = self._words = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
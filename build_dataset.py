@@ -4,11 +4,27 @@ import json
 import random
 import sys
 
+import instrument
+from dataset_io import ShardWriter, iter_records, iter_repos, open_output
+from prep_cache import finish, lookup, open_cache
+from relevance_index import RelevanceIndex
+from seen_filter import SeenFilter, SeenSet
+
 # --- الإعدادات الرئيسية ---
-INPUT_FILE = "github_repos.json"
+INPUT_FILE = os.getenv("REPOS_FILE", "github_repos.json")  # JSON array أو JSONL، عادي أو gzip
 OUTPUT_FILE = "service_discovery_dataset.json"
 TARGET_RECORDS = int(os.getenv("DATASET_SIZE", "210"))
 MINIMUM_RECORDS = int(os.getenv("MIN_DATASET_SIZE", "200"))
+# "json": ملف منسق في الآخر | "jsonl": shards بتتكتب record ورا record
+OUTPUT_FORMAT = os.getenv("OUT_FORMAT", "json")
+SHARD_SIZE = int(os.getenv("SHARD_SIZE", "0"))
+OUTPUT_GZIP = os.getenv("OUT_GZIP", "0") == "1"
+# نصوص تشغيلات تانية مش هتتكرر هنا (شوف seen_filter.py)؛ فاضي = جوه التشغيل ده بس
+SEEN_FILE = os.getenv("SEEN_FILE", "")
+# METRICS=1: وقت كل مرحلة وسبب رفض كل anchor (شوف instrument.py)
+METRICS = instrument.from_env()
+METRICS_JSON = os.getenv("METRICS_JSON", "build_metrics.json")
+METRICS_PROM = os.getenv("METRICS_PROM", "build_metrics.prom")
 
 # --- إعدادات جودة النصوص ---
 QUERY_MIN_LEN = 80
@@ -18,7 +34,8 @@ GT_MAX_LEN = 500
 REL_MIN_LEN = 80
 REL_MAX_LEN = 300
 
-random.seed(42)
+SEED = 42
+random.seed(SEED)
 
 # --- دوال مساعدة ---
 def normalize_text(s: str) -> str:
@@ -56,33 +73,33 @@ def create_long_snippet(sentences, min_len, max_len):
             return buffer
     return ""
 
-# --- بناء السجل ---
-def build_entry(anchor_repo, repo_pool, used_texts):
-    if "full_name" not in anchor_repo:
-        return None
+# --- نصوص كل repo (بتتحسب مرة واحدة، ومن الـ prep cache لو الـ repo ما اتغيرش) ---
+# مفتاح الـ prep cache: أي تغيير في normalize_text / get_sentences لازم يغيّر الـ version
+PREP_KIND = "build:1"
 
-    # 1. query
-    query_candidates = get_sentences(anchor_repo.get("readme", "")) + get_sentences(anchor_repo.get("description", ""))
-    query = create_long_snippet(query_candidates, QUERY_MIN_LEN, QUERY_MAX_LEN)
-    if not query or query in used_texts:
-        return None
-    used_texts.add(query)
+def repo_prep(repo):
+    """(جُمل الـ README، جُمل الـ description، [الـ description متنضف])"""
+    desc = repo.get("description", "")
+    return get_sentences(repo.get("readme", "")), get_sentences(desc), [normalize_text(desc)]
 
-    # 2. ground_truth (مقدمة + snippet لضمان الطول)
-    gt_candidates = get_sentences(anchor_repo.get("description", "")) + get_sentences(anchor_repo.get("readme", ""))
-    snippet = create_long_snippet(gt_candidates, 50, GT_MAX_LEN - 100)
-    ground_truth = (
-        f"The repository {anchor_repo['full_name']} is a project that "
-        f"{normalize_text(anchor_repo.get('description', ''))}. {snippet}"
-    )
-    ground_truth = normalize_text(ground_truth)
+class RepoTexts:
+    """repo_prep لكل repo أول مرة يتطلب بس (الـ anchors والمرشحين بيتكرروا كتير)."""
 
-    if len(ground_truth) < GT_MIN_LEN or ground_truth in used_texts:
-        used_texts.discard(query)
-        return None
-    used_texts.add(ground_truth)
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.memo = {}
+
+    def __call__(self, repo):
+        t = self.memo.get(id(repo))
+        if t is None:
+            t = self.memo[id(repo)] = lookup(self.cache, PREP_KIND,
+                                             (repo.get("description", ""), repo.get("readme", "")),
+                                             lambda: repo_prep(repo))
+        return t
 
-    # 3. بناء قوائم الصلة
+# --- مرشحين الصلة ---
+def scan_candidates(anchor_repo, repo_pool):
+    # المسار المرجعي: scan على الـ pool كله لكل anchor (RelevanceIndex بيطلع نفس القوائم)
     def find_relevance_candidates(logic_func):
         candidates = []
         for repo in repo_pool:
@@ -90,7 +107,6 @@ def build_entry(anchor_repo, repo_pool, used_texts):
                 continue
             if logic_func(anchor_repo, repo):
                 candidates.append(repo)
-        random.shuffle(candidates)
         return candidates
 
     high_candidates = find_relevance_candidates(
@@ -102,6 +118,47 @@ def build_entry(anchor_repo, repo_pool, used_texts):
     low_candidates = find_relevance_candidates(
         lambda a, r: a.get("org") != r.get("org") and not set(a.get("topics", [])) & set(r.get("topics", []))
     )
+    return high_candidates, medium_candidates, low_candidates
+
+# --- بناء السجل ---
+def build_entry(anchor_repo, repo_pool, used_texts, index=None, metrics=instrument.NULL, texts=repo_prep):
+    if "full_name" not in anchor_repo:
+        metrics.reject("no_full_name")
+        return None
+    readme_sents, desc_sents, (description,) = texts(anchor_repo)
+
+    # 1. query
+    query_candidates = readme_sents + desc_sents
+    query = create_long_snippet(query_candidates, QUERY_MIN_LEN, QUERY_MAX_LEN)
+    if not query or query in used_texts:
+        metrics.reject("duplicate_query" if query else "no_query")
+        return None
+    used_texts.add(query)
+
+    # 2. ground_truth (مقدمة + snippet لضمان الطول)
+    gt_candidates = desc_sents + readme_sents
+    snippet = create_long_snippet(gt_candidates, 50, GT_MAX_LEN - 100)
+    ground_truth = (
+        f"The repository {anchor_repo['full_name']} is a project that "
+        f"{description}. {snippet}"
+    )
+    ground_truth = normalize_text(ground_truth)
+
+    if len(ground_truth) < GT_MIN_LEN or ground_truth in used_texts:
+        metrics.reject("short_ground_truth" if len(ground_truth) < GT_MIN_LEN else "duplicate_ground_truth")
+        used_texts.discard(query)
+        return None
+    used_texts.add(ground_truth)
+
+    # 3. بناء قوائم الصلة (من الـ index لو موجود، وإلا scan على الـ pool كله)
+    with metrics.time("candidates"):
+        if index is not None:
+            high_candidates, medium_candidates, low_candidates = index.candidates(anchor_repo)
+        else:
+            high_candidates, medium_candidates, low_candidates = scan_candidates(anchor_repo, repo_pool)
+        random.shuffle(high_candidates)
+        random.shuffle(medium_candidates)
+        random.shuffle(low_candidates)
 
     # 4. اختيار 4 جمل فريدة لكل مستوى
     def pick_sentences(candidates, count, fallback_pools):
@@ -111,7 +168,8 @@ def build_entry(anchor_repo, repo_pool, used_texts):
             for repo in pool:
                 if len(sentences) >= count:
                     break
-                sent_candidates = get_sentences(repo.get("readme", "")) + get_sentences(repo.get("description", ""))
+                readme_s, desc_s, _ = texts(repo)
+                sent_candidates = readme_s + desc_s
                 sentence = create_long_snippet(sent_candidates, REL_MIN_LEN, REL_MAX_LEN)
                 if sentence and sentence not in used_texts:
                     sentences.add(sentence)
@@ -120,11 +178,17 @@ def build_entry(anchor_repo, repo_pool, used_texts):
                 break
         return list(sentences)[:count]
 
-    high_relevance = pick_sentences(high_candidates, 4, [medium_candidates, low_candidates, repo_pool])
-    medium_relevance = pick_sentences(medium_candidates, 4, [high_candidates, low_candidates, repo_pool])
-    low_relevance = pick_sentences(low_candidates, 4, [medium_candidates, high_candidates, repo_pool])
+    with metrics.time("pick.high"):
+        high_relevance = pick_sentences(high_candidates, 4, [medium_candidates, low_candidates, repo_pool])
+    with metrics.time("pick.medium"):
+        medium_relevance = pick_sentences(medium_candidates, 4, [high_candidates, low_candidates, repo_pool])
+    with metrics.time("pick.low"):
+        low_relevance = pick_sentences(low_candidates, 4, [medium_candidates, high_candidates, repo_pool])
 
     if not (len(high_relevance) == 4 and len(medium_relevance) == 4 and len(low_relevance) == 4):
+        short = next(t for t, lst in (("high", high_relevance), ("medium", medium_relevance),
+                                      ("low", low_relevance)) if len(lst) < 4)
+        metrics.reject(f"short_{short}")
         used_texts.discard(query)
         used_texts.discard(ground_truth)
         for s in high_relevance + medium_relevance + low_relevance:
@@ -133,23 +197,16 @@ def build_entry(anchor_repo, repo_pool, used_texts):
 
     return {
         "query": query,
-        "description": normalize_text(anchor_repo.get("description", "")) or f"A repository named {anchor_repo['full_name']}.",
+        "description": description or f"A repository named {anchor_repo['full_name']}.",
         "ground_truth": ground_truth,
         "high_relevance": high_relevance,
         "medium_relevance": medium_relevance,
         "low_relevance": low_relevance
     }
 
-# --- التشغيل الرئيسي ---
-def main():
-    if not os.path.exists(INPUT_FILE):
-        print(f"❌ Error: '{INPUT_FILE}' not found.", file=sys.stderr)
-        sys.exit(1)
-
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        repos = json.load(f)
+REPO_FIELDS = ("full_name", "description", "readme", "topics", "org")
 
-    # فلترة repos
+def filter_repos(repos):
     usable_repos = []
     for r in repos:
         r["full_name"] = r.get("full_name", "unknown/repo")
@@ -160,6 +217,34 @@ def main():
             if "org" not in r or not r["org"]:
                 r["org"] = r["full_name"].split('/')[0]
             usable_repos.append(r)
+    return usable_repos
+
+def build_records(usable_repos, dataset, used_texts):
+    # dataset: أي حاجة فيها append و len (list / ShardWriter / sink الـ pipeline)
+    random.shuffle(usable_repos)
+    with METRICS.time("index"):
+        index = RelevanceIndex(usable_repos)
+    with METRICS.time("prep_cache.load"):
+        texts = RepoTexts(open_cache())
+    with METRICS.time("build"):
+        for anchor_repo in usable_repos:
+            if len(dataset) >= TARGET_RECORDS:
+                break
+            METRICS.count("anchors")
+            entry = build_entry(anchor_repo, usable_repos, used_texts, index, METRICS, texts)
+            if entry:
+                dataset.append(entry)
+    finish(texts.cache, METRICS)
+
+# --- التشغيل الرئيسي ---
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Error: '{INPUT_FILE}' not found.", file=sys.stderr)
+        sys.exit(1)
+
+    # فلترة repos وهي بتتقري (stream) بالحقول اللي محتاجينها بس
+    with METRICS.time("filter"):
+        usable_repos = filter_repos(iter_repos(INPUT_FILE, keep=REPO_FIELDS))
 
     print(f"Found {len(usable_repos)} usable repositories.")
 
@@ -167,26 +252,39 @@ def main():
         print(f"❌ Error: Not enough usable repos.", file=sys.stderr)
         sys.exit(1)
 
-    dataset = []
-    used_texts = set()
-    random.shuffle(usable_repos)
-
-    for anchor_repo in usable_repos:
-        if len(dataset) >= TARGET_RECORDS:
-            break
-        entry = build_entry(anchor_repo, usable_repos, used_texts)
-        if entry:
-            dataset.append(entry)
+    dataset = open_output(OUTPUT_FILE, OUTPUT_FORMAT, SHARD_SIZE, OUTPUT_GZIP)
+    seen = SeenFilter(SEEN_FILE) if SEEN_FILE else None
+    used_texts = SeenSet(seen)
+    ok = False
+    try:
+        build_records(usable_repos, dataset, used_texts)
+        ok = True
+    finally:
+        if isinstance(dataset, ShardWriter):
+            dataset.close(ok)
+        summary = METRICS.write("build_dataset", METRICS_JSON, METRICS_PROM, records=len(dataset))
+        if summary:
+            top = ", ".join(f"{k}={v}" for k, v in list(summary["rejections"].items())[:5])
+            print(f"📊 metrics → {METRICS_JSON}, {METRICS_PROM} (rejected: {top or 'none'})")
 
     if len(dataset) < MINIMUM_RECORDS:
         print(f"⚠️ Warning: Only built {len(dataset)} records (<{MINIMUM_RECORDS}).", file=sys.stderr)
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(dataset, f, indent=2, ensure_ascii=False)
+    if isinstance(dataset, ShardWriter):
+        saved_to = f"{dataset.out_dir}/ ({len(dataset.shards)} shards)"
+    else:
+        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+            json.dump(dataset, f, indent=2, ensure_ascii=False)
+        saved_to = OUTPUT_FILE
+
+    if seen is not None:
+        # بعد ما الناتج اتكتب كامل بس
+        seen.add_records(iter_records(dataset.out_dir) if isinstance(dataset, ShardWriter) else dataset)
+        print(f"🧷 {SEEN_FILE}: {seen.save()} texts used across runs")
 
     print(f"✅ Successfully built dataset with {len(dataset)} records.")
     print(f"   Total unique snippets used: {len(used_texts)}")
-    print(f"   Dataset saved to '{OUTPUT_FILE}'")
+    print(f"   Dataset saved to '{saved_to}'")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,135 @@
+import json
+import os
+import queue
+import shutil
+import threading
+
+# checkpoint/resume لـ generate_dataset
+# الفولدر فيه:
+#   records.jsonl   السجلات اللي اتعملها commit بالترتيب (append)
+#   leaked.jsonl    جُمل relevance اتاخدت في anchors اترفضت (مش موجودة في أي سجل بس لازم تفضل used)
+#   state.json      الـ cursor + عدد السطور والبايتات الصالحة في الملفين (بيتكتب atomic بعد fsync)
+# الـ used sets بتتبني تاني من السجلات + leaked، والـ RNG مش محتاج يتحفظ: كل anchor ليه RNG
+# من رقمه (anchor_rng) وترتيب الـ repos بييجي من random.seed(SEED) + نفس الملف.
+# الكتابة كلها في thread لوحدها، فالتوليد مش بيستنى الديسك.
+
+STATE = "state.json"
+RECORDS = "records.jsonl"
+LEAKED = "leaked.jsonl"
+
+
+def _line(obj):
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class CheckpointMismatch(ValueError):
+    pass
+
+
+class Checkpointer:
+    def __init__(self, root, config, every=1000):
+        self.root = root
+        self.config = config
+        self.every = every
+        self.cursor = 0
+        self.records = 0
+        self.leaked = 0
+        self._since = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._error = None
+
+    # --- resume ---
+    def load(self):
+        """(cursor, records, leaked) من آخر checkpoint، والملفات بتتقص لحد آخر حالة صالحة."""
+        with open(os.path.join(self.root, STATE), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state["config"] != self.config:
+            diff = sorted(k for k in set(state["config"]) | set(self.config)
+                          if state["config"].get(k) != self.config.get(k))
+            raise CheckpointMismatch(f"checkpoint in {self.root} was made with different settings: {diff}")
+        records = self._read(RECORDS, state["records_bytes"], state["records"])
+        leaked = self._read(LEAKED, state["leaked_bytes"], state["leaked"])
+        self.cursor, self.records, self.leaked = state["cursor"], len(records), len(leaked)
+        return self.cursor, records, leaked
+
+    def _read(self, name, size, count):
+        path = os.path.join(self.root, name)
+        with open(path, "r+b") as f:
+            f.truncate(size)   # اللي اتكتب بعد آخر state ممكن يكون ناقص، وهيتولد تاني
+            f.seek(0)
+            items = [json.loads(line) for line in f]
+        if len(items) != count:
+            raise CheckpointMismatch(f"{path}: expected {count} lines, found {len(items)}")
+        return items
+
+    # --- أثناء التوليد ---
+    def start(self, fresh=True):
+        if fresh:
+            shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def commit(self, idx, example, relevance_added):
+        """anchor رقم idx خلص (اتقبل أو اترفض)؛ relevance_added = جُمل relevance اللي اتاخدت فيه."""
+        if self._error:
+            raise self._error
+        if example:
+            self.records += 1
+            self._queue.put((RECORDS, example))
+        elif relevance_added:
+            self.leaked += len(relevance_added)
+            self._queue.put((LEAKED, list(relevance_added)))
+        self.cursor = idx + 1
+        self._since += 1
+        if self._since >= self.every:
+            self.save()
+
+    def save(self):
+        self._since = 0
+        self._queue.put((STATE, {"cursor": self.cursor, "records": self.records, "leaked": self.leaked}))
+
+    def close(self):
+        # آخر checkpoint عند آخر anchor خلص (حتى لو التشغيل اتقطع بـ exception)
+        if self._thread is None:
+            return
+        self.save()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._error:
+            raise self._error
+
+    def remove(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _writer(self):
+        files = {name: open(os.path.join(self.root, name), "ab") for name in (RECORDS, LEAKED)}
+        try:
+            for item in iter(self._queue.get, None):
+                name, payload = item
+                if name == RECORDS:
+                    files[RECORDS].write(_line(payload))
+                elif name == LEAKED:
+                    files[LEAKED].writelines(_line(s) for s in payload)
+                else:
+                    self._write_state(files, payload)
+        except Exception as e:   # بيتعمله raise في الـ thread الرئيسي في الـ commit الجاي
+            self._error = e
+        finally:
+            for f in files.values():
+                f.close()
+
+    def _write_state(self, files, state):
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        state = dict(state, config=self.config,
+                     records_bytes=files[RECORDS].tell(), leaked_bytes=files[LEAKED].tell())
+        path = os.path.join(self.root, STATE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
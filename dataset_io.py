@@ -0,0 +1,504 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+
+from binary_dataset import BinaryDataset, is_binary, write_binary
+
+# قراية الملفات الكبيرة (github_repos.json / الداتاسيت) كـ stream بدل json.load
+# - JSON array: بيتقري على أجزاء وكل عنصر بيتعمله decode لوحده
+# - JSONL / NDJSON: سطر = record
+# - أي واحد فيهم ممكن يكون gzip أو zstd (بنعرفه من الـ magic bytes مش من الامتداد)
+# - أو الصيغة الـ binary (binary_dataset.py) بالـ magic بتاعها برضه
+
+CHUNK = 1 << 16
+_WS = " \t\r\n"
+MANIFEST = "manifest.json"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _zstd():
+    # zstandard اختياري: gzip (stdlib) كفاية لو مش متسطب
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("❌ zstandard مش متسطب (pip install zstandard) — استخدم gzip") from None
+    return zstandard
+
+
+def open_text(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if magic == ZSTD_MAGIC:
+        reader = _zstd().ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _first_char(f):
+    while True:
+        ch = f.read(1)
+        if not ch or ch not in _WS:
+            return ch
+
+
+def _iter_array(f):
+    dec = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    want = CHUNK
+
+    def fill():
+        nonlocal buf, pos, eof, want
+        data = f.read(want)
+        if not data:
+            eof = True
+        buf = buf[pos:] + data
+        pos = 0
+
+    while True:
+        while True:
+            while pos < len(buf) and (buf[pos] in _WS or buf[pos] == ","):
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # عنصر أكبر من اللي في الـ buffer (README طويل) → اقرا أكتر، وضاعف عشان ما نعيدش decode كتير
+            want = min(want * 2, 1 << 26)
+            fill()
+            continue
+        if end == len(buf) and not eof:
+            # رقم في آخر الـ buffer ممكن يكون ناقص
+            fill()
+            continue
+        want = CHUNK
+        pos = end
+        yield obj
+        if pos > CHUNK:
+            buf, pos = buf[pos:], 0
+
+
+def _iter_lines(f, first):
+    line_no = 0
+    for line in _prepend(first, f):
+        line_no += 1
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_no}: {e}") from None
+
+
+def _prepend(first, f):
+    # الحرف اللي اتقرا عشان نعرف النوع يرجع لأول سطر
+    rest = f.readline()
+    yield first + rest
+    yield from f
+
+
+def read_manifest(path):
+    # path = فولدر الـ shards أو الـ manifest نفسه
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST)
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return os.path.dirname(path), manifest
+
+
+def shard_paths(path):
+    base, manifest = read_manifest(path)
+    return [os.path.join(base, s["name"]) for s in manifest["shards"]]
+
+
+def iter_records(path):
+    """كل record في الملف واحد ورا التاني (JSON array أو JSONL، عادي أو gzip، فولدر shards، أو binary)."""
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST:
+        for shard in shard_paths(path):
+            yield from iter_records(shard)
+        return
+    if is_binary(path):
+        with BinaryDataset(path) as ds:
+            yield from ds
+        return
+    with open_text(path) as f:
+        first = _first_char(f)
+        if not first:
+            return
+        if first == "[":
+            yield from _iter_array(f)
+        elif first == "{":
+            yield from _iter_lines(f, first)
+        else:
+            raise ValueError(f"{path}: expected a JSON array or JSON lines, got {first!r}")
+
+
+def follow_records(path, poll=1.0, idle=3900):
+    """records الـ shards اللي خلصت أول ما تظهر في الـ manifest، لحد ما الكاتب يعلّمه complete
+    (القارئ بيشتغل والـ crawl لسه ماشي). manifest فيه "done" (KeyedShardWriter): shards الـ keys
+    اللي خلصت بس، لأن الـ key الناقص ممكن يتمسح ويتكتب تاني في الـ resume.
+    TimeoutError لو الـ manifest ما اتغيرش (أو ما ظهرش) idle ثانية: الكاتب وقع أو اتقفل ناقص.
+    الـ default ساعة + هامش لأن الـ crawl ممكن ينام window الـ rate limit كله."""
+    seen = set()   # (name, sha256): لو الكاتب اتعمله resume وكتب نفس الـ shard تاني ما يتقريش مرتين
+    last, changed = None, time.monotonic()
+    while True:
+        try:
+            base, manifest = read_manifest(path)
+        except (OSError, ValueError):   # لسه ما اتكتبش، أو بيتكتب
+            manifest = None
+        if manifest is not None:
+            if manifest != last:
+                last, changed = manifest, time.monotonic()
+            done = manifest.get("done")
+            done = None if done is None else set(done)
+            for shard in manifest["shards"]:
+                key = (shard["name"], shard["sha256"])
+                if key not in seen and (done is None or shard.get("key") in done):
+                    seen.add(key)
+                    yield from iter_records(os.path.join(base, shard["name"]))
+            if manifest.get("complete"):
+                return
+        if idle and time.monotonic() - changed > idle:
+            state = "never appeared" if last is None else "stopped changing before it was complete"
+            raise TimeoutError(f"{path}: manifest {state} ({idle:g}s)")
+        time.sleep(poll)
+
+
+def sniff(path):
+    """"lines" (JSONL أو فولدر shards) / "array" (JSON array) / "binary" / None لو الملف فاضي."""
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST:
+        return "lines"
+    if is_binary(path):
+        return "binary"
+    with open_text(path) as f:
+        first = _first_char(f)
+    return {"[": "array", "{": "lines", "": None}.get(first, "lines")
+
+
+def iter_raw_lines(path):
+    """سطور JSONL زي ما هي من غير decode (عشان الـ decode يتوزع على processes)."""
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST:
+        for shard in shard_paths(path):
+            yield from iter_raw_lines(shard)
+        return
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def iter_repos(path, keep=None, accept=None):
+    """repos بعد الفلترة على طول، ومعاها الحقول اللي المرحلة الجاية محتاجاها بس."""
+    return select_fields(iter_records(path), keep, accept)
+
+
+def select_fields(records, keep=None, accept=None):
+    # نفس iter_repos على أي stream (مثلًا repos جاية من الـ fetch على طول)
+    for r in records:
+        if not isinstance(r, dict):
+            continue
+        if keep is not None:
+            r = {k: r[k] for k in keep if k in r}
+        if accept is not None and not accept(r):
+            continue
+        yield r
+
+
+# --- الكتابة: JSONL مضغوط أو لا، مقسم على shards ---
+# كل record بيتكتب أول ما يتعمله commit، فلو الـ process مات الـ shards اللي خلصت بتفضل سليمة.
+# الـ shard بيتكتب باسم .tmp وبيتعمله rename لما يكمل، والـ manifest بيتحدّث بعد كل shard.
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _codec(compress):
+    # compress: False / True (= gzip) / "gzip" / "zstd"
+    if compress in (True, "gzip"):
+        return "gzip"
+    if compress == "zstd":
+        _zstd()   # يقع هنا قبل الشغل، مش عند أول shard
+        return "zstd"
+    if compress:
+        raise ValueError(f"unknown compression {compress!r} (expected gzip or zstd)")
+    return None
+
+
+SHARD_EXT = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+class _Shard:
+    """shard مفتوح: بيتكتب باسم .tmp، والـ close بيعمل rename وبيرجع الـ entry بتاعه في الـ manifest."""
+
+    def __init__(self, out_dir, name, codec):
+        self.name = name
+        self.path = os.path.join(out_dir, name)
+        self.count = 0
+        self._raw = None
+        tmp = self.path + ".tmp"
+        if codec is None:
+            self._f = open(tmp, "w", encoding="utf-8")
+        elif codec == "gzip":
+            # mtime=0 ومن غير اسم ملف في الـ header → نفس البايتات ونفس الـ checksum كل مرة
+            self._raw = open(tmp, "wb")
+            gz = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, mtime=0)
+            self._f = io.TextIOWrapper(gz, encoding="utf-8")
+        else:
+            self._raw = open(tmp, "wb")
+            zw = _zstd().ZstdCompressor(level=6).stream_writer(self._raw, closefd=False)
+            self._f = io.TextIOWrapper(zw, encoding="utf-8")
+
+    def write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._f.close()
+        if self._raw is not None:
+            self._raw.close()   # GzipFile / zstd writer مش بيقفلوا الـ fileobj اللي اتبعتلهم
+        os.replace(self.path + ".tmp", self.path)
+        return {
+            "name": self.name,
+            "records": self.count,
+            "bytes": os.path.getsize(self.path),
+            "sha256": file_sha256(self.path),
+        }
+
+    def discard(self):
+        self._f.close()
+        if self._raw is not None:
+            self._raw.close()
+        os.remove(self.path + ".tmp")
+
+
+class ShardWriter:
+    """sink بنفس واجهة list (append / len) بيكتب على shards بدل الذاكرة."""
+
+    def __init__(self, out_dir, shard_size=0, compress=False, prefix="part"):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.compress = compress
+        self.codec = _codec(compress)
+        self.prefix = prefix
+        self.shards = []
+        self.total = 0
+        self._shard = None
+        os.makedirs(out_dir, exist_ok=True)
+
+    def __len__(self):
+        return self.total
+
+    def append(self, record):
+        if self._shard is None or (self.shard_size and self._shard.count >= self.shard_size):
+            self._rotate()
+        self._shard.write(record)
+        self.total += 1
+
+    def _rotate(self):
+        self._finish()
+        name = f"{self.prefix}-{len(self.shards):05d}{SHARD_EXT[self.codec]}"
+        self._shard = _Shard(self.out_dir, name, self.codec)
+
+    def _finish(self):
+        if self._shard is None:
+            return
+        self.shards.append(self._shard.close())
+        self._shard = None
+        self.write_manifest()
+
+    def write_manifest(self, complete=False):
+        _atomic_write_json(os.path.join(self.out_dir, MANIFEST), {
+            "format": "jsonl",
+            "compressed": self.compress,
+            "shard_size": self.shard_size,
+            "records": sum(s["records"] for s in self.shards),
+            "complete": complete,
+            "shards": self.shards,
+        })
+
+    def close(self, ok=True):
+        # ok=False (الـ builder وقع أو الناتج ناقص): اللي اتكتب بيفضل في الـ manifest بس من غير complete
+        self._finish()
+        self.write_manifest(complete=ok)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(ok=exc_type is None)
+
+
+class KeyedShardWriter:
+    """shards منفصلة لكل key (مثلًا org)، وmanifest واحد للكل:
+    append(key, record) / finish(key) لما الـ key يخلص / close().
+    الـ manifest فيه الـ keys اللي خلصت ("done")، فـ resume=True بيكمل من غير ما يعيدها:
+    shards الـ keys اللي ما خلصتش بتتمسح وتتكتب تاني."""
+
+    def __init__(self, out_dir, shard_size=0, compress=False, resume=False):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.compress = compress
+        self.codec = _codec(compress)
+        self.shards = []
+        self.done = []
+        self.total = 0
+        self._open = {}     # key → _Shard
+        self._index = {}    # key → رقم الـ shard الجاي
+        os.makedirs(out_dir, exist_ok=True)
+        if resume:
+            self._resume()
+        # shards قديمة مش في الـ manifest ده (key ما خلصش، .tmp من crash، أو تشغيل قبله) بتتمسح
+        names = {s["name"] for s in self.shards}
+        for name in os.listdir(out_dir):
+            if name not in names and (name.endswith(".tmp") or name.endswith(tuple(SHARD_EXT.values()))):
+                os.remove(os.path.join(out_dir, name))
+        self.write_manifest()
+
+    def _resume(self):
+        try:
+            _, manifest = read_manifest(self.out_dir)
+        except (OSError, ValueError):
+            return
+        self.done = list(manifest.get("done", []))
+        keep = set(self.done)
+        self.shards = [s for s in manifest["shards"] if s.get("key") in keep]
+        self.total = sum(s["records"] for s in self.shards)
+
+    def __len__(self):
+        return self.total
+
+    def append(self, key, record):
+        shard = self._open.get(key)
+        if shard is not None and self.shard_size and shard.count >= self.shard_size:
+            self._close(key)
+            shard = None
+        if shard is None:
+            i = self._index.get(key, 0)
+            self._index[key] = i + 1
+            shard = self._open[key] = _Shard(self.out_dir, f"{key}-{i:05d}{SHARD_EXT[self.codec]}", self.codec)
+        shard.write(record)
+        self.total += 1
+
+    def _close(self, key):
+        entry = self._open.pop(key).close()
+        entry["key"] = key
+        self.shards.append(entry)
+        self.write_manifest()
+
+    def finish(self, key):
+        if key in self.done:
+            return
+        if key in self._open:
+            self._close(key)
+        self.done.append(key)
+        self.write_manifest()
+
+    def write_manifest(self, complete=False):
+        _atomic_write_json(os.path.join(self.out_dir, MANIFEST), {
+            "format": "jsonl",
+            "compressed": self.compress,
+            "shard_size": self.shard_size,
+            "records": sum(s["records"] for s in self.shards),
+            "complete": complete,
+            "done": self.done,
+            "shards": self.shards,
+        })
+
+    def close(self, ok=True):
+        # ok=False: الـ shards المفتوحة بتتشال (ناقصة) والـ manifest بيفضل incomplete
+        for key in list(self._open):
+            if ok:
+                self.finish(key)
+            else:
+                shard = self._open.pop(key)
+                self.total -= shard.count
+                shard.discard()
+        self.write_manifest(complete=ok)
+
+
+def open_output(path, fmt, shard_size=0, compress=False):
+    # "json": list عادية وبتتكتب JSON منسق في الآخر (زي الأول)
+    # "jsonl": ShardWriter في فولدر بنفس اسم الملف من غير .json
+    if fmt == "json":
+        return []
+    if fmt != "jsonl":
+        raise ValueError(f"unknown output format {fmt!r} (expected json or jsonl)")
+    return ShardWriter(os.path.splitext(path)[0], shard_size=shard_size, compress=compress)
+
+
+def write_json_array(records, out_path, indent=2):
+    """records → ملف JSON منسق بنفس شكل json.dump(indent=...)، record ورا record."""
+    count = 0
+    tmp = out_path + ".tmp"
+    pad = "\n" + " " * indent
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                body = json.dumps(record, ensure_ascii=False, indent=indent).replace("\n", pad)
+                f.write(("[" if count == 0 else ",") + pad + body)
+                count += 1
+            f.write("\n]" if count else "[]")
+    except BaseException:
+        # records ممكن يكون stream من مرحلة وقعت؛ ما نسيبش ملف ناقص
+        os.remove(tmp)
+        raise
+    os.replace(tmp, out_path)
+    return count
+
+
+def export_json(src, out_path):
+    """shards → ملف JSON منسق من غير ما كله يتحمل في الذاكرة."""
+    return write_json_array(iter_records(src), out_path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="أدوات ملفات الداتاسيت")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="shards/JSONL → JSON منسق")
+    ex.add_argument("src")
+    ex.add_argument("out")
+    pk = sub.add_parser("pack", help="JSON / JSONL / shards → binary (mmap)")
+    pk.add_argument("src")
+    pk.add_argument("out")
+    un = sub.add_parser("unpack", help="binary → JSON منسق (نفس شكل الـ builders)")
+    un.add_argument("src")
+    un.add_argument("out")
+    args = ap.parse_args()
+    if args.cmd == "export":
+        n = export_json(args.src, args.out)
+        print(f"✅ Exported {n} records → {args.out}")
+    elif args.cmd == "pack":
+        n = write_binary(iter_records(args.src), args.out)
+        print(f"✅ Packed {n} records → {args.out} ({os.path.getsize(args.out)} bytes)")
+    elif args.cmd == "unpack":
+        n = export_json(args.src, args.out)
+        print(f"✅ Unpacked {n} records → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,618 @@
 import os
 import json
+import sys
+import time
+import threading
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qs, urlencode, urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from dataset_io import KeyedShardWriter, write_json_array
+from http_cache import HTTPCache, cached_links
+from readme_store import README_MAX_CHARS, ReadmeStore, strip_markdown
 
 OUTPUT_FILE = "github_repos.json"
 ORGS = ["kubernetes", "hashicorp", "prometheus", "aws", "openstack", "microsoft"]
 
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-if not GITHUB_TOKEN:
-    raise RuntimeError("❌ Missing GITHUB_TOKEN environment variable!")
+# GITHUB_API بيتغير للـ stand-in المحلي (mock_github_server.py) في التجارب
+API = os.getenv("GITHUB_API", "https://api.github.com").rstrip("/")
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "5"))
+MAX_PAGES = int(os.getenv("MAX_PAGES", "0"))   # 0 = امشي ورا Link لحد الآخر
+PER_PAGE = 100
+# cache على الديسك بـ ETag (فاضي = من غير cache)؛ CACHE_MAX_AGE بالثواني لاستكمال crawl من غير requests
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CACHE_MAX_AGE = float(os.getenv("CACHE_MAX_AGE", "0"))
+# READMEs بتتخزن هنا بعنوان المحتوى (فاضي = من غير READMEs)
+README_DIR = os.getenv("README_DIR", ".readmes")
+# FETCH_BACKEND=graphql: الـ repos والـ topics والـ README في queries مجمعة لكل الـ orgs (fetch_all_graphql)
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "rest")
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL", API + "/graphql")
+GRAPHQL_BATCH = int(os.getenv("GRAPHQL_BATCH", "50"))              # repos لكل org في أول query
+GRAPHQL_MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "10"))        # أقصى rate-limit points للـ query
+GRAPHQL_TARGET_BYTES = int(os.getenv("GRAPHQL_TARGET_BYTES", str(4 << 20)))   # حجم الرد المستهدف
+GRAPHQL_RECORD = os.getenv("GRAPHQL_RECORD", "")   # JSONL بكل request/response (للـ replay في الـ mock)
+README_PATHS = ("README.md", "readme.md", "README.rst", "README.txt", "README")
+# FETCH_FORMAT=jsonl: الـ repos بتتكتب أول بأول في shards لكل org (فولدر github_repos/ بـ manifest)
+# بدل ملف JSON واحد في الآخر؛ القارئ يقدر يبدأ في الـ shards اللي خلصت (dataset_io.follow_records)
+FETCH_FORMAT = os.getenv("FETCH_FORMAT", "json")
+FETCH_COMPRESS = os.getenv("FETCH_COMPRESS", "gzip")             # gzip / zstd / فاضي
+FETCH_SHARD_SIZE = int(os.getenv("FETCH_SHARD_SIZE", "1000"))    # repos لكل shard (0 = shard واحد لكل org)
+FETCH_RESUME = os.getenv("FETCH_RESUME", "0") == "1"             # الـ orgs اللي خلصت في الـ manifest مش بتتعاد
+
+def github_headers():
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        raise RuntimeError("❌ Missing GITHUB_TOKEN environment variable!")
+    return {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github+json",
+        "User-Agent": "dataset-builder"
+    }
+
+def make_session(workers=FETCH_WORKERS):
+    # session واحدة بـ connection pool على قد الـ workers (keep-alive بدل اتصال جديد لكل صفحة)
+    session = requests.Session()
+    session.headers.update(github_headers())
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class RateLimiter:
+    """بيقرا X-RateLimit-* من كل رد، وبيوقف كل الـ threads لما الـ quota تخلص لحد الـ reset."""
+
+    def __init__(self, min_remaining=1, sleep=time.sleep, clock=time.time):
+        self.min_remaining = min_remaining
+        self.sleep = sleep
+        self.clock = clock
+        self.remaining = None
+        self.reset_at = 0.0
+        self.lock = threading.Lock()
+
+    def update(self, resp):
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset = resp.headers.get("X-RateLimit-Reset")
+        with self.lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = float(reset)
 
-HEADERS = {
-    "Authorization": f"token {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github+json",
-    "User-Agent": "dataset-builder"
-}
+    def wait(self):
+        with self.lock:
+            exhausted = self.remaining is not None and self.remaining < self.min_remaining
+            delay = self.reset_at - self.clock() if exhausted else 0
+            if exhausted and delay <= 0:
+                self.remaining = None   # الـ window اتجددت
+        if delay > 0:
+            print(f"   ⏳ rate limit reached, sleeping {delay:.0f}s until reset")
+            self.sleep(delay + 1)
 
-def fetch_org_repos(org, max_pages=5):
-    repos = []
-    for page in range(1, max_pages + 1):
-        url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}"
+    def backoff(self, resp, attempt):
+        # 403/429: Retry-After لو موجود، وإلا لحد الـ reset لو الـ quota خلصت، وإلا exponential
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif resp is not None and resp.headers.get("X-RateLimit-Remaining") == "0":
+            delay = max(0.0, float(resp.headers.get("X-RateLimit-Reset", 0)) - self.clock()) + 1
+        else:
+            delay = min(60, 2 ** attempt)
+        print(f"   ↻ backing off {delay:.0f}s (attempt {attempt + 1})")
+        self.sleep(delay)
+
+def page_url(org, page):
+    return f"{API}/orgs/{org}/repos?" + urlencode({"per_page": PER_PAGE, "page": page})
+
+def page_number(url):
+    return int(parse_qs(urlparse(url).query).get("page", ["1"])[0])
+
+def make_cache():
+    return HTTPCache(HTTP_CACHE_DIR, max_age=CACHE_MAX_AGE) if HTTP_CACHE_DIR else None
+
+def send(session, url, limiter, headers=None, retries=FETCH_RETRIES, method="GET", retry_5xx=True, **kw):
+    # آخر response (أو None لو الشبكة فشلت في كل المحاولات)؛ بيعيد على 403/429/5xx
+    # retry_5xx=False: الـ 5xx بيرجع على طول (GraphQL: timeout = query تقيلة، الحل batch أصغر مش إعادة)
+    for attempt in range(retries + 1):
+        limiter.wait()
         print(f"📡 Fetching: {url}")
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
-            # --- Debug logging ---
-            print(f"   ↳ Status: {resp.status_code}")
-            if resp.status_code != 200:
-                print(f"   ⚠️ Response: {resp.text[:300]}...")  # أول 300 كاركتر بس
-                break
+            resp = session.request(method, url, headers=headers, timeout=15, **kw)
+        except requests.RequestException as e:
+            print(f"   ❌ Error fetching {url}: {e}")
+            if attempt < retries:
+                limiter.backoff(None, attempt)
+            continue
+        limiter.update(resp)
+        print(f"   ↳ Status: {resp.status_code}")
+        if (resp.status_code in (403, 429) or (retry_5xx and resp.status_code >= 500)) and attempt < retries:
+            resp.close()
+            limiter.backoff(resp, attempt)
+            continue
+        return resp
+    return None
+
+def get_page(session, url, limiter, cache=None, retries=FETCH_RETRIES):
+    # بيرجع (data, links) أو (None, {}) لو الصفحة فشلت نهائيًا
+    entry = cache.get(url) if cache else None
+    if entry and cache.is_fresh(entry):
+        cache.stats.add(fresh=1, bytes_saved=len(entry["body"]))
+        return json.loads(entry["body"]), cached_links(entry)
+    headers = cache.conditional_headers(entry) if entry else {}
+    resp = send(session, url, limiter, headers, retries)
+    if resp is None:
+        return None, {}
+    if cache:
+        cache.stats.add(requests=1)
+    if resp.status_code == 304 and entry:
+        cache.touch(url, entry)
+        cache.stats.add(revalidated=1, bytes_saved=len(entry["body"]))
+        return json.loads(entry["body"]), cached_links(entry)
+    if resp.status_code == 200:
+        if cache:
+            cache.put(url, resp)
+        return resp.json(), resp.links
+    print(f"   ⚠️ Response: {resp.text[:300]}...")  # أول 300 كاركتر بس
+    return None, {}
+
+def repo_record(repo, org):
+    return {
+        "full_name": repo["full_name"],
+        "description": repo.get("description") or "",
+        "topics": repo.get("topics", []),
+        "org": org,
+        "readme": ""  # نجيبها بعدين
+    }
+
+def iter_pages(orgs, session=None, limiter=None, cache=None, workers=FETCH_WORKERS, max_pages=MAX_PAGES):
+    """صفحات كل الـ orgs بالتوازي: (org, repos, done, failed) أول ما الصفحات توصل، بترتيب الصفحات
+    جوه كل org (صفحة وصلت بدري بتستنى اللي قبلها)، وdone=True مع آخر دفعة للـ org؛ failed = عدد
+    صفحاته اللي فشلت نهائيًا (غير صفر = الـ org ناقص، ومع Link next الصفحات اللي بعدها ما اتطلبتش)."""
+    session = session or make_session(workers)
+    limiter = limiter or RateLimiter()
+    scheduled = {org: set() for org in orgs}
+    pending = Counter()
+    arrived = {org: {} for org in orgs}   # page → repos (فاضية لو الصفحة فشلت)
+    next_page = dict.fromkeys(orgs, 1)
+    failed = Counter()
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {}
+
+        def schedule(org, page, url):
+            if page in scheduled[org] or (max_pages and page > max_pages):
+                return
+            scheduled[org].add(page)
+            pending[org] += 1
+            futures[pool.submit(get_page, session, url, limiter, cache)] = (org, page)
+
+        for org in orgs:
+            schedule(org, 1, page_url(org, 1))
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                org, page = futures.pop(fut)
+                pending[org] -= 1
+                data, links = fut.result()
+                if data is None:
+                    failed[org] += 1
+                arrived[org][page] = [repo_record(repo, org) for repo in data or ()]
+                if data:
+                    if page == 1 and "last" in links:
+                        # Link بيقول آخر صفحة كام → اطلب الباقي كله مرة واحدة
+                        for p in range(2, page_number(links["last"]["url"]) + 1):
+                            schedule(org, p, page_url(org, p))
+                    elif "next" in links:
+                        nxt = links["next"]["url"]
+                        schedule(org, page_number(nxt), nxt)
+                ready = []
+                while next_page[org] in arrived[org]:
+                    ready.extend(arrived[org].pop(next_page[org]))
+                    next_page[org] += 1
+                finished = not pending[org]
+                if finished:
+                    for p in sorted(arrived[org]):
+                        ready.extend(arrived[org].pop(p))
+                if ready or finished:
+                    yield org, ready, finished, failed[org]
+
+class IncompleteFetch(RuntimeError):
+    """فيه orgs صفحاتها ما اتجابتش كلها؛ .failed = {org: صفحات فشلت}، و.repos = اللي اتجاب."""
+
+    def __init__(self, failed, repos):
+        super().__init__("❌ incomplete crawl: " + ", ".join(f"{org} ({n} failed)" for org, n in failed.items()))
+        self.failed = failed
+        self.repos = repos
+
+def collect(pages, orgs):
+    # {org: [repos]} من الـ stream، وIncompleteFetch لو أي org ناقص (عشان crawl ناقص ما يعدّيش على إنه كامل)
+    repos = {org: [] for org in orgs}
+    failed = {}
+    for org, records, done, n_failed in pages:
+        repos[org].extend(records)
+        if done and n_failed:
+            failed[org] = n_failed
+    if failed:
+        raise IncompleteFetch(failed, repos)
+    return repos
+
+def fetch_all(orgs, session=None, limiter=None, cache=None, workers=FETCH_WORKERS, max_pages=MAX_PAGES):
+    """كل صفحات كل الـ orgs بالتوازي. النتيجة: {org: [repos]} بترتيب الصفحات (IncompleteFetch لو صفحة فشلت)."""
+    return collect(iter_pages(orgs, session, limiter, cache, workers, max_pages), orgs)
+
+# --- GraphQL ---
+# query واحدة فيها alias لكل org لسه فيه صفحات (o0, o1, ...)، وكل org ليه cursor لوحده؛
+# كل repo بييجي بالـ description والـ topics والـ README blob (أول اسم موجود من README_PATHS)،
+# فمفيش request لكل README زي الـ REST.
+
+def graphql_query(n_orgs, readmes=True):
+    blobs = "".join(f'          readme{i}: object(expression: "HEAD:{p}") {{ ... on Blob {{ text }} }}\n'
+                    for i, p in enumerate(README_PATHS)) if readmes else ""
+    params = ", ".join(f"$login{i}: String!, $first{i}: Int!, $after{i}: String" for i in range(n_orgs))
+    orgs = "".join(
+        f"  o{i}: organization(login: $login{i}) {{\n"
+        f"    repositories(first: $first{i}, after: $after{i}, orderBy: {{field: CREATED_AT, direction: DESC}}) {{\n"
+        "      pageInfo { hasNextPage endCursor }\n"
+        "      nodes {\n"
+        "          nameWithOwner\n"
+        "          description\n"
+        "          repositoryTopics(first: 20) { nodes { topic { name } } }\n"
+        f"{blobs}"
+        "      }\n"
+        "    }\n"
+        "  }\n"
+        for i in range(n_orgs))
+    return f"query({params}) {{\n{orgs}  rateLimit {{ cost remaining resetAt }}\n}}\n"
 
-            data = resp.json()
-            if not data:
+def query_cost(n_orgs, first):
+    # حساب GitHub: عدد الـ requests اللي الـ connections محتاجاها / 100
+    # (repositories لكل org + repositoryTopics لكل repo)
+    return max(1, -(-(n_orgs + n_orgs * first) // 100))
+
+class BatchSizer:
+    """عدد الـ repos لكل org في الـ query الجاية: على قد GRAPHQL_MAX_COST، وبيتظبط بحجم الرد
+    (الـ README blobs هي التقيلة)، وبيتنص لو الـ query فشلت (GitHub بيرجع timeout للـ queries التقيلة)."""
+
+    def __init__(self, first=GRAPHQL_BATCH, max_cost=GRAPHQL_MAX_COST, target_bytes=GRAPHQL_TARGET_BYTES,
+                 lo=1, hi=PER_PAGE):
+        self.first = max(lo, min(hi, first))
+        self.max_cost = max_cost
+        self.target_bytes = target_bytes
+        self.lo, self.hi = lo, hi
+        self.largest_ok = 0
+
+    def size(self, n_orgs):
+        first = self.first
+        while first > self.lo and query_cost(n_orgs, first) > self.max_cost:
+            first -= 1
+        return first
+
+    def ok(self, first, nbytes):
+        # الرد الجاي ≈ نفس الحجم لكل repo: قرّب من الهدف، ومش أكتر من الضعف في المرة
+        self.largest_ok = max(self.largest_ok, nbytes)
+        scale = self.target_bytes / max(nbytes, 1)
+        self.first = max(self.lo, min(self.hi, int(first * min(2.0, scale * 0.8)) or 1))
+
+    def failed(self):
+        # الهدف بينزل لأكبر رد عدّى، عشان الـ batch ما يرجعش يكبر لنفس الحجم اللي وقع
+        if self.largest_ok:
+            self.target_bytes = min(self.target_bytes, self.largest_ok)
+        self.first = max(self.lo, self.first // 2)
+
+_RECORD_LOCK = threading.Lock()
+
+def _record_graphql(payload, resp):
+    line = {"query": payload["query"], "variables": payload["variables"],
+            "status": resp.status_code, "body": resp.text}
+    with _RECORD_LOCK, open(GRAPHQL_RECORD, "a", encoding="utf-8") as f:
+        f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+def post_graphql(session, query, variables, limiter, retries=FETCH_RETRIES):
+    """(data, حجم الرد, alias → error)؛ data = None لو الـ query كلها فشلت (HTTP، data null،
+    أو error مش متربط بـ alias). error على alias واحد (NOT_FOUND، FORBIDDEN لـ org عليه SAML /
+    IP allow list، ...) بيخص الـ org ده بس، والـ aliases التانية بتفضل سليمة."""
+    payload = {"query": query, "variables": variables}
+    resp = send(session, GRAPHQL_URL, limiter, retries=retries, method="POST", retry_5xx=False, json=payload)
+    if resp is None:
+        return None, 0, {}
+    if GRAPHQL_RECORD:
+        _record_graphql(payload, resp)
+    nbytes = len(resp.content)
+    if resp.status_code != 200:
+        print(f"   ⚠️ Response: {resp.text[:300]}...")
+        return None, nbytes, {}
+    body = resp.json()
+    alias_errors, errors = {}, []
+    for e in body.get("errors") or []:
+        alias = (e.get("path") or [None])[0]
+        if isinstance(alias, str) and alias.startswith("o") and alias[1:].isdigit():
+            alias_errors.setdefault(alias, e)
+        else:
+            errors.append(e)
+    if errors or body.get("data") is None:
+        print(f"   ⚠️ GraphQL: {(errors or [{}])[0].get('message', 'no data')}")
+        return None, nbytes, {}
+    return body["data"], nbytes, alias_errors
+
+def graphql_readme(node):
+    for i in range(len(README_PATHS)):
+        blob = node.get(f"readme{i}")
+        if blob and blob.get("text"):
+            return blob["text"]
+    return None
+
+def graphql_record(node, org):
+    # نفس شكل repo_record بتاع الـ REST
+    return {
+        "full_name": node["nameWithOwner"],
+        "description": node.get("description") or "",
+        "topics": [t["topic"]["name"] for t in (node.get("repositoryTopics") or {}).get("nodes", [])],
+        "org": org,
+        "readme": ""
+    }
+
+def iter_pages_graphql(orgs, session=None, limiter=None, store=None, sizer=None, max_pages=MAX_PAGES):
+    """زي iter_pages بس بـ GraphQL: (org, repos, done, failed) لكل org في كل query؛ لو store موجود
+    الـ READMEs بتتخزن فيه قبل ما الـ repos بتوعها تطلع."""
+    session = session or make_session(1)
+    limiter = limiter or RateLimiter()
+    sizer = sizer or BatchSizer()
+    limit = max_pages * PER_PAGE if max_pages else 0   # نفس عدد الـ repos اللي MAX_PAGES بيديه في الـ REST
+    counts = Counter()
+    cursors = {org: None for org in orgs}   # الـ orgs اللي لسه فيها صفحات
+    readmes = Counter()
+    queries = failures = 0
+    while cursors:
+        active = list(cursors)
+        first = sizer.size(len(active))
+        variables = {}
+        for i, org in enumerate(active):
+            variables.update({f"login{i}": org, f"first{i}": first, f"after{i}": cursors[org]})
+        data, nbytes, alias_errors = post_graphql(session, graphql_query(len(active), store is not None),
+                                                  variables, limiter)
+        queries += 1
+        if data is None:
+            failures += 1
+            if failures > FETCH_RETRIES:
+                print(f"   ❌ GraphQL gave up after {failures} failed queries: {', '.join(active)} incomplete")
+                for org in active:
+                    yield org, [], True, 1
                 break
-            for repo in data:
-                repos.append({
-                    "full_name": repo["full_name"],
-                    "description": repo.get("description") or "",
-                    "topics": repo.get("topics", []),
-                    "org": org,
-                    "readme": ""  # نجيبها بعدين
-                })
-        except Exception as e:
-            print(f"   ❌ Error fetching {org}, page {page}: {e}")
+            sizer.failed()
+            continue
+        failures = 0
+        sizer.ok(first, nbytes)
+        for i, org in enumerate(active):
+            error = alias_errors.get(f"o{i}")
+            if error is not None and error.get("type") != "NOT_FOUND":
+                # الـ org ده بس ناقص (ممكن الـ data بتاعته تكون جزئية فمش بتتاخد)
+                print(f"   ❌ {org}: {error.get('type', 'error')}: {error.get('message', '')}")
+                del cursors[org]
+                yield org, [], True, 1
+                continue
+            node = data.get(f"o{i}")
+            if node is None:
+                print(f"   ⚠️ {org}: not found")
+                del cursors[org]
+                yield org, [], True, 0
+                continue
+            conn = node["repositories"]
+            nodes = conn["nodes"][:limit - counts[org]] if limit else conn["nodes"]
+            records = []
+            for n in nodes:
+                r = graphql_record(n, org)
+                records.append(r)
+                if store is not None:
+                    text = graphql_readme(n)
+                    if text is None:
+                        store.mark_missing(r["full_name"])
+                        readmes["missing"] += 1
+                    else:
+                        store.put(r["full_name"], strip_markdown(text[:README_MAX_CHARS * 4]))
+                        readmes["fetched"] += 1
+            counts[org] += len(records)
+            if conn["pageInfo"]["hasNextPage"] and not (limit and counts[org] >= limit):
+                cursors[org] = conn["pageInfo"]["endCursor"]
+            else:
+                del cursors[org]
+            yield org, records, org not in cursors, 0
+    print(f"🔎 GraphQL: {queries} queries for {sum(counts.values())} repos (last batch {sizer.first}/org)"
+          + (f", READMEs: {dict(readmes)}" if store is not None else ""))
+    if store is not None:
+        store.save()
+
+def fetch_all_graphql(orgs, session=None, limiter=None, store=None, sizer=None, max_pages=MAX_PAGES):
+    """زي fetch_all بس بـ GraphQL؛ لو store موجود الـ READMEs بتتخزن فيه مع الـ repos."""
+    return collect(iter_pages_graphql(orgs, session, limiter, store, sizer, max_pages), orgs)
+
+def _read_capped(resp, limit):
+    # ما نحمّلش README ضخم كله: وقف بعد limit بايت
+    chunks, size = [], 0
+    for chunk in resp.iter_content(1 << 14):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
             break
-    return repos
+    resp.close()
+    return b"".join(chunks)[:limit].decode("utf-8", errors="ignore")
+
+def get_readme(session, full_name, limiter, store, retries=FETCH_RETRIES):
+    # "fetched" / "unchanged" (304) / "missing" (404) / "failed"
+    headers = {"Accept": "application/vnd.github.raw"}
+    entry = store.entry(full_name)
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    resp = send(session, f"{API}/repos/{full_name}/readme", limiter, headers, retries, stream=True)
+    if resp is None:
+        return "failed"
+    if resp.status_code == 304:
+        resp.close()
+        return "unchanged"
+    if resp.status_code == 404:
+        resp.close()
+        store.mark_missing(full_name)
+        return "missing"
+    if resp.status_code != 200:
+        resp.close()
+        return "failed"
+    # markdown بيتقص وبيتنضف وقت الاستلام، واللي بيتخزن النص العادي بس
+    raw = _read_capped(resp, README_MAX_CHARS * 4)
+    store.put(full_name, strip_markdown(raw), resp.headers.get("ETag"))
+    return "fetched"
+
+def iter_readmes(repos, store, session=None, limiter=None, workers=FETCH_WORKERS, window=None):
+    """(repo, outcome) بنفس ترتيب repos، ومش أكتر من window request مستنيين في نفس الوقت."""
+    session = session or make_session(workers)
+    limiter = limiter or RateLimiter()
+    window = window or workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(workers) as pool:
+        for r in repos:
+            pending.append((r, pool.submit(get_readme, session, r["full_name"], limiter, store)))
+            if len(pending) >= window:
+                r, fut = pending.popleft()
+                yield r, fut.result()
+        while pending:
+            r, fut = pending.popleft()
+            yield r, fut.result()
+
+def fetch_readmes(repos, store, session=None, limiter=None, workers=FETCH_WORKERS, save_every=500):
+    outcomes = {}
+    for i, (_, outcome) in enumerate(iter_readmes(repos, store, session, limiter, workers), 1):
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if i % save_every == 0:
+            store.save()   # عشان crawl اتقطع يكمل من غير ما يعيد الـ READMEs
+    store.save()
+    return outcomes
+
+def write_org_shards(pages, writer, store=None, session=None, limiter=None, readmes=True):
+    """(org, repos, done, failed) من iter_pages / iter_pages_graphql → writer.append(org, repo) أول ما توصل
+    (بالـ README لو store موجود؛ readmes=False لو الـ backend جابها خلاص). الـ org بيتعمله finish
+    أول ما آخر repo فيه يتكتب، فالـ shards بتاعته بتبقى نهائية في الـ manifest والـ crawl لسه ماشي.
+    الـ org اللي فيه صفحات فشلت ما بيتعملوش finish (FETCH_RESUME بيعيده)؛ بيرجع (outcomes, {org: صفحات فشلت})."""
+    expected = {}   # org → عدد الـ repos، بيتعرف قبل ما آخر دفعة تطلع
+    failed = {}
+    outcomes = Counter()
+
+    def repos():
+        counts = Counter()
+        for org, records, done, n_failed in pages:
+            counts[org] += len(records)
+            if done and n_failed:
+                failed[org] = n_failed
+                print(f"⚠️ {org}: {n_failed} pages failed, left unfinished")
+            elif done:
+                expected[org] = counts[org]
+            yield from records
+
+    def with_readmes(stream):
+        for r, outcome in iter_readmes(stream, store, session, limiter):
+            outcomes[outcome] += 1
+            yield r
+
+    stream = repos()
+    if store is not None and readmes:
+        stream = with_readmes(stream)
+    written = Counter()
+
+    def finish(org):
+        writer.finish(org)
+        print(f"✅ {org}: {written[org]} repos")
+
+    for i, r in enumerate(stream, 1):
+        org = r["org"]
+        writer.append(org, dict(r, readme=store.read(r["full_name"])) if store is not None else r)
+        written[org] += 1
+        if written[org] == expected.get(org):
+            finish(org)
+        if store is not None and i % 500 == 0:
+            store.save()   # عشان crawl اتقطع يكمل من غير ما يعيد الـ READMEs
+    for org, n in expected.items():
+        if n == 0:
+            finish(org)
+    if store is not None:
+        store.save()
+    return outcomes, failed
+
+def crawl_to_shards(orgs, out_dir, cache=None, store=None):
+    writer = KeyedShardWriter(out_dir, FETCH_SHARD_SIZE, FETCH_COMPRESS or False, resume=FETCH_RESUME)
+    todo = [org for org in orgs if org not in writer.done]
+    if len(todo) < len(orgs):
+        print(f"↩️ resuming {out_dir}: {', '.join(writer.done)} already fetched")
+    session = make_session()
+    limiter = RateLimiter()
+    graphql = FETCH_BACKEND == "graphql"
+    if graphql:
+        pages = iter_pages_graphql(todo, session, limiter, store)
+    else:
+        pages = iter_pages(todo, session, limiter, cache)
+    ok = False
+    failed = {}
+    try:
+        outcomes, failed = write_org_shards(pages, writer, store, session, limiter, readmes=not graphql)
+        ok = not failed
+    finally:
+        # crash أو org ناقص: الـ shards المفتوحة بتتشال والـ manifest بيفضل incomplete،
+        # والـ orgs اللي خلصت بتفضل في "done" (FETCH_RESUME=1 بيكمل الباقي)
+        writer.close(ok)
+    print(f"📦 المجموع الكلي: {len(writer)} repos")
+    if outcomes:
+        print(f"📖 READMEs: {dict(outcomes)}, {store.new_blobs} new blobs, {store.deduped} deduplicated")
+    print(f"💾 تم حفظ الداتا في {out_dir}/ ({len(writer.shards)} shards)")
+    return failed
+
+def fetch_org_repos(org, max_pages=MAX_PAGES):
+    return fetch_all([org], max_pages=max_pages)[org]
 
 def main():
+    cache = make_cache()
+    store = ReadmeStore(README_DIR) if README_DIR else None
+    if FETCH_FORMAT == "jsonl":
+        out_dir = os.path.splitext(OUTPUT_FILE)[0]
+        failed = crawl_to_shards(ORGS, out_dir, cache, store)
+        if cache and FETCH_BACKEND != "graphql":
+            print(f"🗄️ {cache.stats.summary()}")
+        if failed:
+            print(f"❌ incomplete crawl ({', '.join(o for o in ORGS if o in failed)}): {out_dir}/ not complete, "
+                  "rerun with FETCH_RESUME=1 to retry")
+            sys.exit(1)
+        return
+    failed = {}
+    try:
+        if FETCH_BACKEND == "graphql":
+            by_org = fetch_all_graphql(ORGS, store=store)   # الـ READMEs جت مع الـ repos
+        else:
+            by_org = fetch_all(ORGS, cache=cache)
+    except IncompleteFetch as e:
+        by_org, failed = e.repos, e.failed
     all_repos = []
     for org in ORGS:
-        repos = fetch_org_repos(org)
-        print(f"✅ {org}: {len(repos)} repos")
+        repos = by_org[org]
+        if org in failed:
+            print(f"⚠️ {org}: {len(repos)} repos, {failed[org]} pages failed")
+        else:
+            print(f"✅ {org}: {len(repos)} repos")
         all_repos.extend(repos)
 
     print(f"📦 المجموع الكلي: {len(all_repos)} repos")
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_repos, f, indent=2, ensure_ascii=False)
+    if failed:
+        # الـ cache بيخلي الإعادة ترجع الصفحات اللي نجحت من غير ما تتعد من الـ quota
+        print(f"❌ incomplete crawl ({', '.join(o for o in ORGS if o in failed)}): {OUTPUT_FILE} not written, rerun to retry")
+        sys.exit(1)
+    if store:
+        if FETCH_BACKEND != "graphql":
+            outcomes = fetch_readmes(all_repos, store)
+            print(f"📖 READMEs: {outcomes}, {store.new_blobs} new blobs, {store.deduped} deduplicated")
+        records = store.with_readmes(all_repos)
+    else:
+        records = all_repos
+    write_json_array(records, OUTPUT_FILE)
     print(f"💾 تم حفظ الداتا في {OUTPUT_FILE}")
+    if cache and FETCH_BACKEND != "graphql":
+        print(f"🗄️ {cache.stats.summary()}")
 
 if __name__ == "__main__":
     main()
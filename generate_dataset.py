@@ -1,19 +1,61 @@
-import os, json, re, random, sys
-from collections import Counter, defaultdict
-
-IN = "github_repos.json"
+import os, json, re, random, sys, argparse, time
+import multiprocessing as mp
+from collections import Counter, defaultdict, deque, namedtuple
+from itertools import chain
+
+import numpy as np
+
+import instrument
+from checkpoint import Checkpointer
+from dataset_io import ShardWriter, iter_records, iter_repos, open_output
+from intern_table import IdSet, StringTable
+from lsh_index import MinHashLSH, token_hash
+from prep_cache import finish, lookup, open_cache
+from seen_filter import SeenFilter, SeenSet
+from token_matrix import RowCache, TokenMatrix
+
+IN = os.getenv("REPOS_FILE", "github_repos.json")   # JSON array أو JSONL، عادي أو gzip
 OUT = "service_discovery_dataset.json"
+# "json": ملف منسق في الآخر (زي الأول) | "jsonl": shards بتتكتب record ورا record
+OUT_FORMAT = os.getenv("OUT_FORMAT", "json")
+SHARD_SIZE = int(os.getenv("SHARD_SIZE", "0"))     # 0 = shard واحد
+OUT_GZIP = os.getenv("OUT_GZIP", "0") == "1"
 
 TARGET = int(os.getenv("DATASET_SIZE", "250"))
 MIN_OK = int(os.getenv("MIN_DATASET_SIZE", "210"))
 
-random.seed(42)
+SEED = 42
+random.seed(SEED)
 
 SENT_MIN = 90     # أقل طول للجملة المقبولة
 SENT_MAX = 320    # أقصى طول للجملة للـ query/relevance
 GT_MIN   = 180    # أقل طول للـ ground_truth
 GT_MAX   = 520    # أقصى طول للـ ground_truth
 
+# "exact" (الافتراضي): صف Jaccard كامل لكل anchor من مصفوفة sparse (نفس نتيجة المقارنة الكاملة)
+# "lsh": مرشحين من MinHash/LSH و Jaccard دقيق على القائمة القصيرة بس؛ اختياري بس: على الأحجام
+#   اللي اتقاست (bench_similarity.py) أبطأ من صفوف exact وبيفوّت مرشحين، فالناتج بيختلف
+SIMILARITY = os.getenv("SIMILARITY", "exact")
+LSH_BANDS = int(os.getenv("LSH_BANDS", "16"))   # أكتر = recall أعلى وأبطأ
+LSH_ROWS  = int(os.getenv("LSH_ROWS", "1"))     # أكتر = مرشحين أقل وأسرع
+LOW_SAMPLE_TRIES = int(os.getenv("LOW_SAMPLE_TRIES", "2000"))
+
+WORKERS = int(os.getenv("WORKERS", "1"))
+# عدد الـ anchors في كل task للـ workers؛ صغير = نسخ الـ workers أحدث وتضاربات أقل (64 كان بيعيد ~نص الـ anchors)
+BLOCK = int(os.getenv("BLOCK", "4"))
+
+# checkpoint كل CHECKPOINT_EVERY anchor في CHECKPOINT_DIR (0 = من غير)؛ --resume بيكمل من آخر واحد
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoint")
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "1000"))
+
+# نصوص تشغيلات تانية (train/dev/test) مش هتتكرر هنا، والملف بيتحدّث في الآخر (شوف seen_filter.py)
+SEEN_FILE = os.getenv("SEEN_FILE", "")   # فاضي = uniqueness جوه التشغيل ده بس
+
+# METRICS=1: وقت كل مرحلة وسبب رفض كل anchor (شوف instrument.py)
+METRICS = instrument.from_env()
+METRICS_JSON = os.getenv("METRICS_JSON", "generate_metrics.json")
+METRICS_PROM = os.getenv("METRICS_PROM", "generate_metrics.prom")
+
 def normalize_ws(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "").strip())
 
@@ -70,10 +112,41 @@ def build_long_sentence(sentences, target_min=GT_MIN, target_max=GT_MAX):
     # ضمهم كـ "جملة واحدة طويلة"
     return (merged + ".").strip()
 
-def pick_sentence_from_repo(repo, used_set, avoid_texts):
+# جُمل كل repo محسوبة مرة واحدة:
+# sents: أرقام جُمل الوصف + الـ README في strings (StringTable) بنفس ترتيب split_sentences
+# by_len: indices في sents مترتبة بالطول (الأطول أولاً، stable)
+RepoText = namedtuple("RepoText", "sents by_len")
+
+def repo_sentences(repo):
+    return split_sentences(repo.get("description","")) + split_sentences(repo.get("readme",""))
+
+# مفتاح الـ prep cache: أي تغيير في split_sentences / tokens لازم يغيّر الـ version
+PREP_KIND = f"generate:1:{SENT_MIN}"
+
+def repo_prep(r):
+    return repo_sentences(r), list(tokens(r["text"]))
+
+def preprocess(filtered, cache=None):
+    """(texts, tok, strings, vocab): الجُمل والـ tokens أرقام في جدولين (كل نص مختلف بيتخزن مرة)."""
+    strings, vocab = StringTable(), StringTable()
+    texts, tok = [], []
+    for r in filtered:
+        sentences, words = lookup(cache, PREP_KIND, (r.get("description"), r.get("readme"), r["text"]),
+                                  lambda: repo_prep(r))
+        sents = tuple(strings.intern(x) for x in sentences)
+        lengths = [strings.lengths[i] for i in sents]
+        by_len = tuple(sorted(range(len(sents)), key=lambda k: lengths[k], reverse=True))
+        texts.append(RepoText(sents, by_len))
+        tok.append({vocab.intern(t) for t in words})
+    return texts, tok, strings, vocab
+
+def pick_sentence_from_repo(repo, used_set, avoid_texts, rng=random):
+    return pick_sentence(repo_sentences(repo), used_set, avoid_texts, rng)
+
+def pick_sentence(sents, used_set, avoid_texts, rng=random):
     # اختر جملة “مميزة وطويلة” من وصف/README
-    sents = split_sentences(repo.get("description","")) + split_sentences(repo.get("readme",""))
-    random.shuffle(sents)
+    sents = list(sents)
+    rng.shuffle(sents)
     for s in sents:
         if len(s) > SENT_MAX:  # خلي جمل relevance/queries معقولة الطول
             continue
@@ -85,15 +158,502 @@ def pick_sentence_from_repo(repo, used_set, avoid_texts):
         return s
     return None
 
-def main():
-    if not os.path.exists(IN):
-        print(f"❌ {IN} not found. Run fetch_github_data.py first.")
-        sys.exit(1)
-
-    with open(IN, "r", encoding="utf-8") as f:
-        repos = json.load(f)
+def pick_sentence_id(ids, strings, used_ids, avoid_texts, rng=random):
+    # نفس pick_sentence على أرقام الجُمل: الطول والـ used من غير ما نعمل hash للنص
+    ids = list(ids)
+    rng.shuffle(ids)
+    lengths = strings.lengths
+    for i in ids:
+        if lengths[i] > SENT_MAX or i in used_ids:
+            continue
+        s = strings[i]
+        if any(s == a or s in a or a in s for a in avoid_texts):
+            continue
+        used_ids.add(i)
+        return s
+    return None
 
-    # فلترة Repos اللي عندها نص كفاية
+# --- مصادر المرشحين لكل anchor ---
+# high(): نفس الـ org مترتبة بالتشابه (الأعلى أولاً)
+# medium_low(): (medium, low) من منظمات تانية، متلخبطين
+# *_fallback(): توسيع الدايرة لو القائمة مكملتش 4
+class ExactPools:
+    """Jaccard دقيق ضد كل الـ repos بالـ sets (المرجع اللي RowPools لازم تطابقه)."""
+
+    def __init__(self, idx, tok, filtered, by_org, rng=random):
+        self.idx = idx
+        self.tok = tok
+        self.filtered = filtered
+        self.by_org = by_org
+        self.org = filtered[idx]["org"]
+        self.rng = rng
+
+    def _sim(self, j):
+        return jaccard(self.tok[self.idx], self.tok[j])
+
+    def high(self):
+        cands = [(self._sim(j), j) for j in self.by_org[self.org] if j != self.idx]
+        cands.sort(reverse=True, key=lambda x: x[0])
+        return cands
+
+    def medium_low(self):
+        medium, low = [], []
+        for j in range(len(self.tok)):
+            if j == self.idx:
+                continue
+            s = self._sim(j)
+            if self.filtered[j]["org"] != self.org:
+                if 0.06 <= s <= 0.30:
+                    medium.append((s, j))
+                elif s < 0.02:
+                    low.append((s, j))
+        self.rng.shuffle(medium)
+        self.rng.shuffle(low)
+        return medium, low
+
+    def high_fallback(self):
+        others = [(self._sim(j), j) for j in range(len(self.tok)) if j != self.idx]
+        others.sort(reverse=True, key=lambda x: x[0])
+        return others
+
+    def medium_fallback(self):
+        fallback = []
+        for j in range(len(self.tok)):
+            if j == self.idx or self.filtered[j]["org"] == self.org:
+                continue
+            s = self._sim(j)
+            if 0.03 <= s < 0.06 or 0.30 < s <= 0.45:
+                fallback.append((s, j))
+        self.rng.shuffle(fallback)
+        return fallback
+
+    def low_fallback(self):
+        return sorted([(self._sim(j), j) for j in range(len(self.tok)) if j != self.idx], key=lambda x: x[0])
+
+
+class LSHPools(ExactPools):
+    """Jaccard دقيق على مرشحين الـ LSH بس؛ الباقي بيتعامل كتشابه ~0."""
+
+    def __init__(self, idx, tok, filtered, by_org, lsh, rng=random):
+        super().__init__(idx, tok, filtered, by_org, rng)
+        self.sims = {j: self._sim(j) for j in sorted(lsh.candidates(idx))}
+
+    def _sample(self, skip_org=None):
+        # عينات عشوائية من غير المرشحين، بدل ما نلف على الكل
+        seen = set()
+        n = len(self.tok)
+        for _ in range(min(LOW_SAMPLE_TRIES, 4 * n)):
+            j = self.rng.randrange(n)
+            if j == self.idx or j in seen or j in self.sims:
+                continue
+            seen.add(j)
+            if skip_org is not None and self.filtered[j]["org"] == skip_org:
+                continue
+            yield j
+
+    def high(self):
+        same = [(s, j) for j, s in self.sims.items() if self.filtered[j]["org"] == self.org]
+        same.sort(reverse=True, key=lambda x: x[0])
+        rest = ((0.0, j) for j in self.by_org[self.org] if j != self.idx and j not in self.sims)
+        return chain(same, rest)
+
+    def medium_low(self):
+        medium = [(s, j) for j, s in self.sims.items()
+                  if self.filtered[j]["org"] != self.org and 0.06 <= s <= 0.30]
+        self.rng.shuffle(medium)
+        low = [(s, j) for j, s in self.sims.items()
+               if self.filtered[j]["org"] != self.org and s < 0.02]
+        self.rng.shuffle(low)
+        sampled = ((s, j) for j in self._sample(skip_org=self.org)
+                   for s in (self._sim(j),) if s < 0.02)
+        return medium, chain(low, sampled)
+
+    def high_fallback(self):
+        return sorted(((s, j) for j, s in self.sims.items()), reverse=True, key=lambda x: x[0])
+
+    def medium_fallback(self):
+        fallback = [(s, j) for j, s in self.sims.items()
+                    if self.filtered[j]["org"] != self.org and (0.03 <= s < 0.06 or 0.30 < s <= 0.45)]
+        self.rng.shuffle(fallback)
+        return fallback
+
+    def low_fallback(self):
+        ranked = sorted(((s, j) for j, s in self.sims.items()), key=lambda x: x[0])
+        return chain(((self._sim(j), j) for j in self._sample()), ranked)
+
+
+class RowPools(ExactPools):
+    """نفس ExactPools بس من صف تشابه واحد محسوب مرة (numpy) لكل الـ tiers."""
+
+    def __init__(self, idx, tok, filtered, by_org, rows, org_ids, rng=random):
+        super().__init__(idx, tok, filtered, by_org, rng)
+        self.row = rows.row(idx)
+        self.other = org_ids != org_ids[idx]
+        self.not_self = np.ones(len(self.row), dtype=bool)
+        self.not_self[idx] = False
+
+    def _sim(self, j):
+        return float(self.row[j])
+
+    def _pairs(self, js):
+        return list(zip(self.row[js].tolist(), js.tolist()))
+
+    def _shuffled(self, mask):
+        # shuffle على list بنفس الطول → نفس الـ permutation بتاعة ExactPools
+        js = np.flatnonzero(mask).tolist()
+        self.rng.shuffle(js)
+        row = self.row
+        return [(float(row[j]), j) for j in js]
+
+    def high(self):
+        js = np.asarray([j for j in self.by_org[self.org] if j != self.idx], dtype=np.int64)
+        # stable sort على -sim = sort(reverse=True) بتاع بايثون
+        return self._pairs(js[np.argsort(-self.row[js], kind="stable")])
+
+    def medium_low(self):
+        row = self.row
+        base = self.other & self.not_self
+        medium = self._shuffled(base & (row >= 0.06) & (row <= 0.30))
+        low = self._shuffled(base & (row < 0.02))
+        return medium, low
+
+    def high_fallback(self):
+        js = np.flatnonzero(self.not_self)
+        return self._pairs(js[np.argsort(-self.row[js], kind="stable")])
+
+    def medium_fallback(self):
+        row = self.row
+        band = ((row >= 0.03) & (row < 0.06)) | ((row > 0.30) & (row <= 0.45))
+        return self._shuffled(self.other & self.not_self & band)
+
+    def low_fallback(self):
+        js = np.flatnonzero(self.not_self)
+        return self._pairs(js[np.argsort(self.row[js], kind="stable")])
+
+
+def build_rows(tok, filtered, batch=None):
+    org_index = {}
+    org_ids = np.fromiter((org_index.setdefault(r["org"], len(org_index)) for r in filtered),
+                          dtype=np.int32, count=len(filtered))
+    return RowCache(TokenMatrix(tok), batch), org_ids
+
+
+def build_lsh(tok, bands=None, rows=None, vocab=None):
+    # vocab: tok أرقام في StringTable → كل token بيتعمله hash مرة واحدة بس
+    hashes = None
+    if vocab is not None:
+        hashes = np.fromiter((token_hash(t) for t in vocab.strings), dtype=np.uint64, count=len(vocab))
+    return MinHashLSH(bands=bands or LSH_BANDS, rows=rows or LSH_ROWS).build(tok, hashes)
+
+
+def make_pools(idx, tok, filtered, by_org, lsh=None, rows=None, rng=random):
+    if lsh is not None:
+        return LSHPools(idx, tok, filtered, by_org, lsh, rng)
+    if rows is not None:
+        return RowPools(idx, tok, filtered, by_org, *rows, rng=rng)
+    return ExactPools(idx, tok, filtered, by_org, rng)
+
+# كل اللي الـ workers محتاجينه للقراية بس (بيتشارك بالـ fork مش بيتعمله pickle)
+# seen: SeenFilter أو None؛ seen_ids: أرقام الجُمل اللي اتستخدمت في تشغيلات تانية
+Corpus = namedtuple("Corpus", "filtered texts tok by_org lsh rows strings seen seen_ids")
+
+def new_used(corpus):
+    # (used_queries, used_ground_truth, used_relevance): الـ queries والـ relevance أرقام جُمل؛
+    # الـ ground_truth نص جديد بيتركّب لكل anchor (مش في الجدول) فبيفضل set نصوص
+    # اللي اتشاف في تشغيلات تانية بيبدأ متعلّم used (والـ ground_truth بيتسأل عنه الـ filter)
+    n = len(corpus.strings)
+    return IdSet(n, corpus.seen_ids), SeenSet(corpus.seen), IdSet(n, corpus.seen_ids)
+
+def open_seen():
+    return SeenFilter(SEEN_FILE) if SEEN_FILE else None
+
+def remember(seen, records):
+    # بعد ما الناتج اتكتب كامل بس، عشان تشغيل وقع ما يحجزش نصوص
+    if seen is None:
+        return
+    seen.add_records(records)
+    total = seen.save()
+    print(f"🧷 {SEEN_FILE}: {total} texts used across runs")
+
+def anchor_rng(idx):
+    # RNG مستقل لكل anchor → النتيجة مش معتمدة على ترتيب التنفيذ أو عدد الـ workers
+    return random.Random((SEED << 32) | idx)
+
+def build_record(idx, corpus, used_queries, used_ground_truth, used_relevance, rng, metrics=instrument.NULL):
+    filtered, texts, strings = corpus.filtered, corpus.texts, corpus.strings
+    r = filtered[idx]
+
+    # 1) query: جملة واحدة من الوصف/README “مميزة”
+    rt = texts[idx]
+    if not rt.sents:
+        metrics.reject("no_sentences")
+        return None
+    # رتّب حسب الطول (الأطول أولاً) لضمان “سؤال طويل”
+    cand_ids = [rt.sents[k] for k in rt.by_len]
+    query_id = None
+    for s in cand_ids:
+        if SENT_MIN <= strings.lengths[s] <= SENT_MAX and s not in used_queries:
+            query_id = s
+            break
+    if query_id is None:
+        metrics.reject("no_query")
+        return None
+    used_queries.add(query_id)
+    query = strings[query_id]
+    cand_sents = [strings[s] for s in cand_ids]
+
+    # 2) description: وصف GitHub كما هو (ولو فاضي ناخد أول جملة من README)
+    description = normalize_ws(r.get("description",""))
+    if not description:
+        # خد أول جملة مناسبة من الREADME
+        for s in cand_sents[::-1]:
+            if len(s) <= SENT_MAX:
+                description = s
+                break
+    if not description:
+        # ما فيش وصف مناسب
+        metrics.reject("no_description")
+        used_queries.discard(query_id)
+        return None
+
+    # 3) ground_truth: جملة واحدة طويلة من دمج جُمل حقيقية
+    long_sents = cand_sents[:]
+    gt = build_long_sentence(long_sents, target_min=GT_MIN, target_max=GT_MAX)
+    if not gt or gt in used_ground_truth or gt == query:
+        # جرّب تكوين مختلف
+        rng.shuffle(long_sents)
+        gt = build_long_sentence(long_sents, target_min=GT_MIN, target_max=GT_MAX)
+    if not gt or gt in used_ground_truth or gt == query:
+        metrics.reject("no_ground_truth" if not gt else "duplicate_ground_truth")
+        used_queries.discard(query_id)
+        return None
+    used_ground_truth.add(gt)
+
+    # 4) relevance selection via similarity (نصي فقط)
+    with metrics.time("similarity"):
+        pools = make_pools(idx, corpus.tok, filtered, corpus.by_org, corpus.lsh, corpus.rows, rng)
+        high_candidates = pools.high()
+        medium_candidates, low_candidates = pools.medium_low()
+
+    # اختار جُمل مميزة (بدون تكرار) للـ 4/4/4
+    avoid = {query, gt, description}
+    avoid_texts = list(avoid)
+
+    def pick_many(cands, needed):
+        chosen_texts = []
+        seen_names = set()
+        for _, j in cands:
+            rr = filtered[j]
+            if rr["full_name"] in seen_names:
+                continue
+            sent = pick_sentence_id(texts[j].sents, strings, used_relevance, avoid_texts, rng)
+            if not sent:
+                continue
+            chosen_texts.append(sent)
+            seen_names.add(rr["full_name"])
+            if len(chosen_texts) == needed:
+                break
+        return chosen_texts
+
+    def pick_tier(tier, cands, fallback):
+        with metrics.time(f"pick.{tier}"):
+            chosen = pick_many(cands, 4)
+        if len(chosen) < 4:
+            metrics.count(f"fallback.{tier}")
+            with metrics.time(f"pick.{tier}_fallback"):
+                extra = pick_many(fallback(), 4 - len(chosen))
+            chosen.extend(extra[:max(0, 4 - len(chosen))])
+        if len(chosen) < 4:
+            metrics.count(f"short.{tier}")
+        return chosen
+
+    # high: لو المنظمة صغيرة، وسّع الدائرة بأعلى تشابه عبر الكل
+    # medium: وسّع رينچ التشابه تدريجيًا
+    # low: خُد الأقل تشابهًا عالميًا
+    high = pick_tier("high", high_candidates, pools.high_fallback)
+    medium = pick_tier("medium", medium_candidates, pools.medium_fallback)
+    low = pick_tier("low", low_candidates, pools.low_fallback)
+
+    # لو أي قائمة مش مكتمِلة 4 → تخطّي السجل بالكامل (علشان الفاليديتور)
+    if not (len(high) == len(medium) == len(low) == 4):
+        short = next(t for t, lst in (("high", high), ("medium", medium), ("low", low)) if len(lst) < 4)
+        metrics.reject(f"short_{short}")
+        # ارجع الـ query/gt المستخدمة عشان ممكن نعيد استخدامها لاحقًا
+        used_queries.discard(query_id)
+        used_ground_truth.discard(gt)
+        return None
+
+    return {
+        "query": query,
+        "description": description,
+        "ground_truth": gt,
+        "high_relevance": high,
+        "medium_relevance": medium,
+        "low_relevance": low
+    }
+
+# --- التوليد على كذا process ---
+# كل worker شايل نسخة من الـ used sets، والـ coordinator بيبعتله الإضافات الجديدة (delta) مع كل task.
+# الـ worker بيبني سجلات block من الـ anchors ضد نسخته، وبيسجل كل جملة اختارها.
+# الـ coordinator بيعمل commit بترتيب الـ anchors: لو ولا جملة من دول اتستخدمت من ساعتها، السجل هو
+# نفسه اللي كان هيطلع في التشغيل المتسلسل؛ غير كده الـ coordinator بيبنيه تاني بنفسه على الـ used sets الحالية
+# (الـ corpus عنده من قبل الـ fork)، من غير ما يستنى worker وراه blocks.
+class ProbeSet:
+    """set فوق base للقراية بس: الإضافات محلية، وكل جملة اتاخدت (حتى لو اترجعت بعدين) بتتسجل.
+
+    القرارات الوحيدة اللي ممكن تتغير لو base كان أحدث هي الجُمل اللي اتاخدت، فدي اللي بتتفحص
+    وقت الـ commit.
+    """
+
+    def __init__(self, base=()):
+        self.base = base
+        self.added = set()
+        self.taken = set()
+
+    def __contains__(self, x):
+        return x in self.added or x in self.base
+
+    def add(self, x):
+        self.added.add(x)
+        self.taken.add(x)
+
+    def discard(self, x):
+        self.added.discard(x)
+
+_CORPUS = None   # بيتحط قبل الـ fork وكل worker بيورثه (مفيش pickle لـ filtered/tok)
+
+def _build_probed(idx, base):
+    # القياسات لكل build لوحدها، والـ coordinator بيضم بس اللي اتعملها commit
+    probes = tuple(ProbeSet(u) for u in base)
+    metrics = instrument.Metrics() if METRICS.enabled else instrument.NULL
+    example = build_record(idx, _CORPUS, *probes, anchor_rng(idx), metrics)
+    return idx, example, tuple((p.added, p.taken) for p in probes), metrics.snapshot()
+
+def _worker(inbox, outbox):
+    used = new_used(_CORPUS)
+    for key, start, stop, delta in iter(inbox.get, None):
+        try:
+            for u, d in zip(used, delta):
+                u.update(d)
+            outbox.put((key, [_build_probed(idx, used) for idx in range(start, stop)]))
+        except Exception:
+            import traceback
+            outbox.put((key, traceback.format_exc()))
+
+def generate_parallel(corpus, workers, used, dataset, block=BLOCK, begin=0, ckpt=None):
+    global _CORPUS
+    _CORPUS = corpus
+    n = len(corpus.filtered)
+    ctx = mp.get_context("fork")
+    outbox = ctx.Queue()
+    inboxes = [ctx.Queue() for _ in range(workers)]
+    procs = [ctx.Process(target=_worker, args=(q, outbox), daemon=True) for q in inboxes]
+    for p in procs:
+        p.start()
+
+    log = tuple(list(u) for u in used)   # كل اللي اتعمله commit بالترتيب، لكل used set (بعد resume بيبدأ باللي اتحمّل)
+    cursors = [[0, 0, 0] for _ in range(workers)]
+    turn = [0]
+    done = {}
+
+    def send(key, start, stop):
+        w = turn[0] % workers
+        turn[0] += 1
+        delta = tuple(entries[c:] for entries, c in zip(log, cursors[w]))
+        cursors[w] = [len(entries) for entries in log]
+        inboxes[w].put((key, start, stop, delta))
+
+    def wait(key):
+        while key not in done:
+            k, res = outbox.get()
+            if isinstance(res, str):
+                raise RuntimeError(f"worker failed:\n{res}")
+            done[k] = res
+        return done.pop(key)
+
+    starts = iter(range(begin, n, block))
+    pending = deque()   # الـ blocks اللي اتبعتت ولسه ما اتعملهاش commit، بالترتيب
+    in_flight = [0]     # anchors في الـ blocks دي
+    seen_anchors = [0]
+    rebuilt = 0
+
+    def top_up():
+        # لحد workers×2 block مستنيين، بس مش أكتر من اللي محتاجينه عشان نوصل TARGET
+        # (نسبة الـ anchors اللي بتطلع سجل من اللي اتعمله commit لحد دلوقتي)
+        rate = len(dataset) / seen_anchors[0] if seen_anchors[0] else 1.0
+        while len(pending) < workers * 2 and (not pending or len(dataset) + in_flight[0] * rate < TARGET):
+            start = next(starts, None)
+            if start is None:
+                return
+            stop = min(n, start + block)
+            send(("block", start), start, stop)
+            pending.append(start)
+            in_flight[0] += stop - start
+
+    cpu = time.process_time()
+    try:
+        top_up()
+        while pending:
+            start = pending.popleft()
+            results = wait(("block", start))
+            in_flight[0] -= len(results)
+            for idx, example, probes, snap in results:
+                if len(dataset) >= TARGET:
+                    return
+                if any(x in u for (_, taken), u in zip(probes, used) for x in taken):
+                    # اتضارب مع commit أحدث → نبنيه هنا على الـ used sets الحالية (نفس نتيجة التسلسلي)
+                    rebuilt += 1
+                    METRICS.count("rebuilt")
+                    _, example, probes, snap = _build_probed(idx, used)
+                seen_anchors[0] += 1
+                METRICS.count("anchors")
+                if snap:
+                    METRICS.merge(snap)
+                for (added, _), u, entries in zip(probes, used, log):
+                    u.update(added)
+                    entries.extend(added)
+                if example:
+                    dataset.append(example)
+                if ckpt:
+                    ckpt.commit(idx, example, [corpus.strings[i] for i in probes[2][0]])
+            top_up()
+    finally:
+        # CPU الـ coordinator (commit + إعادة البناء) هو الحد الأدنى للـ wall مهما كان عدد الـ cores
+        cpu = time.process_time() - cpu
+        METRICS.count("coordinator_cpu_ms", int(cpu * 1000))
+        print(f"🔁 rebuilt {rebuilt} of {seen_anchors[0]} anchors after conflicts (coordinator CPU {cpu:.1f}s)")
+        for q in inboxes:
+            q.put(None)
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+def generate_serial(corpus, used, dataset, begin=0, ckpt=None):
+    used_queries, used_ground_truth, used_relevance = used
+    for idx in range(begin, len(corpus.filtered)):
+        if len(dataset) >= TARGET:
+            break
+        METRICS.count("anchors")
+        if ckpt:
+            # جُمل relevance اللي anchor مرفوض خدها لازم تتسجل (مش هتبان في أي سجل)
+            probe = ProbeSet(used_relevance)
+            example = build_record(idx, corpus, used_queries, used_ground_truth, probe, anchor_rng(idx), METRICS)
+            used_relevance.update(probe.added)
+            ckpt.commit(idx, example, [corpus.strings[i] for i in probe.added])
+        else:
+            example = build_record(idx, corpus, *used, anchor_rng(idx), METRICS)
+        if example:
+            dataset.append(example)
+
+# الحقول اللي بنحتاجها من كل repo (الباقي بيترمي وقت القراية)
+REPO_FIELDS = ("full_name", "org", "description", "readme", "text")
+
+def load_repos(path):
+    # stream من الملف + فلترة Repos اللي عندها نص كفاية على طول
+    return filter_repos(iter_repos(path, keep=REPO_FIELDS))
+
+def filter_repos(repos):
     filtered = []
     for r in repos:
         text = normalize_ws(r.get("text",""))
@@ -103,168 +663,123 @@ def main():
             continue
         r["text"] = text
         filtered.append(r)
-
-    random.shuffle(filtered)
-    print(f"📦 candidates after filtering: {len(filtered)}")
-
-    # جهّز tokens لكل repo
-    tok = [tokens(r["text"]) for r in filtered]
+    return filtered
+
+def prepare_corpus(filtered, seen=None):
+    # جهّز tokens لكل repo + الـ index بتاع التشابه
+    with METRICS.time("prep_cache.load"):
+        cache = open_cache()
+    with METRICS.time("tokenize"):
+        texts, tok, strings, vocab = preprocess(filtered, cache)
+    finish(cache, METRICS)
     by_org = defaultdict(list)
     for i, r in enumerate(filtered):
         by_org[r["org"]].append(i)
+    with METRICS.time("index"):
+        lsh = build_lsh(tok, vocab=vocab) if SIMILARITY == "lsh" else None
+        rows = build_rows(tok, filtered) if SIMILARITY == "exact" else None
+    seen_ids = ()
+    if seen is not None:
+        with METRICS.time("seen"):
+            seen_ids = np.flatnonzero(seen.contains_many(strings.strings)).tolist()
+        METRICS.count("seen_sentences", len(seen_ids))
+    return Corpus(filtered, texts, tok, by_org, lsh, rows, strings, seen, seen_ids)
+
+def generate(corpus, workers, used, dataset, begin=0, ckpt=None):
+    """السجلات بتتضاف لـ dataset (أي حاجة فيها append و len)؛ بيرجع عدد الـ workers الفعلي."""
+    if workers > 1 and "fork" not in mp.get_all_start_methods():
+        print("⚠️ fork not available on this platform, falling back to --workers 1")
+        workers = 1
+    with METRICS.time("build"):
+        if workers > 1:
+            generate_parallel(corpus, workers, used, dataset, begin=begin, ckpt=ckpt)
+        else:
+            generate_serial(corpus, used, dataset, begin=begin, ckpt=ckpt)
+    return workers
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help="عدد الـ processes (1 = متسلسل، نفس الناتج في الحالتين)")
+    ap.add_argument("--resume", action="store_true",
+                    help=f"كمّل من آخر checkpoint في {CHECKPOINT_DIR} (نفس الناتج النهائي)")
+    args = ap.parse_args(argv)
 
-    # عنواين uniqueness
-    used_queries = set()
-    used_ground_truth = set()
-    used_relevance = set()
-
-    dataset = []
-    for idx, r in enumerate(filtered):
-        if len(dataset) >= TARGET:
-            break
-
-        org = r["org"]
-        name = r["full_name"]
-
-        # 1) query: جملة واحدة من الوصف/README “مميزة”
-        cand_sents = split_sentences(r.get("description","")) + split_sentences(r.get("readme",""))
-        if not cand_sents:
-            continue
-        # رتّب حسب الطول (الأطول أولاً) لضمان “سؤال طويل”
-        cand_sents.sort(key=len, reverse=True)
-        query = None
-        for s in cand_sents:
-            if SENT_MIN <= len(s) <= SENT_MAX and s not in used_queries:
-                query = s
-                break
-        if not query:
-            continue
-        used_queries.add(query)
-
-        # 2) description: وصف GitHub كما هو (ولو فاضي ناخد أول جملة من README)
-        description = normalize_ws(r.get("description",""))
-        if not description:
-            # خد أول جملة مناسبة من الREADME
-            for s in cand_sents[::-1]:
-                if len(s) <= SENT_MAX:
-                    description = s
-                    break
-        if not description:
-            # ما فيش وصف مناسب
-            used_queries.discard(query)
-            continue
-
-        # 3) ground_truth: جملة واحدة طويلة من دمج جُمل حقيقية
-        long_sents = cand_sents[:]
-        gt = build_long_sentence(long_sents, target_min=GT_MIN, target_max=GT_MAX)
-        if not gt or gt in used_ground_truth or gt == query:
-            # جرّب تكوين مختلف
-            random.shuffle(long_sents)
-            gt = build_long_sentence(long_sents, target_min=GT_MIN, target_max=GT_MAX)
-        if not gt or gt in used_ground_truth or gt == query:
-            used_queries.discard(query)
-            continue
-        used_ground_truth.add(gt)
-
-        # 4) relevance selection via similarity (نصي فقط)
-        t_self = tok[idx]
-
-        # حضّر قوائم المرشحين
-        # high: نفس org بأعلى تشابه
-        high_candidates = []
-        for j in by_org[org]:
-            if j == idx:
-                continue
-            sim = jaccard(t_self, tok[j])
-            high_candidates.append((sim, j))
-        high_candidates.sort(reverse=True, key=lambda x: x[0])
-
-        # medium: من منظمات أخرى بتشابه متوسط
-        medium_candidates = []
-        low_candidates = []
-        for j, t in enumerate(tok):
-            if j == idx:
-                continue
-            s = jaccard(t_self, t)
-            if filtered[j]["org"] != org:
-                if 0.06 <= s <= 0.30:
-                    medium_candidates.append((s, j))
-                elif s < 0.02:
-                    low_candidates.append((s, j))
-        random.shuffle(medium_candidates)
-        random.shuffle(low_candidates)
-
-        # اختار جُمل مميزة (بدون تكرار) للـ 4/4/4
-        avoid = {query, gt, description}
-        avoid_texts = list(avoid)
-
-        def pick_many(cands, needed):
-            chosen_texts = []
-            seen_names = set()
-            for _, j in cands:
-                rr = filtered[j]
-                if rr["full_name"] in seen_names:
-                    continue
-                sent = pick_sentence_from_repo(rr, used_relevance, avoid_texts)
-                if not sent:
-                    continue
-                chosen_texts.append(sent)
-                seen_names.add(rr["full_name"])
-                if len(chosen_texts) == needed:
-                    break
-            return chosen_texts
-
-        high = pick_many(high_candidates, 4)
-        if len(high) < 4:
-            # لو المنظمة صغيرة، وسّع الدائرة بأعلى تشابه عبر الكل
-            others = [(jaccard(t_self, tok[j]), j) for j in range(len(tok)) if j != idx]
-            others.sort(reverse=True, key=lambda x: x[0])
-            extra = pick_many(others, 4 - len(high))
-            high.extend(extra[:max(0, 4 - len(high))])
-
-        medium = pick_many(medium_candidates, 4)
-        if len(medium) < 4:
-            # وسّع رينچ التشابه تدريجيًا
-            fallback_med = []
-            for j, t in enumerate(tok):
-                if j == idx or filtered[j]["org"] == org:
-                    continue
-                s = jaccard(t_self, t)
-                if 0.03 <= s < 0.06 or 0.30 < s <= 0.45:
-                    fallback_med.append((s, j))
-            random.shuffle(fallback_med)
-            extra = pick_many(fallback_med, 4 - len(medium))
-            medium.extend(extra[:max(0, 4 - len(medium))])
-
-        low = pick_many(low_candidates, 4)
-        if len(low) < 4:
-            # خُد الأقل تشابهًا عالميًا
-            all_sorted = sorted([(jaccard(t_self, tok[j]), j) for j in range(len(tok)) if j != idx], key=lambda x: x[0])
-            extra = pick_many(all_sorted, 4 - len(low))
-            low.extend(extra[:max(0, 4 - len(low))])
-
-        # لو أي قائمة مش مكتمِلة 4 → تخطّي السجل بالكامل (علشان الفاليديتور)
-        if not (len(high) == len(medium) == len(low) == 4):
-            # ارجع الـ query/gt المستخدمة عشان ممكن نعيد استخدامها لاحقًا
-            used_queries.discard(query)
-            used_ground_truth.discard(gt)
-            continue
+    if not os.path.exists(IN):
+        print(f"❌ {IN} not found. Run fetch_github_data.py first.")
+        sys.exit(1)
 
-        example = {
-            "query": query,
-            "description": description,
-            "ground_truth": gt,
-            "high_relevance": high,
-            "medium_relevance": medium,
-            "low_relevance": low
-        }
-        dataset.append(example)
+    with METRICS.time("filter"):
+        filtered = load_repos(IN)
+    random.shuffle(filtered)
+    print(f"📦 candidates after filtering: {len(filtered)}")
+    METRICS.count("repos_kept", len(filtered))
+
+    seen = open_seen()
+    corpus = prepare_corpus(filtered, seen)
+    if seen is not None:
+        print(f"🧷 {len(corpus.seen_ids)} sentences already used in other runs ({len(seen)} in {SEEN_FILE})")
+
+    # عنواين uniqueness: (used_queries, used_ground_truth, used_relevance)
+    used = new_used(corpus)
+    strings = corpus.strings
+
+    dataset = open_output(OUT, OUT_FORMAT, SHARD_SIZE, OUT_GZIP)
+    ckpt, begin = None, 0
+    if CHECKPOINT_EVERY > 0 or args.resume:
+        st = os.stat(IN)
+        # أي حاجة بتغير الناتج لازم تبقى زي ما هي عشان الـ resume يطلع نفس الداتاسيت
+        config = {"input": os.path.abspath(IN), "input_size": st.st_size, "input_mtime": st.st_mtime,
+                  "repos": len(filtered), "seed": SEED, "target": TARGET, "similarity": SIMILARITY,
+                  "lsh": [LSH_BANDS, LSH_ROWS], "low_sample_tries": LOW_SAMPLE_TRIES,
+                  "seen": [os.path.abspath(SEEN_FILE), len(seen)] if seen else None}
+        ckpt = Checkpointer(CHECKPOINT_DIR, config, every=CHECKPOINT_EVERY or 1000)
+    if args.resume:
+        if not os.path.exists(os.path.join(CHECKPOINT_DIR, "state.json")):
+            print(f"❌ no checkpoint in {CHECKPOINT_DIR}/ to resume from.")
+            sys.exit(1)
+        begin, records, leaked = ckpt.load()
+        for x in records:
+            dataset.append(x)
+            used[0].add(strings.id(x["query"]))
+            used[1].add(x["ground_truth"])
+            used[2].update(strings.id(s) for s in x["high_relevance"] + x["medium_relevance"] + x["low_relevance"])
+        used[2].update(strings.id(s) for s in leaked)
+        print(f"⏯️ resuming at anchor {begin} with {len(records)} examples")
+    if ckpt:
+        ckpt.start(fresh=not args.resume)
+    workers = args.workers
+    ok = False
+    try:
+        workers = generate(corpus, workers, used, dataset, begin=begin, ckpt=ckpt)
+        ok = len(dataset) >= MIN_OK
+    finally:
+        if ckpt:
+            ckpt.close()
+        if isinstance(dataset, ShardWriter):
+            dataset.close(ok)
+        # بيتكتب حتى لو الـ build وقع أو طلع ناقص، عشان نعرف الوقت راح فين والـ anchors اترفضت ليه
+        summary = METRICS.write("generate_dataset", METRICS_JSON, METRICS_PROM,
+                                records=len(dataset), workers=workers, similarity=SIMILARITY)
+        if summary:
+            top = ", ".join(f"{k}={v}" for k, v in list(summary["rejections"].items())[:5])
+            print(f"📊 metrics → {METRICS_JSON}, {METRICS_PROM} (rejected: {top or 'none'})")
 
     if len(dataset) < MIN_OK:
         raise ValueError(f"⚠️ Built only {len(dataset)} examples (<{MIN_OK}). Increase orgs or pages.")
 
+    if isinstance(dataset, ShardWriter):
+        if ckpt:
+            ckpt.remove()
+        remember(seen, iter_records(dataset.out_dir))
+        print(f"✅ Built {len(dataset)} examples → {dataset.out_dir}/ ({len(dataset.shards)} shards)")
+        return
+
     with open(OUT, "w", encoding="utf-8") as f:
         json.dump(dataset, f, ensure_ascii=False, indent=2)
+    if ckpt:
+        ckpt.remove()   # الناتج اتكتب كامل، الـ checkpoint مالوش لازمة
+    remember(seen, dataset)
 
     print(f"✅ Built {len(dataset)} examples → {OUT}")
     # quick assert
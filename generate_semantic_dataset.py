@@ -1,8 +1,16 @@
+import argparse
 import json
 import os
 import random
 
-NUM_RECORDS = 210
+from dataset_io import ShardWriter, write_json_array
+from pair_sampler import PairSpace, sample_pairs
+
+NUM_RECORDS = int(os.getenv("NUM_RECORDS", "210"))
+SEED = int(os.getenv("SEED", "42"))
+KB_FILE = os.getenv("KNOWLEDGE_BASE_FILE", "")   # فاضي = KNOWLEDGE_BASE اللي تحت
+OUTPUT_DIR = 'service_discovery_semantic_data'
+OUTPUT_FILE = 'service_discovery_semantic_queries.json'
 
 # --- قاعدة المعرفة الموسعة بشكل جنوني لضمان النجاح ---
 KNOWLEDGE_BASE = {
@@ -36,12 +44,12 @@ KNOWLEDGE_BASE = {
     }
 }
 
-def create_record_from_pair(query, ground_truth, concept_key):
-    concept_data = KNOWLEDGE_BASE[concept_key]
+def create_record_from_pair(query, ground_truth, concept_key, knowledge_base=KNOWLEDGE_BASE, rng=random):
+    concept_data = knowledge_base[concept_key]
     high_relevance_pool = [item for item in concept_data["high_relevance"] if item != ground_truth]
-    high_relevance_list = random.sample(high_relevance_pool, min(len(high_relevance_pool), 4))
-    medium_relevance_list = random.sample(concept_data["medium_relevance"], 4)
-    low_relevance_list = random.sample(concept_data["low_relevance"], 4)
+    high_relevance_list = rng.sample(high_relevance_pool, min(len(high_relevance_pool), 4))
+    medium_relevance_list = rng.sample(concept_data["medium_relevance"], 4)
+    low_relevance_list = rng.sample(concept_data["low_relevance"], 4)
     return {
         "query": query,
         "description": f"A semantic evaluation record for the concept: {concept_key}.",
@@ -51,40 +59,54 @@ def create_record_from_pair(query, ground_truth, concept_key):
         "low_relevance": low_relevance_list,
     }
 
-def main():
-    print("Generating Final, Guaranteed 210 Records Dataset...")
-    all_possible_pairs = []
-    for concept_key, concept_data in KNOWLEDGE_BASE.items():
-        for query in concept_data["detailed_queries"]:
-            for ground_truth in concept_data["ground_truth_candidates"]:
-                all_possible_pairs.append((query, ground_truth, concept_key))
-    
-    random.shuffle(all_possible_pairs)
-    
-    dataset = []
-    # --- هذا هو المنطق الجديد والمضمون ---
-    # نأخذ كل الأزواج الفريدة المتاحة أولاً
-    unique_pairs_to_use = all_possible_pairs
-    
-    # ننشئ السجلات من الأزواج الفريدة
-    for q, gt, ck in unique_pairs_to_use:
-        dataset.append(create_record_from_pair(q, gt, ck))
-        
-    # إذا لم نصل إلى 210، نكرر من البداية بشكل عشوائي حتى نصل
-    while len(dataset) < NUM_RECORDS:
-        q, gt, ck = random.choice(all_possible_pairs)
-        dataset.append(create_record_from_pair(q, gt, ck))
-        
-    # نأخذ فقط أول 210 سجل لضمان العدد المطلوب بالضبط
-    final_dataset = dataset[:NUM_RECORDS]
-    random.shuffle(final_dataset) # نخلط الترتيب النهائي
-    
-    output_dir = 'service_discovery_semantic_data'
-    if not os.path.exists(output_dir): os.makedirs(output_dir)
-    output_path = os.path.join(output_dir, 'service_discovery_semantic_queries.json')
-    with open(output_path, 'w') as f:
-        json.dump(final_dataset, f, indent=4)
-    print(f"\nProfessional dataset with exactly {len(final_dataset)} records saved to: {output_path}")
+def load_knowledge_base(path):
+    # نفس شكل KNOWLEDGE_BASE: {concept: {detailed_queries, ground_truth_candidates, high/medium/low_relevance}}
+    with open(path, "r", encoding="utf-8") as f:
+        kb = json.load(f)
+    for key, data in kb.items():
+        for field in ("medium_relevance", "low_relevance"):
+            if len(data.get(field, [])) < 4:
+                raise ValueError(f"❌ {path}: concept {key!r} needs at least 4 {field} items")
+        for field in ("detailed_queries", "ground_truth_candidates", "high_relevance"):
+            data.setdefault(field, [])
+    return kb
+
+def iter_records(knowledge_base, count, seed=SEED):
+    # الأزواج بتتحسب بالـ position من الفضاء (مفيش cartesian product في الذاكرة):
+    # كل الأزواج الفريدة الأول، ولو count أكبر من الفضاء لفة تانية بترتيب عشوائي جديد
+    rng = random.Random(seed)
+    for q, gt, ck in sample_pairs(PairSpace(knowledge_base), count, seed=seed):
+        yield create_record_from_pair(q, gt, ck, knowledge_base, rng)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=NUM_RECORDS)
+    ap.add_argument("--kb", default=KB_FILE, help="knowledge base من ملف JSON بدل اللي في الكود")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--out", default=os.path.join(OUTPUT_DIR, OUTPUT_FILE))
+    ap.add_argument("--format", choices=("json", "jsonl"), default="json",
+                    help="jsonl = shards في فولدر بنفس اسم الملف")
+    ap.add_argument("--shard-size", type=int, default=0)
+    ap.add_argument("--gzip", action="store_true")
+    args = ap.parse_args(argv)
+
+    kb = load_knowledge_base(args.kb) if args.kb else KNOWLEDGE_BASE
+    space = PairSpace(kb)
+    print(f"Generating {args.records} records from {len(space)} unique (query, ground_truth) pairs...")
+    if not len(space):
+        raise ValueError("❌ knowledge base has no (query, ground_truth) pairs")
+
+    records = iter_records(kb, args.records, args.seed)
+    if args.format == "jsonl":
+        out_dir = os.path.splitext(args.out)[0]
+        with ShardWriter(out_dir, shard_size=args.shard_size, compress=args.gzip) as w:
+            for r in records:
+                w.append(r)
+        n, output_path = len(w), out_dir + "/"
+    else:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        n, output_path = write_json_array(records, args.out, indent=4), args.out
+    print(f"\nProfessional dataset with exactly {n} records saved to: {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from requests.utils import parse_header_links
+
+# cache على الديسك لردود الـ API: لكل URL الـ body + ETag + Last-Modified + Link
+# التشغيل اللي بعده بيبعت If-None-Match / If-Modified-Since، ولو الرد 304 بناخد الـ body من هنا
+# (ردود 304 من GitHub مش بتتحسب من الـ rate limit).
+# max_age > 0: أي entry أحدث من كده بيترجع من غير request خالص (استكمال crawl اتقطع)
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0      # طلبات اتبعتت فعلًا
+        self.revalidated = 0   # 304
+        self.fresh = 0         # من الـ cache من غير request
+        self.stored = 0        # 200 جديدة اتخزنت
+        self.bytes_saved = 0
+
+    def add(self, **kw):
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def summary(self):
+        hits = self.revalidated + self.fresh
+        total = hits + self.stored
+        rate = hits / total * 100 if total else 0.0
+        return (f"cache: {self.requests} requests sent, {hits}/{total} pages from cache ({rate:.0f}%), "
+                f"{self.revalidated} revalidated (304), {self.fresh} without a request, "
+                f"{self.bytes_saved / 1e6:.2f} MB not downloaded")
+
+
+class HTTPCache:
+    def __init__(self, root, max_age=0):
+        self.root = root
+        self.max_age = max_age
+        self.stats = CacheStats()
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def is_fresh(self, entry):
+        return self.max_age > 0 and time.time() - entry.get("stored_at", 0) < self.max_age
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, resp):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "link": resp.headers.get("Link"),
+            "stored_at": time.time(),
+        }
+        # الـ body الأول وبعده الـ meta: entry ناقصة عمرها ما تتقري كأنها سليمة
+        for path, data, mode in ((body_path, resp.content, "wb"),
+                                 (meta_path, json.dumps(meta), "w")):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+        self.stats.add(stored=1)
+
+    def touch(self, url, entry):
+        # 304 → الـ entry لسه سليمة؛ نحدّث stored_at بس
+        meta_path, _ = self._paths(url)
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        meta["stored_at"] = time.time()
+        tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+
+def cached_links(entry):
+    # نفس شكل resp.links بتاع requests
+    if not entry.get("link"):
+        return {}
+    return {l.get("rel") or l["url"]: l for l in parse_header_links(entry["link"])}
@@ -0,0 +1,160 @@
+import json
+import os
+import resource
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+
+# قياسات خفيفة للـ builders: وقت كل مرحلة، عدادات، وسبب رفض كل anchor
+#   METRICS=1            شغّال (الافتراضي مقفول: NullMetrics كل دوالها فاضية)
+#   METRICS_MEMORY=1     peak memory من tracemalloc كمان (بيبطّأ الـ allocation، فمنفصل)
+#   METRICS_JSON / METRICS_PROM   مسارات الملخص JSON و Prometheus textfile
+
+ENABLED = os.getenv("METRICS", "0") == "1"
+TRACE_MEMORY = os.getenv("METRICS_MEMORY", "0") == "1"
+
+
+class _Timer:
+    __slots__ = ("slot", "start")
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.slot[0] += time.perf_counter() - self.start
+        self.slot[1] += 1
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.timers = {}          # stage → [seconds, calls]
+        self.counters = Counter()
+        self.rejections = Counter()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def time(self, stage):
+        slot = self.timers.get(stage)
+        if slot is None:
+            slot = self.timers[stage] = [0.0, 0]
+        return _Timer(slot)
+
+    def count(self, event, n=1):
+        self.counters[event] += n
+
+    def reject(self, reason):
+        self.rejections[reason] += 1
+
+    def snapshot(self):
+        return {"timers": {k: list(v) for k, v in self.timers.items()},
+                "counters": dict(self.counters), "rejections": dict(self.rejections)}
+
+    def merge(self, snap):
+        # snapshot من process تانية (worker) أو من build واحد
+        for stage, (seconds, calls) in snap["timers"].items():
+            slot = self.timers.setdefault(stage, [0.0, 0])
+            slot[0] += seconds
+            slot[1] += calls
+        self.counters.update(snap["counters"])
+        self.rejections.update(snap["rejections"])
+
+    def summary(self, builder, **extra):
+        out = {
+            "builder": builder,
+            "stages": {k: {"seconds": round(s, 6), "calls": c} for k, (s, c) in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "rejections": dict(self.rejections.most_common()),
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+        if self.trace_memory:
+            out["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        out.update(extra)
+        return out
+
+    def write(self, builder, json_path=None, prom_path=None, **extra):
+        summary = self.summary(builder, **extra)
+        if json_path:
+            _atomic_write(json_path, json.dumps(summary, indent=2, ensure_ascii=False) + "\n")
+        if prom_path:
+            _atomic_write(prom_path, prometheus_text(summary))
+        return summary
+
+
+class NullMetrics:
+    """نفس واجهة Metrics ومن غير أي شغل."""
+    enabled = False
+    _null = nullcontext()
+
+    def time(self, stage):
+        return self._null
+
+    def count(self, event, n=1):
+        pass
+
+    def reject(self, reason):
+        pass
+
+    def snapshot(self):
+        return None
+
+    def merge(self, snap):
+        pass
+
+    def write(self, builder, json_path=None, prom_path=None, **extra):
+        return None
+
+
+NULL = NullMetrics()
+
+
+def from_env():
+    return Metrics(trace_memory=TRACE_MEMORY) if ENABLED else NULL
+
+
+def _atomic_write(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(summary):
+    """الملخص بصيغة node_exporter textfile collector."""
+    b = f'builder="{_label(summary["builder"])}"'
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{{{b}{labels}}} {value}")
+
+    stages = summary["stages"]
+    metric("dataset_stage_seconds_total", "counter", "Time spent in each builder stage.",
+           [(f',stage="{_label(k)}"', v["seconds"]) for k, v in stages.items()])
+    metric("dataset_stage_calls_total", "counter", "Calls of each builder stage.",
+           [(f',stage="{_label(k)}"', v["calls"]) for k, v in stages.items()])
+    metric("dataset_events_total", "counter", "Builder events (fallbacks, short tiers, ...).",
+           [(f',event="{_label(k)}"', v) for k, v in summary["counters"].items()])
+    metric("dataset_anchor_rejections_total", "counter", "Anchors dropped, by reason.",
+           [(f',reason="{_label(k)}"', v) for k, v in summary["rejections"].items()])
+    metric("dataset_peak_rss_bytes", "gauge", "Peak resident set size of the builder.",
+           [("", summary["peak_rss_bytes"])])
+    if "tracemalloc_peak_bytes" in summary:
+        metric("dataset_tracemalloc_peak_bytes", "gauge", "Peak traced Python allocations.",
+               [("", summary["tracemalloc_peak_bytes"])])
+    for key in ("records", "anchors"):
+        if key in summary:
+            metric(f"dataset_{key}", "gauge", f"Number of {key} at the end of the run.", [("", summary[key])])
+    return "\n".join(lines) + "\n"
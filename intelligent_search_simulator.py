@@ -1,29 +1,59 @@
+import argparse
 import json
 import os
 from pprint import pprint
 import random
+import time
+
+import numpy as np
+
+import ir_metrics
+from binary_dataset import BinaryDataset, is_binary
+from dataset_io import iter_records
+from search_engine import index_projects, record_projects
 
 DATASET_PATH = os.path.join('cse_evaluation_data', 'cse_project_queries.json')
+TOP_K = int(os.getenv("SEARCH_TOP_K", "50"))
 
-def load_all_projects_with_tags(filepath):
-    try:
-        with open(filepath, 'r') as f:
-            dataset = json.load(f)
-    except FileNotFoundError:
-        return None, None
-    
+CONCEPTS = {
+    "MachineLearning": {"search_tags": ["machine learning", "ai", "artificial intelligence", "prediction", "computer vision", "nlp", "chatbot"]},
+    "WebDevelopment": {"search_tags": ["web", "website", "frontend", "backend", "full-stack", "e-commerce", "social media"]},
+    "MobileDevelopment": {"search_tags": ["mobile", "android", "ios", "app", "game", "food delivery"]},
+    "CyberSecurity": {"search_tags": ["security", "cybersecurity", "encryption", "malware", "secure chat"]},
+    "OperatingSystems": {"search_tags": ["os", "operating system", "kernel", "scheduler", "file system"]}
+}
+
+def project_tags(projects, concepts=CONCEPTS):
     project_database = {}
-    for record in dataset:
-        all_projects_in_record = [record['ground_truth']] + record['high_relevance'] + record['medium_relevance'] + record['low_relevance']
-        for project in all_projects_in_record:
-            if project and project not in project_database:
-                concept_key = project.split('-')[0]
-                if concept_key in CONCEPTS:
-                    project_database[project] = CONCEPTS[concept_key]['search_tags']
-    
-    return dataset, project_database
+    for project in projects:
+        if project and project not in project_database:
+            concept_key = project.split('-')[0]
+            if concept_key in concepts:
+                project_database[project] = concepts[concept_key]['search_tags']
+    return project_database
+
+def all_projects(dataset):
+    # binary: من أعمدة الـ IDs على طول من غير ما نفك كل record
+    if isinstance(dataset, BinaryDataset):
+        return dataset.projects()
+    return record_projects(dataset)
+
+def load_dataset(filepath):
+    if not os.path.exists(filepath):
+        return None
+    if is_binary(filepath):
+        # الـ records بتتقري بالطلب من الـ mmap
+        return BinaryDataset(filepath)
+    return list(iter_records(filepath))
+
+def load_all_projects_with_tags(filepath):
+    dataset = load_dataset(filepath)
+    if not dataset:
+        return dataset, None
+    return dataset, project_tags(all_projects(dataset))
 
 def find_matching_projects(query, project_database):
+    # الـ scan القديم (substring على كل tag لكل project)؛ main بقت بتستخدم BM25Index
     query_words = set(query.lower().split())
     stop_words = {'ideas', 'for', 'graduation', 'project', 'a', 'an', 'the'}
     search_terms = query_words - stop_words
@@ -57,20 +87,105 @@ def ranked_search(query_record, all_matches):
         
     return "No relevant projects found", []
 
-def main():
-    # This CONCEPTS dictionary needs to be defined here for the loading function to work
-    global CONCEPTS
-    CONCEPTS = {
-        "MachineLearning": {"search_tags": ["machine learning", "ai", "artificial intelligence", "prediction", "computer vision", "nlp", "chatbot"]},
-        "WebDevelopment": {"search_tags": ["web", "website", "frontend", "backend", "full-stack", "e-commerce", "social media"]},
-        "MobileDevelopment": {"search_tags": ["mobile", "android", "ios", "app", "game", "food delivery"]},
-        "CyberSecurity": {"search_tags": ["security", "cybersecurity", "encryption", "malware", "secure chat"]},
-        "OperatingSystems": {"search_tags": ["os", "operating system", "kernel", "scheduler", "file system"]}
+class ScanIndex:
+    """الـ scan القديم (find_matching_projects) بنفس واجهة BM25Index عشان يتقارن بيه؛ مفيش ترتيب، كله score 1."""
+    def __init__(self, project_database):
+        self.project_database = project_database
+
+    def __len__(self):
+        return len(self.project_database)
+
+    def search(self, query, k=10):
+        return [(p, 1.0) for p in find_matching_projects(query, self.project_database)[:k]]
+
+# engine → (projects, tags) → index فيه search(query, k)
+ENGINES = {
+    "bm25": index_projects,
+    "bm25-notags": lambda projects, tags: index_projects(projects),
+    "scan": lambda projects, tags: ScanIndex(tags),
+}
+
+class Matcher:
+    """الـ index بيتبني مرة في __init__ وبعد كده قراية بس، فنفس الـ instance ينفع من كذا thread."""
+    def __init__(self, dataset, engine="bm25", concepts=CONCEPTS):
+        projects = list(all_projects(dataset))
+        self.engine = engine
+        self.index = ENGINES[engine](projects, project_tags(projects, concepts))
+
+    def __len__(self):
+        return len(self.index)
+
+    def search(self, query, k=TOP_K):
+        return self.index.search(query, k=k)
+
+    def match(self, record, k=TOP_K):
+        """(hits, relevance level, النتايج) لـ record زي ما main بتعرضها."""
+        hits = self.search(record['query'], k)
+        return (hits,) + ranked_search(record, {project for project, _ in hits})
+
+def record_tiers(record):
+    # project → درجته في الـ record (لو مكرر في أكتر من درجة، الأعلى هي اللي بتتحسب)
+    tiers = {}
+    for t, key in enumerate(("ground_truth", "high_relevance", "medium_relevance", "low_relevance")):
+        projects = [record[key]] if t == 0 else record[key]
+        for p in projects:
+            if p:
+                tiers.setdefault(p, t)
+    return tiers
+
+def evaluate(dataset, index, k=10):
+    """كل query في الداتاسيت ضد الـ index → ملخص MRR / nDCG@k / recall@k لكل درجة + latency."""
+    n = len(dataset)
+    tiers = np.full((n, k), ir_metrics.NONE, dtype=np.int8)
+    sizes = np.zeros((n, len(ir_metrics.TIERS)), dtype=np.int32)
+    latencies = np.zeros(n)
+    start = time.perf_counter()
+    for i, record in enumerate(dataset):
+        t0 = time.perf_counter()
+        hits = index.search(record['query'], k=k)
+        latencies[i] = time.perf_counter() - t0
+        labels = record_tiers(record)
+        sizes[i] = np.bincount(list(labels.values()), minlength=len(ir_metrics.TIERS))
+        tiers[i, :len(hits)] = [labels.get(p, ir_metrics.NONE) for p, _ in hits]
+    total = time.perf_counter() - start
+
+    return {
+        "queries": n,
+        "projects": len(index),
+        "k": k,
+        "mrr": round(float(ir_metrics.reciprocal_rank(tiers).mean()), 6) if n else None,
+        f"ndcg@{k}": round(float(ir_metrics.ndcg(tiers, sizes).mean()), 6) if n else None,
+        f"recall@{k}": {t: None if v is None else round(v, 6) for t, v in ir_metrics.recall(tiers, sizes).items()},
+        "qps": round(n / total, 1) if total else None,
+        "latency_ms": {s: round(v, 4) for s, v in ir_metrics.latency_summary(latencies).items()} if n else None,
     }
 
-    dataset, project_db = load_all_projects_with_tags(DATASET_PATH)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="محاكاة البحث على الداتاسيت")
+    ap.add_argument("--dataset", default=DATASET_PATH)
+    ap.add_argument("--batch", action="store_true", help="كل الـ queries بدل query عشوائية واحدة")
+    ap.add_argument("--k", type=int, default=10, help="عمق التقييم في وضع --batch")
+    ap.add_argument("--out", help="اكتب ملخص --batch JSON هنا")
+    ap.add_argument("--engine", choices=sorted(ENGINES), default="bm25")
+    args = ap.parse_args(argv)
+
+    dataset = load_dataset(args.dataset)
     if not dataset:
-        print(f"Dataset not found. Please run Jenkins to generate '{DATASET_PATH}' first.")
+        print(f"Dataset not found. Please run Jenkins to generate '{args.dataset}' first.")
+        return
+
+    if args.batch:
+        start = time.perf_counter()
+        matcher = Matcher(dataset, args.engine)
+        summary = {"dataset": args.dataset, "index_build_s": round(time.perf_counter() - start, 3)}
+        if args.engine != "bm25":
+            summary["engine"] = args.engine
+        summary.update(evaluate(dataset, matcher, args.k))
+        text = json.dumps(summary, indent=2, ensure_ascii=False)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        print(text)
         return
 
     test_record = random.choice(dataset)
@@ -79,10 +194,14 @@ def main():
     print(f"User Query: \"{test_record['query']}\"")
     print(f"(The perfect answer should be: {test_record['ground_truth']})")
     
-    all_potential_matches = find_matching_projects(test_record['query'], project_db)
-    
-    relevance_level, final_results = ranked_search(test_record, all_potential_matches)
-    
+    matcher = Matcher(dataset, args.engine)
+    start = time.perf_counter()
+    hits, relevance_level, final_results = matcher.match(test_record)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"\n--- Top {args.engine.upper()} Hits ({len(matcher)} projects indexed, {elapsed_ms:.3f} ms) ---")
+    for project, score in hits[:5]:
+        print(f"{score:6.2f}  {project}")
+
     print("\n--- Final Ranked Results ---")
     print(f"Relevance Level Found: {relevance_level}")
     pprint(final_results)
@@ -0,0 +1,66 @@
+from array import array
+
+import numpy as np
+
+# interning للجُمل والـ tokens: كل نص مختلف بياخد رقم مرة واحدة، والـ loops بتشتغل على الأرقام
+# - StringTable: نص ↔ رقم + طول كل نص (من غير ما نلمس النص نفسه)
+# - IdSet: set أرقام في [0, n) على bytearray (بايت لكل رقم، من غير hashing)
+# النص بيرجع بـ table[i] وقت كتابة السجل بس
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+        self.lengths = array("I")
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, i):
+        return self.strings[i]
+
+    def intern(self, s):
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+            self.lengths.append(len(s))
+        return i
+
+    def id(self, s):
+        """رقم نص موجود (KeyError لو مش في الجدول)."""
+        return self.ids[s]
+
+
+class IdSet:
+    """نفس واجهة set (in / add / discard / update / len / iter) لأرقام أصغر من n."""
+    __slots__ = ("bits", "size")
+
+    def __init__(self, n, items=()):
+        self.bits = bytearray(n)
+        self.size = 0
+        self.update(items)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, i):
+        return self.bits[i] == 1
+
+    def __iter__(self):
+        return iter(np.flatnonzero(np.frombuffer(self.bits, dtype=np.uint8)).tolist())
+
+    def add(self, i):
+        if not self.bits[i]:
+            self.bits[i] = 1
+            self.size += 1
+
+    def discard(self, i):
+        if self.bits[i]:
+            self.bits[i] = 0
+            self.size -= 1
+
+    def update(self, items):
+        for i in items:
+            self.add(i)
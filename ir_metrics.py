@@ -0,0 +1,58 @@
+import numpy as np
+
+# مقاييس الاسترجاع على مصفوفات numpy لكل الـ queries مرة واحدة
+#   tiers: (n, k) int8 — درجة كل نتيجة في الترتيب: 0 ground_truth، 1 high، 2 medium، 3 low، -1 مش من الـ record
+#   sizes: (n, 4) — عدد المشاريع في كل درجة لكل record (للـ recall والـ ideal DCG)
+
+TIERS = ("ground_truth", "high", "medium", "low")
+GAINS = np.array([3.0, 2.0, 1.0, 0.0])   # gain لكل درجة في nDCG (low = مش relevant)
+NONE = -1
+
+
+def gains(tiers):
+    g = np.zeros(tiers.shape)
+    hit = tiers >= 0
+    g[hit] = GAINS[tiers[hit]]
+    return g
+
+
+def discounts(k):
+    return 1.0 / np.log2(np.arange(2, k + 2))
+
+
+def reciprocal_rank(tiers, tier=0):
+    """1/rank لأول نتيجة من الدرجة دي، و0 لو مش في الـ top k."""
+    hit = tiers == tier
+    found = hit.any(axis=1)
+    return np.where(found, 1.0 / (hit.argmax(axis=1) + 1), 0.0)
+
+
+def ndcg(tiers, sizes):
+    k = tiers.shape[1]
+    disc = discounts(k)
+    dcg = gains(tiers) @ disc
+    # الترتيب المثالي: كل الـ ground_truth بعدين high بعدين medium ... مقصوص على k
+    bounds = np.cumsum(sizes, axis=1)                          # (n, 4)
+    pos = np.arange(k)
+    ideal_tier = (pos[None, :, None] >= bounds[:, None, :]).sum(axis=2)   # (n, k) رقم الدرجة في المكان ده
+    ideal = np.where(ideal_tier < len(TIERS), GAINS[np.minimum(ideal_tier, len(TIERS) - 1)], 0.0)
+    idcg = ideal @ disc
+    return np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+
+def recall(tiers, sizes):
+    """recall@k لكل درجة: المتوسط على الـ records اللي فيها الدرجة دي بس."""
+    out = {}
+    for t, name in enumerate(TIERS):
+        has = sizes[:, t] > 0
+        found = (tiers[has] == t).sum(axis=1)
+        out[name] = float((found / sizes[has, t]).mean()) if has.any() else None
+    return out
+
+
+def latency_summary(seconds, percentiles=(50, 90, 99)):
+    ms = np.asarray(seconds) * 1000
+    out = {"mean": float(ms.mean())}
+    out.update({f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(ms, percentiles))})
+    out["max"] = float(ms.max())
+    return out
@@ -0,0 +1,74 @@
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+# MinHash + banded LSH لإيجاد المرشحين بتشابه Jaccard بدون مقارنة كل زوج
+# عدد الـ permutations = bands * rows
+# bands أكتر / rows أقل → recall أعلى ومرشحين أكتر (أبطأ)
+# bands أقل / rows أكتر → مرشحين أقل وأسرع بس بيفوّت التشابه الضعيف
+# العتبة التقريبية: (1 / bands) ** (1 / rows)
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def token_hash(t: str) -> int:
+    # hash ثابت بين التشغيلات (hash() بتاع بايثون عشوائي لكل process)
+    return int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHashLSH:
+    def __init__(self, bands=16, rows=1, seed=1):
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        gen = np.random.RandomState(seed)
+        self._a = gen.randint(1, (1 << 61) - 1, size=self.num_perm, dtype=np.uint64)
+        self._b = gen.randint(0, (1 << 61) - 1, size=self.num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._sigs = []
+
+    def signature(self, toks, hashes=None):
+        # hashes: لو toks أرقام tokens، hash كل رقم محسوب مسبقًا (نفس token_hash للنص)
+        if not toks:
+            return None
+        if hashes is not None:
+            hv = hashes[np.fromiter(toks, dtype=np.int64, count=len(toks))]
+        else:
+            hv = np.fromiter((token_hash(t) for t in toks), dtype=np.uint64, count=len(toks))
+        # overflow في uint64 مقصود (نفس أسلوب datasketch)
+        with np.errstate(over="ignore"):
+            phv = (np.outer(self._a, hv) + self._b[:, None]) % _MERSENNE
+        return (phv & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [sig[b * r:(b + 1) * r].tobytes() for b in range(self.bands)]
+
+    def add(self, sig):
+        i = len(self._sigs)
+        self._sigs.append(sig)
+        if sig is not None:
+            for b, key in enumerate(self._band_keys(sig)):
+                self._buckets[b][key].append(i)
+        return i
+
+    def build(self, token_sets, hashes=None):
+        for t in token_sets:
+            self.add(self.signature(t, hashes))
+        return self
+
+    def candidates(self, i):
+        # كل الـ repos اللي شاركت i في band واحد على الأقل (من غير i نفسه)
+        sig = self._sigs[i]
+        if sig is None:
+            return set()
+        out = set()
+        for b, key in enumerate(self._band_keys(sig)):
+            out.update(self._buckets[b][key])
+        out.discard(i)
+        return out
+
+    def __len__(self):
+        return len(self._sigs)
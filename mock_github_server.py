@@ -0,0 +1,327 @@
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from synthetic_corpus import make_corpus
+
+# stand-in محلي لـ GitHub REST API عشان نجرب fetch_github_data من غير نت
+#   GET /orgs/<org>/repos?per_page=&page=   صفحات بـ Link (next/last) و X-RateLimit-*
+#   GET /repos/<owner>/<repo>/readme         الـ README كـ markdown خام (404 لو مفيش)
+# الـ rate limit: RATE_LIMIT طلب لكل window؛ بعدها 403 وRemaining=0 لحد الـ reset
+# --fail-every N: كل طلب رقم N بيرجع 429 بـ Retry-After (لتجربة الـ backoff)
+# كل رد 200 ليه ETag؛ If-None-Match مطابق → 304 من غير ما ياخد من الـ quota (زي GitHub)
+#   POST /graphql                            الـ query اللي fetch_github_data.graphql_query بتبنيها:
+#     الـ mock مش parser، بيقرا الـ variables (login<i> / first<i> / after<i>) ويرد بنفس شكل GitHub
+#     --graphql-max-bytes N: رد أكبر من N → 502 زي الـ timeout بتاع GitHub للـ queries التقيلة
+#     --replay FILE: يرد بالردود المتسجلة (GRAPHQL_RECORD=FILE في fetch_github_data) بدل الصناعية
+#     --forbidden ORG,...: الـ alias بتاع الـ orgs دي null + error FORBIDDEN (زي org عليه SAML)
+
+
+class MockGitHub:
+    def __init__(self, repos_by_org, readmes=None, rate_limit=5000, window=60.0, fail_every=0,
+                 graphql_max_bytes=0, recorded=None, forbidden=()):
+        self.repos_by_org = repos_by_org
+        self.forbidden = set(forbidden)
+        self.readmes = readmes or {}
+        self.graphql_max_bytes = graphql_max_bytes
+        self.recorded = recorded
+        self.rate_limit = rate_limit
+        self.window = window
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.used = 0
+        self.requests = 0
+        self.stats = defaultdict(int)
+
+    def take_quota(self):
+        # بيرجع (allowed, remaining, reset)
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.window:
+                self.window_start, self.used = now, 0
+            self.requests += 1
+            reset = int(self.window_start + self.window) + 1
+            if self.used >= self.rate_limit:
+                return False, 0, reset
+            self.used += 1
+            return True, self.rate_limit - self.used, reset
+
+    def refund(self):
+        with self.lock:
+            self.used = max(0, self.used - 1)
+
+    def should_fail(self):
+        with self.lock:
+            return bool(self.fail_every) and self.requests % self.fail_every == 0
+
+    def graphql(self, payload, remaining, reset):
+        """(status, body) للـ query."""
+        if self.recorded is not None:
+            hit = self.recorded.get(graphql_key(payload))
+            if hit is None:
+                self.stats["replay_miss"] += 1
+                return 200, {"errors": [{"type": "MOCK_MISS", "message": "no recorded response for this query"}]}
+            return hit
+        variables = payload.get("variables") or {}
+        with_readme = "readme0:" in payload.get("query", "")
+        data, errors, i, nodes = {}, [], 0, 0
+        while f"login{i}" in variables:
+            org, first = variables[f"login{i}"], variables[f"first{i}"]
+            repos = self.repos_by_org.get(org)
+            if first > 100:
+                return 200, {"errors": [{"type": "EXCESSIVE_PAGINATION",
+                                         "message": f"Requesting {first} records exceeds the `first` limit of 100"}]}
+            if repos is None:
+                data[f"o{i}"] = None
+                errors.append({"type": "NOT_FOUND", "path": [f"o{i}"],
+                               "message": f"Could not resolve to an Organization with the login of '{org}'."})
+            elif org in self.forbidden:
+                data[f"o{i}"] = None
+                errors.append({"type": "FORBIDDEN", "path": [f"o{i}", "repositories"],
+                               "message": f"Resource protected by organization SAML enforcement ({org})."})
+            else:
+                start = decode_cursor(variables.get(f"after{i}"))
+                page = repos[start:start + first]
+                nodes += first
+                data[f"o{i}"] = {"repositories": {
+                    "pageInfo": {"hasNextPage": start + len(page) < len(repos),
+                                 "endCursor": encode_cursor(start + len(page)) if page else None},
+                    "nodes": [self.graphql_node(r, with_readme) for r in page]}}
+            i += 1
+        cost = max(1, -(-(i + nodes) // 100))
+        data["rateLimit"] = {"cost": cost, "remaining": remaining,
+                             "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(reset))}
+        self.stats["graphql_cost"] += cost
+        body = {"data": data}
+        if errors:
+            body["errors"] = errors
+        if self.graphql_max_bytes and len(json.dumps(body)) > self.graphql_max_bytes:
+            self.stats["graphql_timeouts"] += 1
+            return 502, {"message": "We couldn't respond to your request in time. "
+                                    "Sorry about that. Please try resubmitting your request and contact us if the problem persists."}
+        return 200, body
+
+    def graphql_node(self, repo, with_readme):
+        node = {"nameWithOwner": repo["full_name"],
+                "description": repo["description"],
+                "repositoryTopics": {"nodes": [{"topic": {"name": t}} for t in repo["topics"]]}}
+        if with_readme:
+            readme = self.readmes.get(repo["full_name"])
+            node["readme0"] = {"text": readme} if readme is not None else None
+            node.update({f"readme{k}": None for k in range(1, 5)})
+        return node
+
+
+def encode_cursor(offset):
+    return base64.b64encode(f"cursor:v2:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    return int(base64.b64decode(cursor).decode().rsplit(":", 1)[1]) if cursor else 0
+
+
+def graphql_key(payload):
+    return hashlib.sha256(json.dumps({"query": payload.get("query"), "variables": payload.get("variables")},
+                                     sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_recording(path):
+    # سطر لكل request من GRAPHQL_RECORD؛ لو نفس الـ query اتسجلت مرتين آخر رد هو اللي بيتاخد
+    recorded = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                recorded[graphql_key(r)] = (r["status"], json.loads(r["body"]))
+    return recorded
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive عشان الـ connection pool يبان أثره
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, body, headers=()):
+            self.send_body(status, json.dumps(body).encode("utf-8"), "application/json", headers)
+
+        def send_body(self, status, data, content_type, headers=()):
+            if status == 200:
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                headers = list(headers) + [("ETag", etag)]
+                if self.headers.get("If-None-Match") == etag:
+                    state.stats["not_modified"] += 1
+                    state.refund()
+                    self.send_response(304)
+                    for k, v in headers:
+                        self.send_header(k, v)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def admit(self):
+            # (limits, remaining, reset) أو None لو الطلب اترفض (403 / 429 اتبعتت خلاص)
+            allowed, remaining, reset = state.take_quota()
+            limits = [("X-RateLimit-Limit", str(state.rate_limit)),
+                      ("X-RateLimit-Remaining", str(remaining)),
+                      ("X-RateLimit-Reset", str(reset))]
+            state.stats["requests"] += 1
+            if not allowed:
+                state.stats["rate_limited"] += 1
+                self.send_json(403, {"message": "API rate limit exceeded"}, limits)
+                return None
+            if state.should_fail():
+                state.stats["throttled"] += 1
+                self.send_json(429, {"message": "secondary rate limit"}, limits + [("Retry-After", "1")])
+                return None
+            return limits, remaining, reset
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            admitted = self.admit()
+            if admitted is None:
+                return
+            limits, remaining, reset = admitted
+            if urlparse(self.path).path.rstrip("/") != "/graphql":
+                return self.send_json(404, {"message": "Not Found"}, limits)
+            state.stats["graphql"] += 1
+            status, body = state.graphql(payload, remaining, reset)
+            self.send_json(status, body, limits)
+
+        def do_GET(self):
+            if self.headers.get("If-None-Match"):
+                state.stats["conditional"] += 1
+            admitted = self.admit()
+            if admitted is None:
+                return
+            limits = admitted[0]
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos":
+                return self.org_repos(parts[1], parse_qs(url.query), limits)
+            if len(parts) == 4 and parts[0] == "repos" and parts[3] == "readme":
+                readme = state.readmes.get(f"{parts[1]}/{parts[2]}")
+                if readme is not None:
+                    return self.send_body(200, readme.encode("utf-8"), "text/plain; charset=utf-8", limits)
+            self.send_json(404, {"message": "Not Found"}, limits)
+
+        def org_repos(self, org, query, limits):
+            repos = state.repos_by_org.get(org)
+            if repos is None:
+                return self.send_json(404, {"message": "Not Found"}, limits)
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            last = max(1, -(-len(repos) // per_page))
+            body = repos[(page - 1) * per_page:page * per_page]
+            base = f"http://{self.headers.get('Host')}/orgs/{org}/repos?"
+            links = []
+            if page < last:
+                links.append(f'<{base}{urlencode({"per_page": per_page, "page": page + 1})}>; rel="next"')
+                links.append(f'<{base}{urlencode({"per_page": per_page, "page": last})}>; rel="last"')
+            headers = limits + ([("Link", ", ".join(links))] if links else [])
+            self.send_json(200, body, headers)
+
+    return Handler
+
+
+def api_repos(repos):
+    # شكل رد الـ REST API (من غير readme، زي GitHub)
+    by_org = defaultdict(list)
+    for r in repos:
+        by_org[r["org"]].append({
+            "full_name": r["full_name"],
+            "name": r["full_name"].split("/", 1)[1],
+            "description": r.get("description") or None,
+            "topics": r.get("topics", []),
+        })
+    return dict(by_org)
+
+
+def markdown_readme(text):
+    # نص الـ README الصناعي ملفوف بـ markdown زي الحقيقي (عناوين، badges، روابط، code)
+    if not text:
+        return None
+    paras = [p.strip() + "." for p in text.split(".") if p.strip()]
+    body = "\n\n".join(paras)
+    return ("# Overview\n\n"
+            "[![build](https://img.shields.io/badge/build-passing-green.svg)](https://ci.example.com)\n\n"
+            f"{body}\n\n## Install\n\n```bash\nmake install\n```\n\n"
+            "See the [docs](https://docs.example.com) for **more** details.\n")
+
+
+def serve(repos, host="127.0.0.1", port=0, **kw):
+    """بيشغل السيرفر في thread؛ بيرجع (server, state, base_url)."""
+    readmes = {r["full_name"]: markdown_readme(r.get("readme")) for r in repos}
+    state = MockGitHub(api_repos(repos), {k: v for k, v in readmes.items() if v}, **kw)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://{host}:{server.server_address[1]}"
+
+
+def synthetic_repos(orgs, n_repos, seed=0, fork_every=0):
+    # الـ orgs الصناعية org0..orgN بتتسمى بأسماء ORGS الحقيقية
+    # fork_every=N: كل repo رقم N بياخد نفس README اللي قبله (زي الـ forks)
+    repos = make_corpus(n_repos, n_orgs=len(orgs), seed=seed)
+    for i, r in enumerate(repos):
+        org = orgs[int(r["org"][3:])]
+        r["full_name"] = f"{org}/{r['full_name'].split('/', 1)[1]}"
+        r["org"] = org
+        if fork_every and i and i % fork_every == 0:
+            r["readme"] = repos[i - 1]["readme"]
+    return repos
+
+
+def main():
+    from fetch_github_data import ORGS
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--repos", type=int, default=3000, help="عدد الـ repos الصناعية")
+    ap.add_argument("--from-file", help="اخدم repos من ملف (JSON/JSONL) بدل الصناعية")
+    ap.add_argument("--rate-limit", type=int, default=5000)
+    ap.add_argument("--window", type=float, default=60.0)
+    ap.add_argument("--fail-every", type=int, default=0)
+    ap.add_argument("--fork-every", type=int, default=0, help="كل N repo بنفس README اللي قبله")
+    ap.add_argument("--graphql-max-bytes", type=int, default=0, help="رد GraphQL أكبر من كده → 502 (timeout)")
+    ap.add_argument("--replay", help="رد على /graphql من ملف GRAPHQL_RECORD")
+    ap.add_argument("--forbidden", default="", help="orgs مفصولة بـ , بترجع FORBIDDEN في /graphql")
+    args = ap.parse_args()
+
+    if args.from_file:
+        from dataset_io import iter_records
+        repos = list(iter_records(args.from_file))
+    else:
+        repos = synthetic_repos(ORGS, args.repos, fork_every=args.fork_every)
+    recorded = load_recording(args.replay) if args.replay else None
+    server, state, url = serve(repos, port=args.port, rate_limit=args.rate_limit,
+                               window=args.window, fail_every=args.fail_every,
+                               graphql_max_bytes=args.graphql_max_bytes, recorded=recorded,
+                               forbidden=[o for o in args.forbidden.split(",") if o])
+    print(f"🧪 mock GitHub API on {url} ({len(repos)} repos)")
+    print(f"   GITHUB_API={url} GITHUB_TOKEN=dummy python fetch_github_data.py")
+    print(f"   GITHUB_API={url} GITHUB_TOKEN=dummy FETCH_BACKEND=graphql python fetch_github_data.py")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
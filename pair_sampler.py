@@ -0,0 +1,89 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+# sampling من فضاء (concept, query, ground_truth) من غير ما نعمل الـ cartesian product
+# - الفضاء mixed-radix: كل concept ليه offset، وجواه index = query * len(gts) + gt
+# - الترتيب العشوائي permutation على [0, n) بـ Feistel network + cycle walking:
+#   أي position بيتحسب في O(1) ومفيش list بحجم n، وكل index بيطلع مرة واحدة بالظبط لحد ما الفضاء يخلص
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(x):
+    # splitmix64 finalizer: بيوزع الـ bits كويس ورخيص في بايثون
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+class IndexPermutation:
+    """permutation ثابتة (بالـ seed) على range(n) من غير ما تتخزن."""
+
+    def __init__(self, n, seed=0, rounds=4):
+        if n < 1:
+            raise ValueError("permutation needs n >= 1")
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [_mix((seed << 8) + r + 1) for r in range(rounds)]
+
+    def __len__(self):
+        return self.n
+
+    def _encrypt(self, x):
+        h, m = self.half, self.mask
+        left, right = x >> h, x & m
+        for k in self.keys:
+            left, right = right, left ^ (_mix(right ^ k) & m)
+        return (left << h) | right
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        # الدومين 2^(2*half) أكبر من n بأقل من 4 مرات، فالـ cycle walking بيخلص بسرعة
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
+
+
+class PairSpace:
+    """(concept, query, ground_truth) رقم i في الفضاء mixed-radix بتاع knowledge base."""
+
+    def __init__(self, knowledge_base):
+        self.kb = knowledge_base
+        self.concepts = [k for k, c in knowledge_base.items()
+                         if c["detailed_queries"] and c["ground_truth_candidates"]]
+        sizes = [len(self.kb[k]["detailed_queries"]) * len(self.kb[k]["ground_truth_candidates"])
+                 for k in self.concepts]
+        self.offsets = list(accumulate(sizes, initial=0))
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        c = bisect_right(self.offsets, i) - 1
+        key = self.concepts[c]
+        data = self.kb[key]
+        q, gt = divmod(i - self.offsets[c], len(data["ground_truth_candidates"]))
+        return data["detailed_queries"][q], data["ground_truth_candidates"][gt], key
+
+
+def sample_pairs(space, count, seed=0):
+    """count زوج: كلهم مختلفين لحد ما الفضاء يخلص، وبعدها لفة جديدة بـ permutation تانية."""
+    n = len(space)
+    if not n:
+        return
+    done, epoch = 0, 0
+    while done < count:
+        perm = IndexPermutation(n, seed=seed + epoch)
+        for i in range(min(n, count - done)):
+            yield space[perm[i]]
+        done += min(n, count - done)
+        epoch += 1
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import threading
+
+import build_dataset as b
+import fetch_github_data as f
+import generate_dataset as g
+from dataset_io import ShardWriter, follow_records, iter_records, select_fields, write_json_array
+from seen_filter import SeenFilter, SeenSet, digest, record_texts
+from validate_dataset import MAX_ERRORS, StreamValidator, error_lines
+
+# الـ pipeline كله في process واحدة: fetch (أو ملف repos) → فلترة → بناء → validation → كتابة
+# - المراحل generators متوصلة بـ queues محدودة: الـ fetch والـ READMEs شغالين في thread
+#   والفلترة بتاكل منهم أول بأول، والكتابة في thread تانية
+# - كل record بيتعمله validate أول ما الـ builder يطلعه (نفس قواعد validate_dataset.py)
+# - مفيش ملفات وسطانية إلا لو اتطلبت (--save-repos)
+# SEEN_FILE (زي generate_dataset.py) بيمنع نصوص التشغيلات التانية، وبيتحدّث بس لو الكتابة والـ validation نجحوا.
+# البناء نفسه محتاج كل الـ repos اللي عدت الفلتر (shuffle + index)، فده الحاجز الوحيد في النص.
+#
+#   python pipeline.py                                  # من GitHub (GITHUB_TOKEN) لحد الداتاسيت
+#   python pipeline.py --repos github_repos.json        # من ملف، نفس ناتج generate_dataset.py
+#   python pipeline.py --builder build --report pipeline_report.json
+#   FETCH_FORMAT=jsonl python fetch_github_data.py & python pipeline.py --repos github_repos --follow
+
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE", "1024"))
+METRICS_JSON = os.getenv("METRICS_JSON", "pipeline_metrics.json")
+METRICS_PROM = os.getenv("METRICS_PROM", "pipeline_metrics.prom")
+
+_DONE = object()
+_ABORT = object()
+
+
+class _Aborted(Exception):
+    pass
+
+
+def threaded(items, maxsize=QUEUE_SIZE):
+    """الـ generator بيشتغل في thread، وعناصره بتيجي من queue محدودة (المنتج بيستنى لو المستهلك بطيء)."""
+    q = queue.Queue(maxsize)
+    stop = threading.Event()
+    error = []
+
+    def run():
+        try:
+            for x in items:
+                q.put(x)
+                if stop.is_set():
+                    break
+        except BaseException as e:   # بيتعمله raise عند المستهلك
+            error.append(e)
+        finally:
+            q.put(_DONE)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    try:
+        for x in iter(q.get, _DONE):
+            yield x
+    finally:
+        stop.set()
+        while t.is_alive():   # فضّي الـ queue عشان الـ thread يخلص لو المستهلك وقف بدري
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        t.join()
+    if error:
+        raise error[0]
+
+
+class BackgroundWriter:
+    """write(records) في thread لوحدها؛ الـ records بتتبعت بـ put على queue محدودة."""
+
+    def __init__(self, write, maxsize=QUEUE_SIZE):
+        self._q = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(write,), daemon=True)
+        self._thread.start()
+
+    def _records(self):
+        for x in iter(self._q.get, _DONE):
+            if x is _ABORT:
+                raise _Aborted()
+            yield x
+
+    def _run(self, write):
+        try:
+            write(self._records())
+        except _Aborted:
+            pass
+        except Exception as e:
+            self._error = e
+            for _ in iter(self._q.get, _DONE):   # ما نسيبش اللي بيعمل put مستني للأبد
+                pass
+
+    def put(self, record):
+        if self._error:
+            raise self._error
+        self._q.put(record)
+
+    def close(self, ok=True):
+        if not ok:
+            self._q.put(_ABORT)
+        self._q.put(_DONE)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+
+def json_writer(path):
+    return lambda records: write_json_array(records, path)
+
+
+def shard_writer(out_dir, shard_size, compress):
+    def write(records):
+        with ShardWriter(out_dir, shard_size=shard_size, compress=compress) as w:
+            for r in records:
+                w.append(r)
+    return write
+
+
+class DatasetSink:
+    """الـ dataset اللي الـ builder بيضيف فيه (append / len): validate ثم كتابة في الخلفية."""
+
+    def __init__(self, writer, validator, seen=None):
+        self.writer = writer
+        self.validator = validator
+        self.seen = seen
+        self.pending = []   # digests نصوص الـ records؛ بتدخل الفلتر بعد ما الـ validation تعدي (remember)
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def append(self, record):
+        self.validator.check(record)
+        self.writer.put(record)
+        if self.seen is not None:
+            self.pending.extend(digest(t) for t in record_texts(record))
+        self.total += 1
+
+    def remember(self):
+        """نصوص كل الـ records في الفلتر + حفظه (بعد ما الكتابة والـ validation يعدّوا بس)."""
+        self.seen.update_digests(self.pending)
+        self.pending = []
+        return self.seen.save()
+
+
+def fetched_repos():
+    # نفس fetch_github_data.py بس الـ repos بتطلع واحد ورا التاني ومعاها الـ README
+    cache = f.make_cache()
+    session = f.make_session()
+    limiter = f.RateLimiter()
+    store = f.ReadmeStore(f.README_DIR) if f.README_DIR else None
+    graphql = f.FETCH_BACKEND == "graphql"
+    if graphql:
+        by_org = f.fetch_all_graphql(f.ORGS, session, limiter, store)
+    else:
+        by_org = f.fetch_all(f.ORGS, session, limiter, cache)
+    repos = [r for org in f.ORGS for r in by_org[org]]
+    print(f"📦 المجموع الكلي: {len(repos)} repos")
+    if cache and not graphql:
+        print(f"🗄️ {cache.stats.summary()}")
+    if store is None:
+        yield from repos
+        return
+    if graphql:   # الـ READMEs جت مع الـ repos
+        yield from store.with_readmes(repos)
+        return
+    try:
+        for i, (r, _) in enumerate(f.iter_readmes(repos, store, session, limiter), 1):
+            yield dict(r, readme=store.read(r["full_name"]))
+            if i % 500 == 0:
+                store.save()
+    finally:
+        store.save()
+
+
+def tee(records, path):
+    """records زي ما هي، ونسخة منها بتتكتب في path (JSON array) في الخلفية."""
+    writer = BackgroundWriter(json_writer(path))
+    ok = False
+    try:
+        for r in records:
+            writer.put(dict(r))   # نسخة: المراحل الجاية بتعدل في الـ record قبل ما يتكتب
+            yield r
+        ok = True
+    finally:
+        writer.close(ok)
+    print(f"💾 repos → {path}")
+
+
+def run_generate(repos, sink, workers):
+    with g.METRICS.time("filter"):
+        filtered = g.filter_repos(repos)
+    random.seed(g.SEED)   # نفس حالة الـ RNG اللي generate_dataset.py بيبدأ بيها
+    random.shuffle(filtered)
+    print(f"📦 candidates after filtering: {len(filtered)}")
+    g.METRICS.count("repos_kept", len(filtered))
+    corpus = g.prepare_corpus(filtered, sink.seen)
+    g.generate(corpus, workers, g.new_used(corpus), sink)
+    if len(sink) < g.MIN_OK:
+        raise ValueError(f"⚠️ Built only {len(sink)} examples (<{g.MIN_OK}). Increase orgs or pages.")
+
+
+def run_build(repos, sink, workers):
+    with b.METRICS.time("filter"):
+        usable = b.filter_repos(select_fields(repos, keep=b.REPO_FIELDS))
+    print(f"Found {len(usable)} usable repositories.")
+    if len(usable) < 50:
+        raise ValueError("❌ Error: Not enough usable repos.")
+    random.seed(b.SEED)
+    b.build_records(usable, sink, SeenSet(sink.seen))
+    if len(sink) < b.MINIMUM_RECORDS:
+        print(f"⚠️ Warning: Only built {len(sink)} records (<{b.MINIMUM_RECORDS}).", file=sys.stderr)
+
+
+BUILDERS = {"generate": (g, run_generate), "build": (b, run_build)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="fetch → build → validate في process واحدة")
+    ap.add_argument("--repos", help="اقرا الـ repos من الملف ده بدل الـ fetch (JSON / JSONL / gzip)")
+    ap.add_argument("--follow", action="store_true",
+                    help="--repos فولدر shards بيتكتب (FETCH_FORMAT=jsonl): اقرا كل shard أول ما يخلص لحد ما الـ crawl يكمل")
+    ap.add_argument("--follow-idle", type=float, default=3900,
+                    help="--follow: وقّف بـ error لو الـ manifest ما اتغيرش الثواني دي (0 = استنى للأبد)")
+    ap.add_argument("--save-repos", help="اكتب نسخة من الـ repos (بالـ READMEs) هنا كمان")
+    ap.add_argument("--builder", choices=sorted(BUILDERS), default="generate")
+    ap.add_argument("--workers", type=int, default=g.WORKERS, help="لـ --builder generate بس")
+    ap.add_argument("--out", default=g.OUT)
+    ap.add_argument("--format", choices=("json", "jsonl"), default=g.OUT_FORMAT)
+    ap.add_argument("--shard-size", type=int, default=g.SHARD_SIZE)
+    ap.add_argument("--gzip", action="store_true", default=g.OUT_GZIP)
+    ap.add_argument("--report", help="اكتب تقرير الـ validation JSON هنا")
+    ap.add_argument("--max-errors", type=int, default=MAX_ERRORS)
+    args = ap.parse_args(argv)
+
+    if args.repos and args.follow:
+        repos = follow_records(args.repos, idle=args.follow_idle)
+    elif args.repos:
+        if not os.path.exists(args.repos):
+            print(f"❌ {args.repos} not found.")
+            sys.exit(1)
+        repos = iter_records(args.repos)
+    else:
+        repos = fetched_repos()
+    repos = threaded(repos)
+    if args.save_repos:
+        repos = tee(repos, args.save_repos)
+
+    if args.format == "json":
+        writer = BackgroundWriter(json_writer(args.out))
+        saved_to = args.out
+    else:
+        out_dir = os.path.splitext(args.out)[0]
+        writer = BackgroundWriter(shard_writer(out_dir, args.shard_size, args.gzip))
+        saved_to = out_dir + "/"
+    validator = StreamValidator(max_offsets=max(args.max_errors, 1000))
+    seen = SeenFilter(g.SEEN_FILE) if g.SEEN_FILE else None
+    sink = DatasetSink(writer, validator, seen)
+
+    module, run = BUILDERS[args.builder]
+    ok = False
+    try:
+        run(repos, sink, args.workers)
+        ok = True
+    finally:
+        writer.close(ok)
+        summary = module.METRICS.write(f"pipeline:{args.builder}", METRICS_JSON, METRICS_PROM, records=len(sink))
+        if summary:
+            top = ", ".join(f"{k}={v}" for k, v in list(summary["rejections"].items())[:5])
+            print(f"📊 metrics → {METRICS_JSON}, {METRICS_PROM} (rejected: {top or 'none'})")
+    print(f"✅ Built {len(sink)} examples → {saved_to}")
+
+    report = validator.report(saved_to)
+    if args.report:
+        tmp = args.report + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+        os.replace(tmp, args.report)
+        print(f"📝 Report written to {args.report}")
+    if not report["passed"]:
+        print("❌ Validation failed with errors:")
+        for e in error_lines(report, args.max_errors):
+            print(" -", e)
+        sys.exit(1)
+    print(f"✅ Validation passed for {report['records']} entries.")
+    if seen is not None:
+        print(f"🧷 {g.SEEN_FILE}: {sink.remember()} texts used across runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+
+# cache على الديسك لتجهيز نصوص الـ repos (الجُمل والـ tokens) مشترك بين generate_dataset و build_dataset
+# - المفتاح blake2b-64 لـ (kind + الحقول الخام: description / README / ...)، فأي repo اتغير
+#   بيتحسب تاني والباقي بيترجع من غير regex خالص
+# - kind فيه version الـ builder وإعداداته: تغيير قواعد التقسيم = مفاتيح جديدة، مش نتايج قديمة غلط
+# - الملف npz واحد: كل نص مختلف (جملة أو token) مرة واحدة في heap UTF-8، وكل entry = حقول
+#   كل حقل list أرقام u32 في الـ heap (الـ tokens المتكررة بين الـ repos بتتخزن مرة)
+# - eviction بالحجم: كل save بيعلّم الـ entries اللي اتستخدمت بالـ generation الجديدة، ولو الملف
+#   هيعدّي PREP_CACHE_MB الأقدم استخدامًا بيتشال الأول
+#
+#   PREP_CACHE=""  يقفله، و PREP_CACHE=path يغيّر مكانه
+
+PREP_CACHE = os.getenv("PREP_CACHE", ".prep_cache.npz")
+PREP_CACHE_MB = int(os.getenv("PREP_CACHE_MB", "512"))
+
+FORMAT = 1
+_ENTRY_BYTES = 8 + 4 + 8   # key + stamp + entry_off
+
+
+def content_key(kind, parts):
+    h = hashlib.blake2b(digest_size=8)
+    for p in (kind, *parts):
+        b = (p or "").encode("utf-8")
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return int.from_bytes(h.digest(), "little")
+
+
+class PrepStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return (f"prep cache: {self.hits}/{total} repos from cache ({rate:.0f}%), "
+                f"{self.misses} processed, {self.evicted} evicted")
+
+
+class PrepCache:
+    def __init__(self, path, max_bytes=PREP_CACHE_MB << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = PrepStats()
+        self.used = set()   # entries من الملف اتستخدمت في التشغيل ده
+        self.new = {}       # key → fields اتحسبت في التشغيل ده
+        self._empty()
+        self._load()
+
+    def _empty(self):
+        self.generation = 0
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.stamps = np.empty(0, dtype=np.uint32)
+        self.entry_off = np.zeros(1, dtype=np.uint64)   # entry → أول حقل في field_off
+        self.field_off = np.zeros(1, dtype=np.uint64)   # حقل → أول رقم في ids
+        self.ids = np.empty(0, dtype=np.uint32)
+        self.text = ""                                  # الـ heap بعد الـ decode
+        self.str_off = [0]                              # بالحروف في text
+        self.index = {}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as z:
+                if int(z["format"]) != FORMAT:
+                    raise ValueError(f"format {int(z['format'])}")
+                self.generation = int(z["generation"])
+                self.keys, self.stamps = z["keys"], z["stamps"]
+                self.entry_off, self.field_off, self.ids = z["entry_off"], z["field_off"], z["ids"]
+                self.text = z["heap"].tobytes().decode("utf-8")
+                self.str_off = z["str_off"].tolist()
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            print(f"⚠️ ignoring unreadable prep cache {self.path}: {e}")
+            self._empty()
+            return
+        self.index = {k: i for i, k in enumerate(self.keys.tolist())}
+
+    def __len__(self):
+        return len(self.keys) + len(self.new)
+
+    def _fields(self, i):
+        text, so = self.text, self.str_off
+        a, b = self.entry_off[i:i + 2].tolist()
+        bounds = self.field_off[a:b + 1].tolist()
+        return [[text[so[j]:so[j + 1]] for j in self.ids[x:y].tolist()]
+                for x, y in zip(bounds, bounds[1:])]
+
+    def get(self, key):
+        fields = self.new.get(key)
+        if fields is not None:
+            return fields
+        i = self.index.get(key)
+        if i is None:
+            return None
+        self.used.add(i)
+        return self._fields(i)
+
+    def lookup(self, kind, parts, compute):
+        """الحقول (lists نصوص) من الـ cache، أو compute() لو المحتوى جديد."""
+        key = content_key(kind, parts)
+        fields = self.get(key)
+        if fields is None:
+            self.stats.misses += 1
+            fields = self.new[key] = [list(f) for f in compute()]
+        else:
+            self.stats.hits += 1
+        return fields
+
+    def save(self):
+        if not self.new and not self.used:
+            return
+        gen = self.generation + 1
+        stamps = self.stamps.copy()
+        stamps[list(self.used)] = gen
+
+        # الـ entries الجديدة بتتضاف في الآخر، والنصوص الجديدة في آخر الـ heap
+        strings = {}
+        if self.new:
+            so = self.str_off
+            strings = {self.text[so[i]:so[i + 1]]: i for i in range(len(so) - 1)}
+        old_strings = len(strings) if self.new else len(self.str_off) - 1
+        new_ids, field_lens, entry_lens = [], [], []
+        for fields in self.new.values():
+            entry_lens.append(len(fields))
+            for f in fields:
+                field_lens.append(len(f))
+                new_ids.extend(strings.setdefault(s, len(strings)) for s in f)
+        added = list(strings)[old_strings:]
+
+        keys = np.concatenate([self.keys, np.fromiter(self.new, dtype=np.uint64, count=len(self.new))])
+        stamps = np.concatenate([stamps, np.full(len(self.new), gen, dtype=np.uint32)])
+        entry_off = np.concatenate([self.entry_off, self.entry_off[-1] + np.cumsum(entry_lens, dtype=np.uint64)])
+        field_off = np.concatenate([self.field_off, self.field_off[-1] + np.cumsum(field_lens, dtype=np.uint64)])
+        ids = np.concatenate([self.ids, np.array(new_ids, dtype=np.uint32)])
+        str_off = np.concatenate([np.array(self.str_off, dtype=np.uint64),
+                                  len(self.text) + np.cumsum([len(s) for s in added], dtype=np.uint64)])
+        text = self.text + "".join(added)
+
+        arrays = dict(keys=keys, stamps=stamps, entry_off=entry_off, field_off=field_off,
+                      ids=ids, str_off=str_off)
+        heap = text.encode("utf-8")
+        if self._size(arrays, heap) > self.max_bytes:
+            arrays, text = self._evict(arrays, text)
+            heap = text.encode("utf-8")
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, format=np.array(FORMAT), generation=np.array(gen),
+                     heap=np.frombuffer(heap, dtype=np.uint8), **arrays)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _size(arrays, heap):
+        # الـ heap بالبايت بعد الـ UTF-8 (str_off بالحروف، فمينفعش يتحسب منها)
+        return sum(a.nbytes for a in arrays.values()) + len(heap)
+
+    def _evict(self, arrays, text):
+        # الأحدث استخدامًا الأول؛ كل entry بتتحسب بحقولها + النصوص اللي أول مرة تظهر فيها
+        keys, stamps, entry_off = arrays["keys"], arrays["stamps"], arrays["entry_off"]
+        field_off, ids, str_off = arrays["field_off"], arrays["ids"], arrays["str_off"]
+        so = str_off.tolist()
+        lengths = np.fromiter((len(text[so[j]:so[j + 1]].encode("utf-8")) for j in range(len(so) - 1)),
+                              dtype=np.int64, count=len(so) - 1)   # بايت كل نص في الـ heap
+        referenced = np.zeros(len(lengths), dtype=bool)
+        budget = self.max_bytes - 4096   # headers الـ npz
+        keep = []
+        for i in np.argsort(-stamps.astype(np.int64), kind="stable").tolist():
+            a, b = entry_off[i:i + 2].tolist()
+            x, y = field_off[a:b + 1][[0, -1]].tolist()
+            refs = ids[x:y]
+            fresh = np.unique(refs[~referenced[refs]])
+            cost = _ENTRY_BYTES + 8 * (b - a) + 4 * (y - x) + 8 * len(fresh) + int(lengths[fresh].sum())
+            if cost > budget:
+                break
+            budget -= cost
+            referenced[fresh] = True
+            keep.append(i)
+        keep.sort()
+        self.stats.evicted += len(keys) - len(keep)
+
+        remap = np.cumsum(referenced, dtype=np.int64) - 1
+        kept_str = np.flatnonzero(referenced).tolist()
+        parts = [text[so[j]:so[j + 1]] for j in kept_str]
+        new_fields, new_ids, entry_lens = [], [], []
+        for i in keep:
+            a, b = entry_off[i:i + 2].tolist()
+            entry_lens.append(b - a)
+            for f in range(a, b):
+                x, y = field_off[f:f + 2].tolist()
+                new_fields.append(y - x)
+                new_ids.append(remap[ids[x:y]].astype(np.uint32))
+        out = dict(
+            keys=keys[keep], stamps=stamps[keep],
+            entry_off=np.concatenate([[0], np.cumsum(entry_lens, dtype=np.uint64)]).astype(np.uint64),
+            field_off=np.concatenate([[0], np.cumsum(new_fields, dtype=np.uint64)]).astype(np.uint64),
+            ids=np.concatenate(new_ids) if new_ids else np.empty(0, dtype=np.uint32),
+            str_off=np.concatenate([[0], np.cumsum([len(s) for s in parts], dtype=np.uint64)]).astype(np.uint64),
+        )
+        return out, "".join(parts)
+
+
+def open_cache():
+    return PrepCache(PREP_CACHE) if PREP_CACHE else None
+
+
+def lookup(cache, kind, parts, compute):
+    return cache.lookup(kind, parts, compute) if cache is not None else compute()
+
+
+def finish(cache, metrics):
+    """save + العدادات في الـ metrics + سطر الملخص (لو الـ cache شغال)."""
+    if cache is None:
+        return
+    with metrics.time("prep_cache.save"):
+        cache.save()
+    metrics.count("prep_cache.hits", cache.stats.hits)
+    metrics.count("prep_cache.misses", cache.stats.misses)
+    print(f"🗄️ {cache.stats.summary()}")
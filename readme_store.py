@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+# مخزن READMEs على الديسك بعنوان المحتوى (sha256 للنص بعد التنضيف)
+# READMEs المتطابقة (forks / templates) بتتخزن مرة واحدة
+# index.json: full_name → {"sha": ..., "etag": ...} عشان الـ re-crawl يبعت If-None-Match
+
+README_MAX_CHARS = int(os.getenv("README_MAX_CHARS", "20000"))
+
+_FENCE = re.compile(r"^(```|~~~).*?^\1[^\n]*$", re.S | re.M)
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_REF_DEF = re.compile(r"^\s*\[[^\]]+\]:\s*\S+.*$", re.M)
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s*", re.M)
+_QUOTE_LIST = re.compile(r"^\s*(>+|[-*+]|\d+[.)])\s+", re.M)
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}.*$", re.M)
+_HRULE = re.compile(r"^\s*([-*_]\s*){3,}$", re.M)
+_EMPHASIS = re.compile(r"(\*\*|__|\*|_|~~|`)(?=\S)(.+?)(?<=\S)\1")
+_URL = re.compile(r"https?://\S+")
+
+
+def strip_markdown(text, max_chars=README_MAX_CHARS):
+    """markdown → نص عادي: من غير code/HTML/صور/روابط/badges، والفقرات بسطر جديد."""
+    if not text:
+        return ""
+    text = text[:max_chars * 2]   # حد أولي قبل الـ regex على ملفات ضخمة
+    text = _FENCE.sub("\n", text)
+    text = _HTML_COMMENT.sub(" ", text)
+    text = _HTML_TAG.sub(" ", text)
+    text = _IMAGE.sub(" ", text)
+    text = _LINK.sub(r"\1", text)
+    text = _REF_DEF.sub("", text)
+    text = _TABLE_RULE.sub("", text)
+    text = _HRULE.sub("", text)
+    text = _HEADING.sub("", text)
+    text = _QUOTE_LIST.sub("", text)
+    text = _EMPHASIS.sub(r"\2", text)
+    text = _URL.sub(" ", text)
+    text = text.replace("|", " ")
+    lines = (re.sub(r"[ \t]+", " ", l).strip() for l in text.splitlines())
+    text = re.sub(r"\n{2,}", "\n", "\n".join(l for l in lines if l))
+    if len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        text = text[:cut if cut > 0 else max_chars]
+    return text.strip()
+
+
+class ReadmeStore:
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self.new_blobs = 0
+        self.deduped = 0
+
+    def _blob(self, sha):
+        return os.path.join(self.root, sha[:2], sha + ".txt")
+
+    def entry(self, full_name):
+        with self.lock:
+            return self.index.get(full_name)
+
+    def put(self, full_name, text, etag=None):
+        # text = بعد strip_markdown؛ لو فاضي بنسجل إن مفيش README
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest() if text else None
+        new = False
+        if sha:
+            path = self._blob(sha)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp, path)
+                new = True
+        with self.lock:
+            self.index[full_name] = {"sha": sha, "etag": etag}
+            if sha:
+                self.new_blobs += new
+                self.deduped += not new
+
+    def mark_missing(self, full_name):
+        with self.lock:
+            self.index[full_name] = {"sha": None, "etag": None}
+
+    def read(self, full_name):
+        e = self.entry(full_name)
+        if not e or not e.get("sha"):
+            return ""
+        try:
+            with open(self._blob(e["sha"]), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.index, ensure_ascii=False)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.index_path)
+
+    def with_readmes(self, repos):
+        # README واحد بس في الذاكرة في المرة (بيتقري من الديسك وقت كتابة الـ record)
+        for r in repos:
+            yield dict(r, readme=self.read(r["full_name"]))
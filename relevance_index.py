@@ -0,0 +1,50 @@
+import numpy as np
+
+# index لمرشحين الصلة في build_dataset بيتبني مرة واحدة للـ pool كله:
+#   org → رقم، topic → sorted int array بأرقام الـ repos (posting list)، وكل repo ليه set أرقام topics
+# عدد الـ topics المشتركة مع الـ anchor = مجموع الـ posting lists بتاعة topics بتاعته بس،
+# فالـ high / medium / low بقوا عمليات على arrays بدل set() جديدة لكل زوج repos.
+# المرشحين بيرجعوا بترتيب الـ pool زي الـ scan القديم بالظبط، فالـ shuffle بعدها بيطلع نفس النتيجة.
+
+
+class RelevanceIndex:
+    def __init__(self, repo_pool):
+        self.pool = repo_pool
+        self.pos = {id(r): i for i, r in enumerate(repo_pool)}
+        orgs, names, topics = {}, {}, {}
+        org_ids, name_ids, postings = [], [], []
+        self.repo_topics = []
+        for i, r in enumerate(repo_pool):
+            org_ids.append(orgs.setdefault(r.get("org"), len(orgs)))
+            # repo من غير full_name عمره ما بيبقى مرشح
+            name_ids.append(names.setdefault(r["full_name"], len(names)) if "full_name" in r else -1)
+            ids = {topics.setdefault(t, len(topics)) for t in r.get("topics", [])}
+            postings.extend([] for _ in range(len(topics) - len(postings)))
+            for t in ids:
+                postings[t].append(i)
+            self.repo_topics.append(ids)
+        self.org_ids = np.array(org_ids, dtype=np.int32)
+        self.name_ids = np.array(name_ids, dtype=np.int32)
+        self.postings = [np.array(p, dtype=np.int32) for p in postings]
+
+    def __len__(self):
+        return len(self.pool)
+
+    def shared_topics(self, i):
+        counts = np.zeros(len(self.pool), dtype=np.int32)
+        for t in self.repo_topics[i]:
+            counts[self.postings[t]] += 1
+        return counts
+
+    def candidates(self, anchor_repo):
+        """(high, medium, low) بنفس تعريف الـ scan: نفس الـ org أو topics مشتركة >= 2 / topic واحد / ولا topic."""
+        i = self.pos[id(anchor_repo)]
+        shared = self.shared_topics(i)
+        same_org = self.org_ids == self.org_ids[i]
+        valid = (self.name_ids >= 0) & (self.name_ids != self.name_ids[i])
+        other_org = valid & ~same_org
+        high = np.flatnonzero(valid & (same_org | (shared >= 2)))
+        medium = np.flatnonzero(other_org & (shared == 1))
+        low = np.flatnonzero(other_org & (shared == 0))
+        pool = self.pool
+        return tuple([pool[j] for j in ids.tolist()] for ids in (high, medium, low))
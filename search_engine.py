@@ -0,0 +1,91 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+# محرك بحث BM25 بـ inverted index للـ simulator
+# كل project (ground_truth / relevance sentence) = document نصه اسم المشروع + الـ search tags بتاعته
+# وزن كل (term, doc) بيتحسب مرة واحدة بعد البناء، فالـ query = مجموع أوزان جاهزة + heap لأعلى k
+
+STOP_WORDS = {"ideas", "for", "graduation", "project", "a", "an", "the", "of", "and", "to", "in", "with", "on"}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = []
+        self.doc_ids = {}
+        self.lengths = []
+        self.tfs = defaultdict(list)   # term → [(doc, tf)]
+        self.postings = {}             # term → [(doc, weight)] بعد finalize
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc):
+        return doc in self.doc_ids
+
+    def add(self, doc, text):
+        if doc in self.doc_ids:
+            return self.doc_ids[doc]
+        i = len(self.docs)
+        self.doc_ids[doc] = i
+        self.docs.append(doc)
+        terms = tokenize(text)
+        self.lengths.append(len(terms))
+        for term, tf in Counter(terms).items():
+            self.tfs[term].append((i, tf))
+        self._dirty = True
+        return i
+
+    def finalize(self):
+        n = len(self.docs)
+        avgdl = sum(self.lengths) / n if n else 0.0
+        k1, b = self.k1, self.b
+        self.postings = {}
+        for term, plist in self.tfs.items():
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            self.postings[term] = [
+                (d, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * self.lengths[d] / avgdl)))
+                for d, tf in plist
+            ]
+        self._dirty = False
+
+    def search(self, query, k=10):
+        """أعلى k (doc, score) بالترتيب؛ التعادل بيتكسر بترتيب الإضافة."""
+        if self._dirty:
+            self.finalize()
+        scores = defaultdict(float)
+        for term, qtf in Counter(tokenize(query)).items():
+            for d, w in self.postings.get(term, ()):
+                scores[d] += qtf * w
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.docs[d], s) for d, s in top]
+
+
+def record_projects(records):
+    for record in records:
+        yield from [record["ground_truth"]] + record["high_relevance"] + record["medium_relevance"] + record["low_relevance"]
+
+
+def index_projects(projects, project_tags=None):
+    """index على المشاريع بالترتيب ده (المكرر بيتجاهل) ومعاها الـ tags لو موجودة."""
+    project_tags = project_tags or {}
+    index = BM25Index()
+    for project in projects:
+        if project:
+            index.add(project, " ".join([project] + list(project_tags.get(project, ()))))
+    index.finalize()
+    return index
+
+
+def build_index(records, project_tags=None):
+    """index على كل المشاريع في الداتاسيت (ground_truth + relevance) ومعاها الـ tags لو موجودة."""
+    return index_projects(record_projects(records), project_tags)
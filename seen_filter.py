@@ -0,0 +1,149 @@
+import argparse
+import fcntl
+import hashlib
+import os
+
+import numpy as np
+
+from dataset_io import iter_records
+
+# النصوص اللي اتستخدمت في تشغيلات تانية (train / dev / test على أجهزة مختلفة)
+# الملف: magic + digests 64-bit (blake2b) مترتبة؛ بيتفتح mmap والبحث searchsorted
+# - مفيش false negatives: أي نص اتحفظ قبل كده بيتلاقي دايمًا
+# - false positive بس لو digest اتنين اتصادفوا (~n²/2^65، يعني مهمل لحد مليارات النصوص)
+# - الدمج = union لـ arrays مترتبة، فالـ shards اللي اتبنت بالتوازي بتتجمع في الآخر بـ merge
+#
+#   SEEN_FILE=splits.seen python generate_dataset.py      # بيتقري في الأول وبيتحدّث في الآخر
+#   python seen_filter.py merge all.seen a.seen b.seen
+#   python seen_filter.py add all.seen train.json dev.json
+
+MAGIC = b"SEENU64\x01"
+
+
+def digest(s):
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def digests(texts):
+    return np.fromiter((digest(s) for s in texts), dtype=np.uint64)
+
+
+def record_texts(record):
+    """النصوص اللي لازم تفضل unique بين التشغيلات (الـ description مش منهم)."""
+    return [record["query"], record["ground_truth"],
+            *record["high_relevance"], *record["medium_relevance"], *record["low_relevance"]]
+
+
+def read_digests(path):
+    """الـ digests المترتبة من الملف (mmap، read-only)؛ array فاضية لو الملف مش موجود."""
+    if not os.path.exists(path) or os.path.getsize(path) <= len(MAGIC):
+        return np.empty(0, dtype=np.uint64)
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a seen-filter file")
+    return np.memmap(path, dtype="<u8", mode="r", offset=len(MAGIC))
+
+
+def write_digests(path, values):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.ascontiguousarray(values, dtype="<u8").tobytes())
+    os.replace(tmp, path)
+
+
+def merge_sorted(*arrays):
+    arrays = [a for a in arrays if len(a)]
+    if not arrays:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.concatenate(arrays))
+
+
+class SeenFilter:
+    def __init__(self, path):
+        self.path = path
+        self.base = read_digests(path)
+        self.added = set()
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def _in_base(self, d):
+        i = int(np.searchsorted(self.base, np.uint64(d)))
+        return i < len(self.base) and int(self.base[i]) == d
+
+    def __contains__(self, text):
+        d = digest(text)
+        return d in self.added or self._in_base(d)
+
+    def contains_many(self, texts):
+        """bool array: كل نص اتشاف قبل كده ولا لأ (على الـ base بس، في نداء numpy واحد)."""
+        d = digests(texts)
+        if not len(self.base):
+            return np.zeros(len(d), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.base, d), len(self.base) - 1)
+        return self.base[pos] == d
+
+    def add(self, text):
+        self.added.add(digest(text))
+
+    def update(self, texts):
+        self.added.update(digest(s) for s in texts)
+
+    def update_digests(self, values):
+        self.added.update(values)
+
+    def add_records(self, records):
+        n = 0
+        for r in records:
+            self.update(record_texts(r))
+            n += 1
+        return n
+
+    def save(self):
+        # بنعيد قراية الملف تحت lock: لو تشغيل تاني على نفس الجهاز حفظ في النص، إضافاته بتفضل
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            new = np.fromiter(self.added, dtype=np.uint64, count=len(self.added))
+            merged = merge_sorted(read_digests(self.path), np.asarray(self.base), new)
+            write_digests(self.path, merged)
+        self.base = read_digests(self.path)
+        self.added = set()
+        return len(self.base)
+
+
+class SeenSet(set):
+    """set نصوص عادية للتشغيل ده، والـ in بيشوف SeenFilter كمان (قراية بس)."""
+
+    def __init__(self, seen, items=()):
+        super().__init__(items)
+        self.seen = seen
+
+    def __contains__(self, s):
+        return set.__contains__(self, s) or (self.seen is not None and s in self.seen)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="فلتر النصوص المستخدمة بين التشغيلات")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("merge", help="union لكذا ملف في ملف واحد")
+    m.add_argument("out")
+    m.add_argument("inputs", nargs="+")
+    a = sub.add_parser("add", help="ضيف نصوص داتاسيت موجودة للفلتر")
+    a.add_argument("filter")
+    a.add_argument("datasets", nargs="+")
+    args = ap.parse_args()
+
+    if args.cmd == "merge":
+        merged = merge_sorted(*(read_digests(p) for p in args.inputs))
+        write_digests(args.out, merged)
+        print(f"✅ {len(merged)} digests → {args.out}")
+    else:
+        seen = SeenFilter(args.filter)
+        n = sum(seen.add_records(iter_records(p)) for p in args.datasets)
+        total = seen.save()
+        print(f"✅ {n} records added, {total} digests in {args.filter}")
+
+
+if __name__ == "__main__":
+    main()
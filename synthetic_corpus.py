@@ -0,0 +1,66 @@
+import random
+import string
+
+# corpus صناعي بنفس شكل github_repos.json عشان الـ benchmarks تشتغل offline
+# كل org ليها مفردات خاصة، وكل topic ليه مفردات، وفيه كلمات عامة مشتركة
+# ده بيدي توزيع Jaccard فيه high (نفس الـ org) و medium (topics مشتركة) و low
+
+
+def _word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def _sentence(rng, pools, n_words):
+    words = []
+    for _ in range(n_words):
+        pool = rng.choices(pools, weights=(3, 4, 3))[0]
+        words.append(rng.choice(pool))
+    return " ".join(words).capitalize() + "."
+
+
+def _faker_words(seed):
+    # Faker اختياري: مفردات إنجليزي حقيقية للكلمات العامة بدل الحروف العشوائية
+    try:
+        from faker import Faker
+    except ImportError:
+        raise RuntimeError("❌ faker مش متسطب (pip install Faker) — شغّل من غير faker") from None
+    fake = Faker("en_US")
+    fake.seed_instance(seed)
+    return sorted(set(fake.get_words_list()))
+
+
+def iter_corpus(n_repos, n_orgs=20, n_topics=60, readme_sentences=(1, 16), seed=0, faker=False):
+    """نفس make_corpus بس generator: repo ورا repo من غير ما الـ corpus كله يبقى في الذاكرة."""
+    rng = random.Random(seed)
+    common = [_word(rng) for _ in range(5000)]
+    if faker:
+        common = _faker_words(seed)
+    topics = [f"topic{i}" for i in range(n_topics)]
+    topic_vocab = {t: [_word(rng) for _ in range(40)] for t in topics}
+    orgs = [f"org{i}" for i in range(n_orgs)]
+    org_vocab = {o: [_word(rng) for _ in range(80)] for o in orgs}
+    org_topics = {o: rng.sample(topics, min(len(topics), 6)) for o in orgs}
+    # توزيع غير متساوي للـ repos على الـ orgs (زي الحقيقة)
+    org_weights = [1.0 / (i + 1) for i in range(n_orgs)]
+
+    for i in range(n_repos):
+        org = rng.choices(orgs, weights=org_weights)[0]
+        local = org_topics[org]
+        repo_topics = sorted(set(rng.sample(local, 2) + rng.sample(topics, rng.randint(0, 2))))
+        topic_words = [w for t in repo_topics for w in topic_vocab[t]]
+        pools = (common, topic_words, org_vocab[org])
+        desc = _sentence(rng, pools, rng.randint(15, 30))
+        readme = " ".join(_sentence(rng, pools, rng.randint(12, 40))
+                          for _ in range(rng.randint(*readme_sentences)))
+        yield {
+            "full_name": f"{org}/repo{i}",
+            "description": desc,
+            "topics": repo_topics,
+            "org": org,
+            "readme": readme,
+            "text": f"{desc} {readme}",
+        }
+
+
+def make_corpus(n_repos, n_orgs=20, n_topics=60, readme_sentences=(1, 16), seed=0, faker=False):
+    return list(iter_corpus(n_repos, n_orgs, n_topics, readme_sentences, seed, faker))
@@ -0,0 +1,74 @@
+import numpy as np
+
+# مصفوفة sparse (CSR) من token IDs لكل repo + الـ transpose بتاعها (token → repos)
+# بتحسب صف Jaccard كامل لـ anchor (أو batch من الـ anchors) في نداء numpy واحد
+# النتيجة مطابقة لـ jaccard() في generate_dataset بالظبط (نفس القسمة في float64)
+
+ROW_BATCH_CELLS = 1 << 24   # أقصى عدد خلايا (anchors × repos) في الـ batch الواحد
+
+
+def _csr(rows_of_ids):
+    lengths = np.fromiter((len(r) for r in rows_of_ids), dtype=np.int64, count=len(rows_of_ids))
+    indptr = np.zeros(len(rows_of_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    for i, r in enumerate(rows_of_ids):
+        indices[indptr[i]:indptr[i + 1]] = r
+    return indptr, indices
+
+
+class TokenMatrix:
+    def __init__(self, token_sets):
+        vocab = {}
+        rows = []
+        for t in token_sets:
+            rows.append(sorted(vocab.setdefault(w, len(vocab)) for w in t))
+        self.vocab = vocab
+        self.n = len(rows)
+        self.indptr, self.indices = _csr(rows)
+        self.sizes = np.diff(self.indptr)
+        # token → repos (CSR للـ transpose)
+        order = np.argsort(self.indices, kind="stable")
+        repo_of = np.repeat(np.arange(self.n, dtype=np.int32), self.sizes)
+        self.t_indices = repo_of[order]
+        counts = np.bincount(self.indices, minlength=len(vocab))
+        self.t_indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.t_indptr[1:])
+
+    def batch_size(self):
+        return max(1, min(256, ROW_BATCH_CELLS // max(1, self.n)))
+
+    def rows(self, anchors):
+        # صف Jaccard لكل anchor: shape = (len(anchors), n)
+        anchors = np.asarray(anchors, dtype=np.int64)
+        b, n = len(anchors), self.n
+        parts = []
+        for k, a in enumerate(anchors):
+            for t in self.indices[self.indptr[a]:self.indptr[a + 1]]:
+                parts.append(self.t_indices[self.t_indptr[t]:self.t_indptr[t + 1]] + k * n)
+        flat = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        inter = np.bincount(flat, minlength=b * n).reshape(b, n)
+        union = self.sizes[anchors][:, None] + self.sizes[None, :] - inter
+        out = np.zeros((b, n), dtype=np.float64)
+        np.divide(inter, union, out=out, where=inter > 0)
+        return out
+
+    def row(self, a):
+        return self.rows([a])[0]
+
+
+class RowCache:
+    """بيحسب الصفوف batch ورا batch بترتيب الـ anchors."""
+
+    def __init__(self, matrix, batch=None):
+        self.matrix = matrix
+        self.batch = batch or matrix.batch_size()
+        self._start = 0
+        self._rows = None
+
+    def row(self, a):
+        if self._rows is None or not (self._start <= a < self._start + len(self._rows)):
+            stop = min(self.matrix.n, a + self.batch)
+            self._start = a
+            self._rows = self.matrix.rows(range(a, stop))
+        return self._rows[a - self._start]
@@ -1,58 +1,246 @@
-import json, sys, os, re
+import argparse, json, os, sys, time
+import multiprocessing as mp
+from itertools import islice
 
-IN = "service_discovery_dataset.json"
+import numpy as np
 
-def main():
-    if not os.path.exists(IN):
-        print(f"❌ {IN} not found")
+from dataset_io import iter_raw_lines, iter_records, sniff
+from seen_filter import digest
+
+# التحقق بيقرا الداتاسيت stream (JSON array / JSONL / gzip / فولدر shards)
+# - قواعد كل record (العدد، الطول، الـ dash) بتتحسب على chunks في processes
+# - التكرار على مستوى الداتاسيت كله بـ digest 64-bit لكل نص بدل النص نفسه
+#   (12 بايت لكل نص: digest + رقم الـ entry)، والمكرر بيتحدد بـ sort في الآخر
+# - تقرير JSON فيه عدد كل قاعدة وأرقام الـ entries اللي فيها المشكلة
+
+IN = os.getenv("DATASET_FILE", "service_discovery_dataset.json")
+MIN_QUERY_LEN = int(os.getenv("MIN_QUERY_LEN", "60"))
+MIN_GT_LEN = int(os.getenv("MIN_GT_LEN", "160"))
+RELEVANCE_COUNT = int(os.getenv("RELEVANCE_COUNT", "4"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+CHUNK = 2000
+MAX_ERRORS = 200      # اللي بيتطبع على الشاشة
+MAX_OFFSETS = 1000    # أرقام الـ entries اللي بتتكتب في التقرير لكل قاعدة
+
+SECTIONS = ("high_relevance", "medium_relevance", "low_relevance")
+
+# بترتيب الفحص جوه الـ entry (نفس ترتيب الرسايل القديم)
+RULES = {
+    "high_count": "High relevance count != {n}",
+    "medium_count": "Medium relevance count != {n}",
+    "low_count": "Low relevance count != {n}",
+    "malformed": "Entry is not a JSON object",
+    "query_too_short": "Query too short",
+    "ground_truth_too_short": "Ground truth too short",
+    "ground_truth_dash": "Ground truth must not contain '-'",
+    "duplicate_query": "Duplicate query",
+    "duplicate_ground_truth": "Duplicate ground_truth",
+    "duplicate_relevance": "Duplicate relevance sentence across dataset",
+}
+UNIQUE = {"query": "duplicate_query", "ground_truth": "duplicate_ground_truth", "relevance": "duplicate_relevance"}
+
+_LIMITS = None
+
+
+def _init(limits):
+    global _LIMITS
+    _LIMITS = limits
+
+
+def check_chunk(task):
+    return check_items(*task, _LIMITS)
+
+
+def check_items(start, kind, items, limits):
+    """items من رقم start → (n, {rule: [entries]}, {unique kind: (digests, entries)})."""
+    rel_n, min_q, min_gt = limits
+    fails = {rule: [] for rule in RULES}
+    texts = {k: ([], []) for k in UNIQUE}
+
+    for i, x in enumerate(items, start):
+        if kind == "lines":
+            try:
+                x = json.loads(x)
+            except ValueError:
+                x = None
+        if not isinstance(x, dict):
+            fails["malformed"].append(i)
+            continue
+        for sec, rule in zip(SECTIONS, ("high_count", "medium_count", "low_count")):
+            if len(x.get(sec, [])) != rel_n:
+                fails[rule].append(i)
+
+        q = x.get("query", "").strip()
+        gt = x.get("ground_truth", "").strip()
+        if len(q) < min_q: fails["query_too_short"].append(i)
+        if len(gt) < min_gt: fails["ground_truth_too_short"].append(i)
+        if "-" in gt: fails["ground_truth_dash"].append(i)
+
+        for k, s in (("query", q), ("ground_truth", gt)):
+            texts[k][0].append(digest(s))
+            texts[k][1].append(i)
+        for sec in SECTIONS:
+            for s in x.get(sec, []):
+                texts["relevance"][0].append(digest(s.strip()))
+                texts["relevance"][1].append(i)
+
+    digests = {k: (np.array(d, dtype=np.uint64), np.array(e, dtype=np.uint32))
+               for k, (d, e) in texts.items()}
+    return len(items), {r: v for r, v in fails.items() if v}, digests
+
+
+def tasks(path, chunk):
+    # JSONL: السطور بتتبعت زي ما هي والـ decode في الـ workers؛ JSON array: الـ decode هنا
+    kind = sniff(path)
+    if kind is None:
+        return
+    it = iter_raw_lines(path) if kind == "lines" else iter_records(path)
+    start = 1
+    while True:
+        items = list(islice(it, chunk))
+        if not items:
+            return
+        yield start, kind, items
+        start += len(items)
+
+
+def duplicate_entries(parts):
+    # كل ظهور بعد الأول = مكرر. الـ digests بس بتتعمل sort (نسخة واحدة) عشان نعرف القيم المكررة،
+    # وبعدين لفة على الـ chunks بالترتيب تحدد أول ظهور لكل قيمة
+    empty = np.empty(0, dtype=np.uint32)
+    if not parts:
+        return empty
+    d = np.concatenate([digests for digests, _ in parts])
+    d.sort()
+    dup_values = np.unique(d[1:][d[1:] == d[:-1]])
+    del d
+    if not len(dup_values):
+        return empty
+    seen = np.zeros(len(dup_values), dtype=bool)
+    out = []
+    for digests, entries in parts:
+        hits = np.flatnonzero(np.isin(digests, dup_values))
+        for h, slot in zip(hits.tolist(), np.searchsorted(dup_values, digests[hits]).tolist()):
+            if seen[slot]:
+                out.append(entries[h])
+            seen[slot] = True
+    return np.array(out, dtype=np.uint32)
+
+
+class StreamValidator:
+    """نفس قواعد validate() على records جاية واحد ورا التاني (من غير ملف)."""
+
+    def __init__(self, limits=None, chunk=CHUNK, max_offsets=MAX_OFFSETS):
+        self.limits = limits or (RELEVANCE_COUNT, MIN_QUERY_LEN, MIN_GT_LEN)
+        self.chunk = chunk
+        self.max_offsets = max_offsets
+        self.counts = {rule: 0 for rule in RULES}
+        self.offsets = {rule: [] for rule in RULES}
+        self.parts = {k: [] for k in UNIQUE}
+        self.records = 0
+        self._buf = []
+        self._t0 = time.perf_counter()
+
+    def check(self, record):
+        self._buf.append(record)
+        if len(self._buf) >= self.chunk:
+            self._flush()
+
+    def _flush(self):
+        if self._buf:
+            self.add(check_items(self.records + 1, "records", self._buf, self.limits))
+            self._buf = []
+
+    def add(self, result):
+        # نتيجة check_chunk/check_items (من هنا أو من worker)
+        n, fails, digests = result
+        self.records += n
+        for rule, entries in fails.items():
+            self.counts[rule] += len(entries)
+            room = self.max_offsets - len(self.offsets[rule])
+            self.offsets[rule].extend(entries[:room])
+        for k, part in digests.items():
+            self.parts[k].append(part)
+
+    def report(self, source=None):
+        self._flush()
+        counts, offsets = dict(self.counts), dict(self.offsets)
+        for k, rule in UNIQUE.items():
+            dups = duplicate_entries(self.parts[k])
+            counts[rule] = len(dups)
+            offsets[rule] = dups[:self.max_offsets].tolist()
+        limits = self.limits
+        return {
+            "source": source,
+            "records": self.records,
+            "passed": not any(counts.values()),
+            "thresholds": {"relevance_count": limits[0], "min_query_len": limits[1], "min_ground_truth_len": limits[2]},
+            "rules": {rule: {"count": counts[rule], "entries": offsets[rule]} for rule in RULES},
+            "elapsed_s": round(time.perf_counter() - self._t0, 3),
+        }
+
+
+def validate(path, workers=WORKERS, chunk=CHUNK, limits=None, max_offsets=MAX_OFFSETS):
+    sv = StreamValidator(limits, chunk, max_offsets)
+    if workers > 1:
+        pool = mp.get_context("fork").Pool(workers, initializer=_init, initargs=(sv.limits,))
+        results = pool.imap(check_chunk, tasks(path, chunk))
+    else:
+        pool = None
+        _init(sv.limits)
+        results = map(check_chunk, tasks(path, chunk))
+    try:
+        for result in results:
+            sv.add(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return sv.report(path)
+
+
+def error_lines(report, limit=MAX_ERRORS):
+    # أول limit رسالة بترتيب الـ entries (وجوه الـ entry بترتيب القواعد)
+    rel_n = report["thresholds"]["relevance_count"]
+    errs = [(i, r, rule) for r, rule in enumerate(RULES) for i in report["rules"][rule]["entries"]]
+    errs.sort()
+    return [f"[Entry {i}] {RULES[rule].format(n=rel_n)}" for i, _, rule in errs[:limit]]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="التحقق من الداتاسيت")
+    ap.add_argument("path", nargs="?", default=IN, help="JSON / JSONL / gzip / فولدر shards")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="records لكل task")
+    ap.add_argument("--report", help="اكتب تقرير JSON هنا")
+    ap.add_argument("--max-errors", type=int, default=MAX_ERRORS, help="أقصى عدد رسايل على الشاشة")
+    ap.add_argument("--max-offsets", type=int, default=MAX_OFFSETS, help="أقصى entries لكل قاعدة في التقرير")
+    ap.add_argument("--relevance-count", type=int, default=RELEVANCE_COUNT)
+    ap.add_argument("--min-query-len", type=int, default=MIN_QUERY_LEN)
+    ap.add_argument("--min-gt-len", type=int, default=MIN_GT_LEN)
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"❌ {args.path} not found")
         sys.exit(1)
-    with open(IN, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    errs = []
-    seen_q = set()
-    seen_gt = set()
-    seen_rel = set()
-
-    for i, x in enumerate(data, 1):
-        # counts
-        if len(x.get("high_relevance",[])) != 4:
-            errs.append(f"[Entry {i}] High relevance count != 4")
-        if len(x.get("medium_relevance",[])) != 4:
-            errs.append(f"[Entry {i}] Medium relevance count != 4")
-        if len(x.get("low_relevance",[])) != 4:
-            errs.append(f"[Entry {i}] Low relevance count != 4")
-
-        # lengths
-        q = x.get("query","").strip()
-        d = x.get("description","").strip()
-        gt = x.get("ground_truth","").strip()
-
-        if len(q) < 60: errs.append(f"[Entry {i}] Query too short")
-        if len(gt) < 160: errs.append(f"[Entry {i}] Ground truth too short")
-        if "-" in gt: errs.append(f"[Entry {i}] Ground truth must not contain '-'")
-
-        # uniqueness
-        if q in seen_q: errs.append(f"[Entry {i}] Duplicate query")
-        seen_q.add(q)
-
-        if gt in seen_gt: errs.append(f"[Entry {i}] Duplicate ground_truth")
-        seen_gt.add(gt)
-
-        for sec in ("high_relevance","medium_relevance","low_relevance"):
-            for s in x.get(sec,[]):
-                s = s.strip()
-                if s in seen_rel:
-                    errs.append(f"[Entry {i}] Duplicate relevance sentence across dataset")
-                seen_rel.add(s)
-
-    if errs:
+    limits = (args.relevance_count, args.min_query_len, args.min_gt_len)
+    report = validate(args.path, args.workers, args.chunk, limits,
+                      max(args.max_offsets, args.max_errors))
+
+    if args.report:
+        tmp = args.report + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, args.report)
+        print(f"📝 Report written to {args.report}")
+
+    if not report["passed"]:
         print("❌ Validation failed with errors:")
-        for e in errs[:200]:
+        for e in error_lines(report, args.max_errors):
             print(" -", e)
         sys.exit(1)
     else:
-        print(f"✅ Validation passed for {len(data)} entries.")
+        print(f"✅ Validation passed for {report['records']} entries.")
 
 if __name__ == "__main__":
     main()